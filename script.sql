@@ -85,8 +85,11 @@ CREATE TABLE `posts` (
 `updated_at` datetime DEFAULT NULL,
 `post_type` enum ('ORIGINAL', 'SHARE') COLLATE utf8mb4_unicode_ci DEFAULT 'ORIGINAL',
 `parent_post_id` bigint DEFAULT NULL,
+`sentiment_score` int NOT NULL DEFAULT '0',
 PRIMARY KEY (`post_id`),
 KEY `parent_post_id` (`parent_post_id`),
+KEY `ix_posts_sentiment` (`sentiment_score`, `created_at`),
+KEY `ix_posts_created` (`created_at`),
 CONSTRAINT `posts_ibfk_1` FOREIGN KEY (`parent_post_id`) REFERENCES `posts` (`post_id`)
 ) ENGINE=InnoDB AUTO_INCREMENT=6 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
@@ -95,9 +98,20 @@ CREATE TABLE `post_locations` (
 `location_id` bigint NOT NULL,
 `location_type` enum('USER_TIMELINE', 'GROUP', 'PAGE_TIMELINE') COLLATE utf8mb4_unicode_ci NOT NULL,
 PRIMARY KEY (`post_id`, `location_id`, `location_type`),
+KEY `ix_post_locations_target` (`location_type`, `location_id`, `post_id`),
 CONSTRAINT `post_locations_ibfk_1` FOREIGN KEY (`post_id`) REFERENCES `posts` (`post_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- Inverted index of post text (app/post_search.py), maintained by the API
+CREATE TABLE `post_search_terms` (
+`term` varchar(64) COLLATE utf8mb4_bin NOT NULL,
+`post_id` bigint NOT NULL,
+`tf` smallint NOT NULL,
+PRIMARY KEY (`term`, `post_id`),
+KEY `ix_post_search_terms_post` (`post_id`),
+CONSTRAINT `post_search_terms_ibfk_1` FOREIGN KEY (`post_id`) REFERENCES `posts` (`post_id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 CREATE TABLE `files` (
 `file_id` bigint NOT NULL AUTO_INCREMENT,
 `uploader_user_id` bigint NOT NULL,
@@ -106,12 +120,39 @@ CREATE TABLE `files` (
 `file_size` int NOT NULL,
 `file_url` varchar(255) COLLATE utf8mb4_unicode_ci NOT NULL,
 `thumbnail_url` varchar(255) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
+`renditions` json DEFAULT NULL,
+`renditions_pending` tinyint(1) NOT NULL DEFAULT '0',
+`content_hash` char(64) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
+`status` enum ('PENDING', 'READY', 'FAILED') COLLATE utf8mb4_unicode_ci NOT NULL DEFAULT 'READY',
+`upload_claimed_at` datetime DEFAULT NULL,
 `created_at` datetime NOT NULL DEFAULT (now()),
 PRIMARY KEY (`file_id`),
-KEY `uploader_user_id` (`uploader_user_id`),
+KEY `ix_files_uploader_created` (`uploader_user_id`, `created_at`),
+KEY `ix_files_content_hash` (`content_hash`),
+KEY `ix_files_renditions_pending` (`renditions_pending`),
 CONSTRAINT `files_ibfk_1` FOREIGN KEY (`uploader_user_id`) REFERENCES `users` (`user_id`)
 ) ENGINE=InnoDB AUTO_INCREMENT=2 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+CREATE TABLE `media_blobs` (
+`content_hash` char(64) COLLATE utf8mb4_unicode_ci NOT NULL,
+`storage_key` varchar(255) COLLATE utf8mb4_unicode_ci NOT NULL,
+`file_url` varchar(255) COLLATE utf8mb4_unicode_ci NOT NULL,
+`file_size` int NOT NULL,
+`resource_type` varchar(20) COLLATE utf8mb4_unicode_ci NOT NULL DEFAULT 'raw',
+`ref_count` int NOT NULL DEFAULT 0,
+`created_at` datetime NOT NULL DEFAULT (now()),
+PRIMARY KEY (`content_hash`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE `upload_ticket_claims` (
+`storage_key` varchar(255) COLLATE utf8mb4_unicode_ci NOT NULL,
+`user_id` bigint NOT NULL,
+`claimed_at` datetime NOT NULL DEFAULT (now()),
+PRIMARY KEY (`storage_key`),
+KEY `user_id` (`user_id`),
+CONSTRAINT `upload_ticket_claims_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`user_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 CREATE TABLE `post_files` (
 `post_id` bigint NOT NULL,
 `file_id` bigint NOT NULL,
@@ -134,6 +175,7 @@ CREATE TABLE comments (
 PRIMARY KEY (`comment_id`),
 KEY `commenter_user_id` (`commenter_user_id`),
 KEY `parent_comment_id` (`parent_comment_id`),
+KEY `ix_comments_created` (`created_at`),
 CONSTRAINT `comments_ibfk_1` FOREIGN KEY (`commenter_user_id`) REFERENCES `users` (`user_id`),
 CONSTRAINT `comments_ibfk_2` FOREIGN KEY (`parent_comment_id`) REFERENCES comments(`comment_id`)
 ) ENGINE=InnoDB AUTO_INCREMENT=8 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -145,9 +187,22 @@ CREATE TABLE `reactions` (
 `reaction_type` enum('LIKE', 'LOVE', 'HAHA', 'SAD', 'ANGRY') COLLATE utf8mb4_unicode_ci NOT NULL,
 `created_at` datetime NOT NULL DEFAULT (now()),
 PRIMARY KEY (`reactor_user_id`, `reactable_id`, `reactable_type`),
+KEY `ix_reactions_created` (`created_at`),
+KEY `ix_reactions_target` (`reactable_type`, `reactable_id`, `reaction_type`),
 CONSTRAINT `reactions_ibfk_1` FOREIGN KEY (`reactor_user_id`) REFERENCES `users` (`user_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+CREATE TABLE `user_seen_posts` (
+`user_id` bigint NOT NULL,
+`post_id` bigint NOT NULL,
+`seen_at` datetime NOT NULL DEFAULT (now()),
+PRIMARY KEY (`user_id`, `post_id`),
+KEY `post_id` (`post_id`),
+KEY `ix_user_seen_posts_seen` (`seen_at`),
+CONSTRAINT `user_seen_posts_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`user_id`),
+CONSTRAINT `user_seen_posts_ibfk_2` FOREIGN KEY (`post_id`) REFERENCES `posts` (`post_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- 5. Groups Tables
 CREATE TABLE `groups` (
 `group_id` bigint NOT NULL AUTO_INCREMENT,
@@ -157,9 +212,12 @@ CREATE TABLE `groups` (
 `cover_photo_url` varchar(255) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
 `privacy_type` enum ('PUBLIC', 'PRIVATE') COLLATE utf8mb4_unicode_ci NOT NULL,
 `is_visible` tinyint (1) NOT NULL DEFAULT '1',
+`member_count` int NOT NULL DEFAULT '0',
+`timeline_version` int NOT NULL DEFAULT '0',
 `created_at` datetime NOT NULL DEFAULT (now()),
 PRIMARY KEY (`group_id`),
 KEY `creator_user_id` (`creator_user_id`),
+KEY `ix_groups_visible_members` (`is_visible`, `member_count`),
 CONSTRAINT `groups_ibfk_1` FOREIGN KEY (`creator_user_id`) REFERENCES `users` (`user_id`)
 ) ENGINE=InnoDB AUTO_INCREMENT=2 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
@@ -170,7 +228,7 @@ CREATE TABLE `group_memberships` (
 `status` enum ('JOINED', 'PENDING', 'BANNED', 'INVITED') COLLATE utf8mb4_unicode_ci NOT NULL,
 `joined_at` datetime NOT NULL DEFAULT (now()),
 PRIMARY KEY (`user_id`, `group_id`),
-KEY `group_id` (`group_id`),
+KEY `ix_group_memberships_group_status_joined` (`group_id`, `status`, `joined_at`),
 CONSTRAINT `group_memberships_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`user_id`),
 CONSTRAINT `group_memberships_ibfk_2` FOREIGN KEY (`group_id`) REFERENCES `groups` (`group_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -217,6 +275,7 @@ CREATE TABLE `pages` (
 `category` varchar(100) COLLATE utf8mb4_unicode_ci DEFAULT NULL,
 `description` text COLLATE utf8mb4_unicode_ci,
 `contact_info` json DEFAULT NULL,
+`follower_count` int NOT NULL DEFAULT '0',
 `created_at` datetime NOT NULL DEFAULT (now()),
 PRIMARY KEY (`page_id`),
 UNIQUE KEY `username` (`username`)
@@ -237,11 +296,46 @@ CREATE TABLE `page_follows` (
 `page_id` bigint NOT NULL,
 `followed_at` datetime NOT NULL DEFAULT (now()),
 PRIMARY KEY (`user_id`, `page_id`),
-KEY `page_id` (`page_id`),
+KEY `ix_page_follows_page_followed` (`page_id`, `followed_at`),
 CONSTRAINT `page_follows_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`user_id`),
 CONSTRAINT `page_follows_ibfk_2` FOREIGN KEY (`page_id`) REFERENCES `pages` (`page_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+CREATE TABLE `page_daily_stats` (
+`page_id` bigint NOT NULL,
+`day` date NOT NULL,
+`new_followers` int NOT NULL DEFAULT '0',
+`posts` int NOT NULL DEFAULT '0',
+`reactions_like` int NOT NULL DEFAULT '0',
+`reactions_love` int NOT NULL DEFAULT '0',
+`reactions_haha` int NOT NULL DEFAULT '0',
+`reactions_sad` int NOT NULL DEFAULT '0',
+`reactions_angry` int NOT NULL DEFAULT '0',
+`comments` int NOT NULL DEFAULT '0',
+`reach` int NOT NULL DEFAULT '0',
+PRIMARY KEY (`page_id`, `day`),
+CONSTRAINT `page_daily_stats_ibfk_1` FOREIGN KEY (`page_id`) REFERENCES `pages` (`page_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE `user_monthly_activity` (
+`user_id` bigint NOT NULL,
+`month` date NOT NULL,
+`original_posts` int NOT NULL DEFAULT '0',
+`shares` int NOT NULL DEFAULT '0',
+`comments` int NOT NULL DEFAULT '0',
+`reactions_given` int NOT NULL DEFAULT '0',
+PRIMARY KEY (`user_id`, `month`),
+KEY `ix_user_monthly_activity_month` (`month`, `user_id`),
+CONSTRAINT `user_monthly_activity_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`user_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE `rollup_watermarks` (
+`job_name` varchar(50) COLLATE utf8mb4_unicode_ci NOT NULL,
+`through_day` date NOT NULL,
+`updated_at` datetime NOT NULL DEFAULT (now()) ON UPDATE CURRENT_TIMESTAMP,
+PRIMARY KEY (`job_name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- 7. Events Tables
 CREATE TABLE `events` (
 `event_id` bigint NOT NULL AUTO_INCREMENT,
@@ -253,7 +347,12 @@ CREATE TABLE `events` (
 `end_time` datetime DEFAULT NULL,
 `location_text` text COLLATE utf8mb4_unicode_ci,
 `privacy_setting` enum ('PUBLIC', 'PRIVATE', 'FRIENDS') COLLATE utf8mb4_unicode_ci NOT NULL,
-PRIMARY KEY (`event_id`)
+`going_count` int NOT NULL DEFAULT '0',
+`interested_count` int NOT NULL DEFAULT '0',
+`cant_go_count` int NOT NULL DEFAULT '0',
+`updated_at` datetime NOT NULL DEFAULT (now()) ON UPDATE CURRENT_TIMESTAMP,
+PRIMARY KEY (`event_id`),
+KEY `ix_events_start` (`start_time`, `event_id`)
 ) ENGINE=InnoDB AUTO_INCREMENT=2 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 CREATE TABLE `event_publications` (
@@ -274,11 +373,41 @@ CREATE TABLE `event_participants` (
 `rsvp_status` enum ('GOING', 'INTERESTED', 'CANT_GO') COLLATE utf8mb4_unicode_ci NOT NULL,
 `updated_at` datetime NOT NULL DEFAULT (now()),
 PRIMARY KEY (`event_id`, `user_id`),
-KEY `user_id` (`user_id`),
+KEY `ix_event_participants_event_status_updated` (`event_id`, `rsvp_status`, `updated_at`),
+KEY `ix_event_participants_user_status_updated` (`user_id`, `rsvp_status`, `updated_at`),
 CONSTRAINT `event_participants_ibfk_1` FOREIGN KEY (`event_id`) REFERENCES `events` (`event_id`),
 CONSTRAINT `event_participants_ibfk_2` FOREIGN KEY (`user_id`) REFERENCES `users` (`user_id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+CREATE TABLE `event_reminders` (
+`reminder_id` bigint NOT NULL AUTO_INCREMENT,
+`event_id` bigint NOT NULL,
+`user_id` bigint NOT NULL,
+`kind` enum ('REMINDER', 'STARTING') COLLATE utf8mb4_unicode_ci NOT NULL,
+`created_at` datetime NOT NULL DEFAULT (now()),
+PRIMARY KEY (`reminder_id`),
+UNIQUE KEY `ux_event_reminders_event_user_kind` (`event_id`, `user_id`, `kind`),
+KEY `ix_event_reminders_user_created` (`user_id`, `created_at`),
+CONSTRAINT `event_reminders_ibfk_1` FOREIGN KEY (`event_id`) REFERENCES `events` (`event_id`),
+CONSTRAINT `event_reminders_ibfk_2` FOREIGN KEY (`user_id`) REFERENCES `users` (`user_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE `scheduler_watermarks` (
+`job_name` varchar(50) COLLATE utf8mb4_unicode_ci NOT NULL,
+`fired_through` datetime NOT NULL,
+`updated_at` datetime NOT NULL DEFAULT (now()) ON UPDATE CURRENT_TIMESTAMP,
+PRIMARY KEY (`job_name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE `typeahead_changes` (
+`change_id` bigint NOT NULL AUTO_INCREMENT,
+`entity_type` varchar(10) COLLATE utf8mb4_unicode_ci NOT NULL,
+`entity_id` bigint NOT NULL,
+`changed_at` datetime NOT NULL DEFAULT (now()),
+PRIMARY KEY (`change_id`),
+KEY `ix_typeahead_changes_changed_at` (`changed_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- 8. Moderation Tables
 CREATE TABLE `report_reasons` (
 `reason_id` bigint NOT NULL AUTO_INCREMENT,
@@ -376,11 +505,19 @@ INSERT INTO group_memberships (user_id, group_id, role, status) VALUES
 (5, 3, 'MEMBER', 'PENDING'), -- Rachel requested to join Legal group
 (3, 2, 'MODERATOR', 'JOINED'); -- Jane mods Tech group
 
+UPDATE `groups` g SET member_count = (
+    SELECT COUNT(*) FROM group_memberships gm WHERE gm.group_id = g.group_id AND gm.status = 'JOINED'
+);
+
 INSERT INTO page_follows (user_id, page_id) VALUES
 (2, 1), (3, 1), (4, 1), -- Everyone follows HCMUT
 (2, 4), -- John follows Marvel
 (5, 2); -- Rachel follows Starbucks
 
+UPDATE pages p SET follower_count = (
+    SELECT COUNT(*) FROM page_follows pf WHERE pf.page_id = p.page_id
+);
+
 -- 4. Content Engine (Posts, Locations)
 INSERT INTO posts (post_id, author_id, author_type, text_content, privacy_setting, post_type, parent_post_id) VALUES
 (1, 2, 'USER', 'What a beautiful sunset today!', 'PUBLIC', 'ORIGINAL', NULL), -- Post 1 (User)
@@ -395,6 +532,7 @@ INSERT INTO post_locations (post_id, location_id, location_type) VALUES
 (3, 2, 'GROUP'), -- Post 3 in "Tech Talk VN" Group (Group ID 2)
 (4, 4, 'USER_TIMELINE'), -- Post 4 on Mike's timeline
 (5, 2, 'USER_TIMELINE'); -- Post 5 on John's timeline
+-- post_search_terms: python -m app.maintenance index-post-search
 
 -- 5. Interactions (Comments, Reactions)
 INSERT INTO comments (comment_id, commenter_user_id, commentable_id, commentable_type, text_content, parent_comment_id) VALUES
@@ -411,6 +549,12 @@ INSERT INTO reactions (reactor_user_id, reactable_id, reactable_type, reaction_t
 (2, 2, 'POST', 'LIKE'), -- John liked Post 2
 (3, 5, 'POST', 'HAHA'); -- Jane laughed at Post 5
 
+UPDATE posts p SET sentiment_score = (
+    SELECT COALESCE(SUM(CASE r.reaction_type
+        WHEN 'LOVE' THEN 3 WHEN 'LIKE' THEN 1 WHEN 'HAHA' THEN 1 WHEN 'SAD' THEN -1 WHEN 'ANGRY' THEN -2 ELSE 0 END), 0)
+    FROM reactions r WHERE r.reactable_type = 'POST' AND r.reactable_id = p.post_id
+);
+
 -- 6. Events & Reports
 INSERT INTO events (event_id, host_id, host_type, event_name, start_time, privacy_setting) VALUES
 (1, 2, 'USER', 'John Birthday Party', '2025-12-20 18:00:00', 'FRIENDS'),
@@ -427,6 +571,12 @@ INSERT INTO event_participants (event_id, user_id, rsvp_status) VALUES
 (2, 3, 'GOING'), -- Jane going to Open Day
 (3, 2, 'GOING'); -- John going to Workshop
 
+UPDATE events e SET
+    updated_at = updated_at,
+    going_count = (SELECT COUNT(*) FROM event_participants ep WHERE ep.event_id = e.event_id AND ep.rsvp_status = 'GOING'),
+    interested_count = (SELECT COUNT(*) FROM event_participants ep WHERE ep.event_id = e.event_id AND ep.rsvp_status = 'INTERESTED'),
+    cant_go_count = (SELECT COUNT(*) FROM event_participants ep WHERE ep.event_id = e.event_id AND ep.rsvp_status = 'CANT_GO');
+
 INSERT INTO report_reasons (reason_id, title, description) VALUES
 (1, 'Spam', 'Unwanted or repetitive content'),
 (2, 'Hate Speech', 'Violent or discriminatory language'),
@@ -0,0 +1,20 @@
+-- Event scheduler: delivered reminders and the scheduler watermark
+CREATE TABLE IF NOT EXISTS `event_reminders` (
+`reminder_id` bigint NOT NULL AUTO_INCREMENT,
+`event_id` bigint NOT NULL,
+`user_id` bigint NOT NULL,
+`kind` enum ('REMINDER', 'STARTING') COLLATE utf8mb4_unicode_ci NOT NULL,
+`created_at` datetime NOT NULL DEFAULT (now()),
+PRIMARY KEY (`reminder_id`),
+UNIQUE KEY `ux_event_reminders_event_user_kind` (`event_id`, `user_id`, `kind`),
+KEY `ix_event_reminders_user_created` (`user_id`, `created_at`),
+CONSTRAINT `event_reminders_ibfk_1` FOREIGN KEY (`event_id`) REFERENCES `events` (`event_id`),
+CONSTRAINT `event_reminders_ibfk_2` FOREIGN KEY (`user_id`) REFERENCES `users` (`user_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS `scheduler_watermarks` (
+`job_name` varchar(50) COLLATE utf8mb4_unicode_ci NOT NULL,
+`fired_through` datetime NOT NULL,
+`updated_at` datetime NOT NULL DEFAULT (now()) ON UPDATE CURRENT_TIMESTAMP,
+PRIMARY KEY (`job_name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
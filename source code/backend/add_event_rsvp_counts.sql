@@ -0,0 +1,14 @@
+-- Denormalized RSVP counters per status for events (maintained by the API)
+ALTER TABLE events
+ADD COLUMN going_count INT NOT NULL DEFAULT 0 AFTER privacy_setting,
+ADD COLUMN interested_count INT NOT NULL DEFAULT 0 AFTER going_count,
+ADD COLUMN cant_go_count INT NOT NULL DEFAULT 0 AFTER interested_count;
+
+-- Participant list: keyset scan by (updated_at, user_id), optionally filtered by status
+CREATE INDEX ix_event_participants_event_status_updated ON event_participants (event_id, rsvp_status, updated_at);
+
+-- Backfill (same as: python -m app.maintenance recount-event-rsvps)
+UPDATE events e SET
+    going_count = (SELECT COUNT(*) FROM event_participants ep WHERE ep.event_id = e.event_id AND ep.rsvp_status = 'GOING'),
+    interested_count = (SELECT COUNT(*) FROM event_participants ep WHERE ep.event_id = e.event_id AND ep.rsvp_status = 'INTERESTED'),
+    cant_go_count = (SELECT COUNT(*) FROM event_participants ep WHERE ep.event_id = e.event_id AND ep.rsvp_status = 'CANT_GO');
@@ -0,0 +1,9 @@
+-- Calendar feed: ETag over the user's RSVPs and the events they point at
+-- ON UPDATE also fires for counter-only updates unless they set updated_at = updated_at (the API does)
+ALTER TABLE events
+ADD COLUMN updated_at DATETIME NOT NULL DEFAULT (now()) ON UPDATE CURRENT_TIMESTAMP AFTER cant_go_count;
+
+-- Feed of one user by status, MAX(updated_at) served from the index
+-- The composite index also serves the user_id foreign key, so the old single-column key is dropped
+CREATE INDEX ix_event_participants_user_status_updated ON event_participants (user_id, rsvp_status, updated_at);
+DROP INDEX user_id ON event_participants;
@@ -0,0 +1,2 @@
+-- Event listing: keyset scan by (start_time, event_id), upcoming / past
+CREATE INDEX ix_events_start ON events (start_time, event_id);
@@ -0,0 +1,3 @@
+-- Add renditions column (thumbnail / resized variants) to files table
+ALTER TABLE files
+ADD COLUMN renditions JSON NULL AFTER thumbnail_url;
@@ -0,0 +1,3 @@
+-- Async uploads: files are PENDING until the background uploader has stored them
+ALTER TABLE files
+ADD COLUMN status ENUM('PENDING', 'READY', 'FAILED') NOT NULL DEFAULT 'READY' AFTER content_hash;
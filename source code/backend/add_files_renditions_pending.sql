@@ -0,0 +1,4 @@
+-- Files whose renditions are still to be generated (app/media_processing.py requeues them at startup)
+ALTER TABLE files
+ADD COLUMN renditions_pending TINYINT(1) NOT NULL DEFAULT 0 AFTER renditions,
+ADD KEY ix_files_renditions_pending (renditions_pending);
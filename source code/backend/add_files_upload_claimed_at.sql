@@ -0,0 +1,3 @@
+-- Lease of the background uploader on a PENDING file (app/upload_worker.py)
+ALTER TABLE files
+ADD COLUMN upload_claimed_at DATETIME DEFAULT NULL AFTER status;
@@ -0,0 +1,4 @@
+-- Per-user media gallery: keyset scan on (uploader_user_id, created_at)
+-- The composite index also serves the uploader_user_id foreign key, so the old single-column key is dropped
+CREATE INDEX ix_files_uploader_created ON files (uploader_user_id, created_at);
+DROP INDEX uploader_user_id ON files;
@@ -0,0 +1,9 @@
+-- Denormalized JOINED member count for groups (maintained by the API)
+ALTER TABLE `groups`
+ADD COLUMN member_count INT NOT NULL DEFAULT 0 AFTER is_visible,
+ADD INDEX ix_groups_visible_members (is_visible, member_count);
+
+-- Backfill (same as: python -m app.maintenance recount-group-members)
+UPDATE `groups` g SET member_count = (
+    SELECT COUNT(*) FROM group_memberships gm WHERE gm.group_id = g.group_id AND gm.status = 'JOINED'
+);
@@ -0,0 +1,4 @@
+-- Pending-request review: keyset scan by (group_id, status) oldest request first
+-- The composite index also serves the group_id foreign key, so the old single-column key is dropped
+CREATE INDEX ix_group_memberships_group_status_joined ON group_memberships (group_id, status, joined_at);
+DROP INDEX group_id ON group_memberships;
@@ -0,0 +1,3 @@
+-- Version of each group's timeline cards, bumped by the API on every change (app/timeline_cache.py)
+ALTER TABLE `groups`
+ADD COLUMN timeline_version INT NOT NULL DEFAULT 0 AFTER member_count;
@@ -0,0 +1,15 @@
+-- Content-addressed upload deduplication: one stored object per distinct content
+ALTER TABLE files
+ADD COLUMN content_hash CHAR(64) NULL AFTER renditions,
+ADD KEY ix_files_content_hash (content_hash);
+
+CREATE TABLE IF NOT EXISTS media_blobs (
+    content_hash CHAR(64) NOT NULL,
+    storage_key VARCHAR(255) NOT NULL,
+    file_url VARCHAR(255) NOT NULL,
+    file_size INT NOT NULL,
+    resource_type VARCHAR(20) NOT NULL DEFAULT 'raw',
+    ref_count INT NOT NULL DEFAULT 0,
+    created_at DATETIME NOT NULL DEFAULT (NOW()),
+    PRIMARY KEY (content_hash)
+);
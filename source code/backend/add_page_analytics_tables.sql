@@ -0,0 +1,38 @@
+-- Page analytics: seen-post log, daily per-page rollups and job watermarks
+CREATE TABLE IF NOT EXISTS `user_seen_posts` (
+`user_id` bigint NOT NULL,
+`post_id` bigint NOT NULL,
+`seen_at` datetime NOT NULL DEFAULT (now()),
+PRIMARY KEY (`user_id`, `post_id`),
+KEY `post_id` (`post_id`),
+KEY `ix_user_seen_posts_seen` (`seen_at`),
+CONSTRAINT `user_seen_posts_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`user_id`),
+CONSTRAINT `user_seen_posts_ibfk_2` FOREIGN KEY (`post_id`) REFERENCES `posts` (`post_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS `page_daily_stats` (
+`page_id` bigint NOT NULL,
+`day` date NOT NULL,
+`new_followers` int NOT NULL DEFAULT '0',
+`posts` int NOT NULL DEFAULT '0',
+`reactions_like` int NOT NULL DEFAULT '0',
+`reactions_love` int NOT NULL DEFAULT '0',
+`reactions_haha` int NOT NULL DEFAULT '0',
+`reactions_sad` int NOT NULL DEFAULT '0',
+`reactions_angry` int NOT NULL DEFAULT '0',
+`comments` int NOT NULL DEFAULT '0',
+`reach` int NOT NULL DEFAULT '0',
+PRIMARY KEY (`page_id`, `day`),
+CONSTRAINT `page_daily_stats_ibfk_1` FOREIGN KEY (`page_id`) REFERENCES `pages` (`page_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS `rollup_watermarks` (
+`job_name` varchar(50) COLLATE utf8mb4_unicode_ci NOT NULL,
+`through_day` date NOT NULL,
+`updated_at` datetime NOT NULL DEFAULT (now()) ON UPDATE CURRENT_TIMESTAMP,
+PRIMARY KEY (`job_name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- The rollup job scans a day at a time by created_at
+CREATE INDEX ix_comments_created ON comments (created_at);
+CREATE INDEX ix_reactions_created ON reactions (created_at);
@@ -0,0 +1,13 @@
+-- Denormalized follower count for pages (maintained by the API)
+ALTER TABLE pages
+ADD COLUMN follower_count INT NOT NULL DEFAULT 0 AFTER contact_info;
+
+-- Follower list: keyset scan by (page_id, followed_at)
+-- The composite index also serves the page_id foreign key, so the old single-column key is dropped
+CREATE INDEX ix_page_follows_page_followed ON page_follows (page_id, followed_at);
+DROP INDEX page_id ON page_follows;
+
+-- Backfill (same as: python -m app.maintenance recount-page-followers)
+UPDATE pages p SET follower_count = (
+    SELECT COUNT(*) FROM page_follows pf WHERE pf.page_id = p.page_id
+);
@@ -0,0 +1,2 @@
+-- Group / page timelines: keyset scan by (location_type, location_id) newest post first
+CREATE INDEX ix_post_locations_target ON post_locations (location_type, location_id, post_id);
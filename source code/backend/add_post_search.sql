@@ -0,0 +1,12 @@
+-- Inverted index of post text (app/post_search.py), maintained by the API
+CREATE TABLE IF NOT EXISTS `post_search_terms` (
+`term` varchar(64) COLLATE utf8mb4_bin NOT NULL,
+`post_id` bigint NOT NULL,
+`tf` smallint NOT NULL,
+PRIMARY KEY (`term`, `post_id`),
+KEY `ix_post_search_terms_post` (`post_id`),
+CONSTRAINT `post_search_terms_ibfk_1` FOREIGN KEY (`post_id`) REFERENCES `posts` (`post_id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Fill the index for existing posts:
+-- python -m app.maintenance index-post-search
@@ -0,0 +1,17 @@
+-- Stored post sentiment score (maintained by the API from reactions)
+ALTER TABLE posts
+ADD COLUMN sentiment_score INT NOT NULL DEFAULT 0 AFTER parent_post_id;
+
+-- Score-range filter + ORDER BY sentiment_score, created_at as an index scan
+CREATE INDEX ix_posts_sentiment ON posts (sentiment_score, created_at);
+
+-- Reactions of one target (counts, sentiment recompute)
+CREATE INDEX ix_reactions_target ON reactions (reactable_type, reactable_id, reaction_type);
+
+-- Backfill in batches: python -m app.maintenance backfill-post-sentiment
+-- (one statement for small tables:)
+-- UPDATE posts p SET sentiment_score = (
+--     SELECT COALESCE(SUM(CASE r.reaction_type
+--         WHEN 'LOVE' THEN 3 WHEN 'LIKE' THEN 1 WHEN 'HAHA' THEN 1 WHEN 'SAD' THEN -1 WHEN 'ANGRY' THEN -2 ELSE 0 END), 0)
+--     FROM reactions r WHERE r.reactable_type = 'POST' AND r.reactable_id = p.post_id
+-- );
@@ -0,0 +1,9 @@
+-- Typeahead index changes, polled by every API worker (app/typeahead.py)
+CREATE TABLE IF NOT EXISTS typeahead_changes (
+    change_id BIGINT NOT NULL AUTO_INCREMENT,
+    entity_type VARCHAR(10) NOT NULL,
+    entity_id BIGINT NOT NULL,
+    changed_at DATETIME NOT NULL DEFAULT (NOW()),
+    PRIMARY KEY (change_id),
+    KEY ix_typeahead_changes_changed_at (changed_at)
+);
@@ -0,0 +1,9 @@
+-- Confirmed upload tickets: a ticket creates at most one File (POST /media/upload-tickets/confirm)
+CREATE TABLE IF NOT EXISTS upload_ticket_claims (
+    storage_key VARCHAR(255) NOT NULL,
+    user_id BIGINT NOT NULL,
+    claimed_at DATETIME NOT NULL DEFAULT (NOW()),
+    PRIMARY KEY (storage_key),
+    KEY user_id (user_id),
+    CONSTRAINT upload_ticket_claims_ibfk_1 FOREIGN KEY (user_id) REFERENCES users (user_id)
+);
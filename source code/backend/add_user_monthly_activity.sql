@@ -0,0 +1,17 @@
+-- Per-user monthly activity rollups for /admin/stats (filled by app/user_activity.py)
+CREATE TABLE IF NOT EXISTS `user_monthly_activity` (
+`user_id` bigint NOT NULL,
+`month` date NOT NULL,
+`original_posts` int NOT NULL DEFAULT '0',
+`shares` int NOT NULL DEFAULT '0',
+`comments` int NOT NULL DEFAULT '0',
+`reactions_given` int NOT NULL DEFAULT '0',
+PRIMARY KEY (`user_id`, `month`),
+KEY `ix_user_monthly_activity_month` (`month`, `user_id`),
+CONSTRAINT `user_monthly_activity_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`user_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- The rollup job scans a day at a time by created_at
+CREATE INDEX ix_posts_created ON posts (created_at);
+
+-- First run rolls up the whole history: python -m app.maintenance rollup-user-activity
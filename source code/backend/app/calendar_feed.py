@@ -0,0 +1,130 @@
+"""Per-user iCalendar feed of GOING / INTERESTED events.
+
+Calendar apps poll GET /users/{id}/events.ics?token=... without cookies, so
+the URL carries an HMAC of the user id (GET /me/calendar-feed hands it out).
+The ETag covers the user's latest RSVP and event change plus the number of
+events, one aggregate query, so an unchanged poll gets 304 without building
+the feed. Otherwise VEVENTs are streamed from a server-side cursor with
+their own session, CALENDAR_FEED_BATCH_SIZE rows at a time.
+"""
+import hashlib
+import hmac
+import os
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+
+CALENDAR_FEED_SECRET = os.getenv("CALENDAR_FEED_SECRET") or os.getenv("SECRET_KEY", "dev-secret-change-me")
+CALENDAR_FEED_BATCH_SIZE = int(os.getenv("CALENDAR_FEED_BATCH_SIZE", "200"))
+
+FEED_STATUSES = (models.RSVPStatus.GOING, models.RSVPStatus.INTERESTED)
+PRODID = "-//PHO-BO//Events//VI"
+
+
+def feed_token(user_id: int) -> str:
+    return hmac.new(CALENDAR_FEED_SECRET.encode(), f"calendar-feed\n{user_id}".encode(), hashlib.sha256).hexdigest()
+
+
+def verify_token(user_id: int, token: str | None) -> bool:
+    return bool(token) and hmac.compare_digest(token, feed_token(user_id))
+
+
+def _feed_select(user_id: int):
+    return (
+        select(models.Event, models.EventParticipant.rsvp_status)
+        .join(models.EventParticipant, models.EventParticipant.event_id == models.Event.event_id)
+        .where(
+            models.EventParticipant.user_id == user_id,
+            models.EventParticipant.rsvp_status.in_(FEED_STATUSES),
+        )
+    )
+
+
+def etag(db: Session, user_id: int) -> str:
+    """Changes whenever an RSVP or an event in the feed changes, or one leaves it."""
+    count, last_rsvp, last_event = (
+        db.query(
+            func.count(),
+            func.max(models.EventParticipant.updated_at),
+            func.max(models.Event.updated_at),
+        )
+        .select_from(models.EventParticipant)
+        .join(models.Event, models.Event.event_id == models.EventParticipant.event_id)
+        .filter(
+            models.EventParticipant.user_id == user_id,
+            models.EventParticipant.rsvp_status.in_(FEED_STATUSES),
+        )
+        .one()
+    )
+    digest = hashlib.sha256(f"{user_id}|{count}|{last_rsvp}|{last_event}".encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, current: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == current for t in tags)
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+
+
+def _fold(line: str) -> str:
+    """RFC 5545 line folding: at most 75 octets per line, continuations start with a space."""
+    data = line.encode()
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts, chunk = [], b""
+    for ch in line:
+        b = ch.encode()
+        if len(chunk) + len(b) > (75 if not parts else 74):
+            parts.append(chunk.decode())
+            chunk = b""
+        chunk += b
+    parts.append(chunk.decode())
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _local(dt: datetime) -> str:
+    # DATETIME lưu giờ địa phương không kèm offset: xuất dạng "floating time"
+    return dt.strftime("%Y%m%dT%H%M%S")
+
+
+def _vevent(event: models.Event, rsvp_status: models.RSVPStatus, stamp: str) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:event-{event.event_id}@pho-bo",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{_local(event.start_time)}",
+    ]
+    if event.end_time:
+        lines.append(f"DTEND:{_local(event.end_time)}")
+    lines.append(f"SUMMARY:{_escape(event.event_name)}")
+    if event.description:
+        lines.append(f"DESCRIPTION:{_escape(event.description)}")
+    if event.location_text:
+        lines.append(f"LOCATION:{_escape(event.location_text)}")
+    lines.append("STATUS:CONFIRMED" if rsvp_status == models.RSVPStatus.GOING else "STATUS:TENTATIVE")
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
+
+
+def stream(user_id: int):
+    """Yield the feed chunk by chunk; the rows are read through a server-side cursor."""
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    yield f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:{PRODID}\r\nCALSCALE:GREGORIAN\r\n"
+    db = SessionLocal()
+    try:
+        stmt = _feed_select(user_id).order_by(models.Event.start_time, models.Event.event_id)
+        rows = db.execute(stmt.execution_options(yield_per=CALENDAR_FEED_BATCH_SIZE))
+        for event, rsvp_status in rows:
+            yield _vevent(event, rsvp_status, stamp)
+    finally:
+        db.close()
+    yield "END:VCALENDAR\r\n"
@@ -36,3 +36,14 @@ def upload_to_cloudinary(file_bytes: bytes, filename: str) -> dict:
         resource_type="auto"   # auto = ảnh / video / file đều nhận
     )
     return result
+
+
+def delete_from_cloudinary(public_id: str, resource_type: str = "image") -> dict:
+    """
+    Xoá asset trên Cloudinary theo public_id.
+    resource_type phải khớp lúc upload (image / video / raw).
+    """
+    if not CLOUDINARY_ENABLED:
+        raise ValueError("Cloudinary is not configured. Please set CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, and CLOUDINARY_API_SECRET environment variables.")
+
+    return cloudinary.uploader.destroy(public_id, resource_type=resource_type, invalidate=True)
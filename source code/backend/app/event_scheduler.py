@@ -0,0 +1,264 @@
+"""In-process scheduler for event reminders and lifecycle jobs.
+
+Each API process keeps the events starting within the next
+EVENT_SCHEDULER_HORIZON_HOURS in a min-heap of due times: a REMINDER job
+EVENT_REMINDER_LEAD_MINUTES before start_time and a STARTING job at
+start_time. One thread sleeps until the earliest job is due (or a change
+wakes it) and writes event_reminders rows for the event's GOING / INTERESTED
+participants, EVENT_REMINDER_BATCH_SIZE users per INSERT. The horizon is
+topped up with an index range scan on ix_events_start over the new window
+only.
+
+create / update / delete_event call schedule() / cancel(): a heap push and a
+dict write, O(log n), no rescan of events. A rescheduled event's old heap
+entries stay in the heap and are skipped when popped.
+
+A failed run puts its job back in the heap and the thread backs off for
+EVENT_SCHEDULER_MAX_SLEEP_SECONDS before retrying.
+
+The scheduler_watermarks row holds the time through which every job has
+fired. After a restart only events starting after it are loaded, and jobs
+that fell due while the process was down fire at once. The unique
+(event_id, user_id, kind) key means a job that runs twice (a crash before
+the watermark moved, or two API processes) still reminds each user once.
+"""
+import heapq
+import itertools
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+
+JOB_NAME = "event_scheduler"
+EVENT_SCHEDULER_ENABLED = os.getenv("EVENT_SCHEDULER_ENABLED", "1") == "1"
+EVENT_REMINDER_LEAD_MINUTES = int(os.getenv("EVENT_REMINDER_LEAD_MINUTES", "60"))
+EVENT_SCHEDULER_HORIZON_HOURS = int(os.getenv("EVENT_SCHEDULER_HORIZON_HOURS", "24"))
+EVENT_REMINDER_BATCH_SIZE = int(os.getenv("EVENT_REMINDER_BATCH_SIZE", "500"))
+# ngủ tối đa chừng này giây để kịp nhận thay đổi từ process API khác
+EVENT_SCHEDULER_MAX_SLEEP_SECONDS = int(os.getenv("EVENT_SCHEDULER_MAX_SLEEP_SECONDS", "60"))
+
+REMINDED_STATUSES = (models.RSVPStatus.GOING, models.RSVPStatus.INTERESTED)
+
+# (due, token, event_id, kind); token is the event's entry in _scheduled when pushed
+_heap: list = []
+# event_id -> (start_time, token); an entry whose token no longer matches is stale
+_scheduled: dict = {}
+_tokens = itertools.count()
+_loaded_until: Optional[datetime] = None
+_cond = threading.Condition()
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def _naive(dt: datetime) -> datetime:
+    """DATETIME columns are naive local time; drop the offset of aware values."""
+    return dt.astimezone().replace(tzinfo=None) if dt.tzinfo else dt
+
+
+def _push(event_id: int, start_time: datetime, after: Optional[datetime] = None):
+    """Queue the jobs of one event (caller holds _cond). Jobs due at or before `after` are skipped."""
+    token = next(_tokens)
+    _scheduled[event_id] = (start_time, token)
+    reminder_at = start_time - timedelta(minutes=EVENT_REMINDER_LEAD_MINUTES)
+    if after is None or reminder_at > after:
+        heapq.heappush(_heap, (reminder_at, token, event_id, models.EventReminderKind.REMINDER))
+    heapq.heappush(_heap, (start_time, token, event_id, models.EventReminderKind.STARTING))
+
+
+def schedule(event_id: int, start_time: datetime):
+    """(Re)schedule an event after its start_time was committed. No-op when the scheduler is not running."""
+    if _thread is None:
+        return
+    start_time = _naive(start_time)
+    with _cond:
+        if _loaded_until is not None and start_time >= _loaded_until:
+            # ngoài horizon: lần nạp horizon sau sẽ lấy, chỉ cần bỏ lịch cũ
+            _scheduled.pop(event_id, None)
+            return
+        _push(event_id, start_time)
+        _cond.notify()
+
+
+def cancel(event_id: int):
+    """Drop the pending jobs of a deleted event."""
+    with _cond:
+        _scheduled.pop(event_id, None)
+
+
+def _watermark(db: Session) -> models.SchedulerWatermark:
+    wm = db.query(models.SchedulerWatermark).filter(models.SchedulerWatermark.job_name == JOB_NAME).first()
+    if wm is None:
+        # lần chạy đầu: không nhắc bù cho các event đã qua
+        wm = models.SchedulerWatermark(job_name=JOB_NAME, fired_through=datetime.now())
+        db.add(wm)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return _watermark(db)
+    return wm
+
+
+def _load(db: Session, start: datetime, end: datetime, after: Optional[datetime] = None):
+    """Queue every event starting in [start, end)."""
+    global _loaded_until
+    rows = db.query(models.Event.event_id, models.Event.start_time).filter(
+        models.Event.start_time >= start, models.Event.start_time < end
+    ).all()
+    with _cond:
+        for event_id, start_time in rows:
+            start_time = _naive(start_time)
+            current = _scheduled.get(event_id)
+            if current is None or current[0] != start_time:
+                _push(event_id, start_time, after)
+        _loaded_until = end
+
+
+def _insert_reminders(db: Session, rows: list[dict]):
+    prefix = "OR IGNORE" if db.get_bind().dialect.name == "sqlite" else "IGNORE"
+    db.execute(models.EventReminder.__table__.insert().prefix_with(prefix), rows)
+
+
+def fire(db: Session, event_id: int, kind: models.EventReminderKind) -> int:
+    """Remind the event's GOING / INTERESTED participants, one batch per transaction. Returns users reminded."""
+    participant = models.EventParticipant
+    sent = 0
+    last_user_id = 0
+    while True:
+        user_ids = [
+            user_id
+            for (user_id,) in db.query(participant.user_id)
+            .filter(
+                participant.event_id == event_id,
+                participant.user_id > last_user_id,
+                participant.rsvp_status.in_(REMINDED_STATUSES),
+            )
+            .order_by(participant.user_id)
+            .limit(EVENT_REMINDER_BATCH_SIZE)
+        ]
+        if not user_ids:
+            return sent
+        _insert_reminders(db, [{"event_id": event_id, "user_id": uid, "kind": kind} for uid in user_ids])
+        db.commit()
+        sent += len(user_ids)
+        last_user_id = user_ids[-1]
+
+
+def _pop_due(now: datetime):
+    """Next due, still-current heap entry as (entry, start_time), or None."""
+    with _cond:
+        while _heap and _heap[0][0] <= now:
+            entry = heapq.heappop(_heap)
+            current = _scheduled.get(entry[2])
+            if current is not None and current[1] == entry[1]:
+                return entry, current[0]
+    return None
+
+
+def _done(entry):
+    """Forget an event once its last (STARTING) job has fired."""
+    _, token, event_id, kind = entry
+    if kind == models.EventReminderKind.STARTING:
+        with _cond:
+            if _scheduled.get(event_id, (None, None))[1] == token:
+                del _scheduled[event_id]
+
+
+def run_due(db: Session) -> int:
+    """Fire every job due by now, then advance the watermark. Returns the number of jobs fired."""
+    now = datetime.now()
+    horizon = timedelta(hours=EVENT_SCHEDULER_HORIZON_HOURS)
+    if _loaded_until is None:
+        wm = _watermark(db)
+        _load(db, wm.fired_through, now + horizon, after=wm.fired_through)
+    elif _loaded_until - now < horizon / 2:
+        _load(db, _loaded_until, now + horizon)
+
+    fired = 0
+    while True:
+        job = _pop_due(now)
+        if job is None:
+            break
+        entry, start_time = job
+        event_id, kind = entry[2], entry[3]
+        try:
+            # process khác có thể đã đổi giờ / xóa event này
+            actual = db.query(models.Event.start_time).filter(models.Event.event_id == event_id).scalar()
+            if actual is None:
+                cancel(event_id)
+                continue
+            if _naive(actual) != start_time:
+                with _cond:
+                    _push(event_id, _naive(actual), after=now)
+                continue
+            fire(db, event_id, kind)
+        except Exception:
+            # trả job lại heap; watermark chưa qua nên restart cũng chạy lại
+            with _cond:
+                heapq.heappush(_heap, entry)
+            raise
+        _done(entry)
+        fired += 1
+
+    db.query(models.SchedulerWatermark).filter(models.SchedulerWatermark.job_name == JOB_NAME).update(
+        {models.SchedulerWatermark.fired_through: now}, synchronize_session=False
+    )
+    db.commit()
+    return fired
+
+
+def _sleep_seconds() -> float:
+    now = datetime.now()
+    wait = timedelta(seconds=EVENT_SCHEDULER_MAX_SLEEP_SECONDS)
+    if _heap:
+        wait = min(wait, _heap[0][0] - now)
+    return max(wait.total_seconds(), 0)
+
+
+def _loop():
+    while not _stop.is_set():
+        db = SessionLocal()
+        try:
+            run_due(db)
+        except Exception as e:
+            db.rollback()
+            print(f"WARNING: event scheduler run failed: {e}")
+            # job lỗi đã về heap và đang due: đợi hẳn một nhịp thay vì quay vòng ngay
+            # (schedule() không đánh thức ở đây, chỉ stop())
+            _stop.wait(EVENT_SCHEDULER_MAX_SLEEP_SECONDS)
+            continue
+        finally:
+            db.close()
+        with _cond:
+            if not _stop.is_set():
+                _cond.wait(_sleep_seconds())
+
+
+def start():
+    global _thread
+    if _thread is not None or not EVENT_SCHEDULER_ENABLED:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name="event-scheduler", daemon=True)
+    _thread.start()
+
+
+def stop():
+    global _thread, _loaded_until
+    if _thread is None:
+        return
+    _stop.set()
+    with _cond:
+        _cond.notify()
+    _thread.join(timeout=5)
+    _thread = None
+    with _cond:
+        _heap.clear()
+        _scheduled.clear()
+        _loaded_until = None
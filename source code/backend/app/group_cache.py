@@ -0,0 +1,117 @@
+"""Per-group metadata cache: the group row, its rules and its membership questions.
+
+A miss loads all three at once; PUT /groups/{id} and the group-rules /
+membership-questions endpoints drop the entry, on this worker only. Nothing
+here decides access: privacy_type is read live through privacy(), and
+member_count (it changes with every join) is read live by get_group.
+"""
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from . import models
+from .cache import TTLCache
+
+GROUP_CACHE_TTL_SECONDS = int(os.getenv("GROUP_CACHE_TTL_SECONDS", "300"))
+
+
+class RuleMeta(NamedTuple):
+    rule_id: int
+    title: str
+    details: Optional[str]
+    display_order: int
+
+
+class QuestionMeta(NamedTuple):
+    question_text: str
+    is_required: bool
+
+
+@dataclass(frozen=True)
+class GroupMeta:
+    group_id: int
+    group_name: str
+    description: Optional[str]
+    cover_photo_url: Optional[str]
+    is_visible: bool
+    creator_user_id: int
+    creator_name: Optional[str]
+    created_at: datetime
+    rules: tuple  # RuleMeta theo display_order
+    questions: dict  # question_id -> QuestionMeta
+
+
+_entries = TTLCache(ttl_seconds=GROUP_CACHE_TTL_SECONDS, max_entries=10000)
+
+
+def _load(db: Session, group_id: int) -> Optional[GroupMeta]:
+    row = (
+        db.query(models.Group, models.Profile.first_name, models.Profile.last_name)
+        .outerjoin(models.Profile, models.Profile.user_id == models.Group.creator_user_id)
+        .filter(models.Group.group_id == group_id)
+        .first()
+    )
+    if not row:
+        return None
+    group, first_name, last_name = row
+    rules = db.query(
+        models.GroupRule.rule_id,
+        models.GroupRule.title,
+        models.GroupRule.details,
+        models.GroupRule.display_order,
+    ).filter(models.GroupRule.group_id == group_id).order_by(
+        models.GroupRule.display_order, models.GroupRule.rule_id
+    )
+    questions = db.query(
+        models.MembershipQuestion.question_id,
+        models.MembershipQuestion.question_text,
+        models.MembershipQuestion.is_required,
+    ).filter(models.MembershipQuestion.group_id == group_id).order_by(models.MembershipQuestion.question_id)
+    return GroupMeta(
+        group_id=group.group_id,
+        group_name=group.group_name,
+        description=group.description,
+        cover_photo_url=group.cover_photo_url,
+        is_visible=group.is_visible,
+        creator_user_id=group.creator_user_id,
+        creator_name=f"{first_name} {last_name}".strip() if first_name is not None else None,
+        created_at=group.created_at,
+        rules=tuple(RuleMeta(*r) for r in rules),
+        questions={q.question_id: QuestionMeta(q.question_text, bool(q.is_required)) for q in questions},
+    )
+
+
+def get(db: Session, group_id: int) -> Optional[GroupMeta]:
+    meta = _entries.get(group_id)
+    if meta is None:
+        # không cache group không tồn tại: id đó có thể được tạo ngay sau
+        meta = _load(db, group_id)
+        if meta is not None:
+            _entries.set(group_id, meta)
+    return meta
+
+
+def require(db: Session, group_id: int) -> GroupMeta:
+    """Like get(), but 404 "Group not found" when the group does not exist."""
+    meta = get(db, group_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return meta
+
+
+def privacy(db: Session, group_id: int) -> Optional[models.GroupPrivacy]:
+    """The group's current privacy_type (one PK lookup), or None if it does not exist. Never cached."""
+    return db.query(models.Group.privacy_type).filter(models.Group.group_id == group_id).scalar()
+
+
+def invalidate(group_id: int):
+    _entries.delete(group_id)
+
+
+def child_changed(obj):
+    """register_simple_crud on_change hook for rows carrying a group_id (rules, questions)."""
+    invalidate(obj.group_id)
@@ -1,12 +1,15 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 import os
 
 # Load environment variables from .env file
 load_dotenv()
 
-from . import models
+from . import event_scheduler, media_processing, models, page_analytics, pagination, storage, typeahead, upload_worker, user_activity
 from .database import engine
 from .routes import router
 from .routers import admin
@@ -14,7 +17,26 @@ from .routers import admin
 # Ensure tables exist at startup
 models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="PHO-BO Backend", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background workers live for the lifetime of the API process
+    media_processing.start()
+    upload_worker.start()
+    page_analytics.start()
+    event_scheduler.start()
+    user_activity.start()
+    typeahead.start()
+    yield
+    typeahead.stop()
+    user_activity.stop()
+    event_scheduler.stop()
+    page_analytics.stop()
+    upload_worker.stop()
+    media_processing.stop()
+
+
+app = FastAPI(title="PHO-BO Backend", version="0.1.0", lifespan=lifespan)
 
 # Allow local frontend dev server to send credentials (cookies)
 app.add_middleware(
@@ -23,11 +45,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[pagination.NEXT_CURSOR_HEADER, "X-Stats-Through"],
 )
 
 app.include_router(router, prefix="/api/v1")
 app.include_router(admin.router, prefix="/api/v1")
 
+# Local storage backend: serve uploaded files and their renditions
+if storage.STORAGE_BACKEND == "local":
+    os.makedirs(storage.MEDIA_ROOT, exist_ok=True)
+    app.mount("/media", StaticFiles(directory=storage.MEDIA_ROOT), name="media")
+
 
 @app.get("/", tags=["health"])
 def health_check():
@@ -0,0 +1,185 @@
+"""Maintenance commands for denormalized counters.
+
+Usage:
+    python -m app.maintenance recount-group-members [--group-id ID]
+    python -m app.maintenance recount-page-followers [--page-id ID]
+    python -m app.maintenance recount-event-rsvps [--event-id ID]
+    python -m app.maintenance rollup-page-stats [--through YYYY-MM-DD]
+    python -m app.maintenance backfill-post-sentiment [--post-id ID] [--batch-size N]
+    python -m app.maintenance rollup-user-activity [--through YYYY-MM-DD]
+    python -m app.maintenance index-post-search [--post-id ID] [--batch-size N]
+"""
+
+import argparse
+from datetime import date
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from . import models, page_analytics, post_search, post_sentiment, user_activity
+
+
+def recount_group_members(db: Session, group_id: int | None = None) -> int:
+    """Recompute groups.member_count from group_memberships. Returns the number of groups updated."""
+    joined = (
+        select(func.count())
+        .select_from(models.GroupMembership)
+        .where(
+            models.GroupMembership.group_id == models.Group.group_id,
+            models.GroupMembership.status == models.GroupMemberStatus.JOINED,
+        )
+        .scalar_subquery()
+    )
+    q = db.query(models.Group)
+    if group_id is not None:
+        q = q.filter(models.Group.group_id == group_id)
+    updated = q.update({models.Group.member_count: joined}, synchronize_session=False)
+    db.commit()
+    return updated
+
+
+def recount_page_followers(db: Session, page_id: int | None = None) -> int:
+    """Recompute pages.follower_count from page_follows. Returns the number of pages updated."""
+    followers = (
+        select(func.count())
+        .select_from(models.PageFollow)
+        .where(models.PageFollow.page_id == models.Page.page_id)
+        .scalar_subquery()
+    )
+    q = db.query(models.Page)
+    if page_id is not None:
+        q = q.filter(models.Page.page_id == page_id)
+    updated = q.update({models.Page.follower_count: followers}, synchronize_session=False)
+    db.commit()
+    return updated
+
+
+def recount_event_rsvps(db: Session, event_id: int | None = None) -> int:
+    """Recompute the events.*_count RSVP counters from event_participants. Returns the number of events updated."""
+    def by_status(rsvp_status):
+        return (
+            select(func.count())
+            .select_from(models.EventParticipant)
+            .where(
+                models.EventParticipant.event_id == models.Event.event_id,
+                models.EventParticipant.rsvp_status == rsvp_status,
+            )
+            .scalar_subquery()
+        )
+
+    q = db.query(models.Event)
+    if event_id is not None:
+        q = q.filter(models.Event.event_id == event_id)
+    updated = q.update(
+        {
+            models.Event.going_count: by_status(models.RSVPStatus.GOING),
+            models.Event.interested_count: by_status(models.RSVPStatus.INTERESTED),
+            models.Event.cant_go_count: by_status(models.RSVPStatus.CANT_GO),
+            models.Event.updated_at: models.Event.updated_at,
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+    return updated
+
+
+def _cmd_recount_group_members(args):
+    db = SessionLocal()
+    try:
+        n = recount_group_members(db, args.group_id)
+    finally:
+        db.close()
+    print(f"Recounted members for {n} group(s).")
+
+
+def _cmd_recount_page_followers(args):
+    db = SessionLocal()
+    try:
+        n = recount_page_followers(db, args.page_id)
+    finally:
+        db.close()
+    print(f"Recounted followers for {n} page(s).")
+
+
+def _cmd_recount_event_rsvps(args):
+    db = SessionLocal()
+    try:
+        n = recount_event_rsvps(db, args.event_id)
+    finally:
+        db.close()
+    print(f"Recounted RSVPs for {n} event(s).")
+
+
+def _cmd_rollup_page_stats(args):
+    db = SessionLocal()
+    try:
+        n = page_analytics.run(db, args.through)
+    finally:
+        db.close()
+    print(f"Rolled up page stats for {n} day(s).")
+
+
+def _cmd_backfill_post_sentiment(args):
+    db = SessionLocal()
+    try:
+        n = post_sentiment.backfill(db, args.batch_size, args.post_id)
+    finally:
+        db.close()
+    print(f"Recomputed sentiment for {n} post(s).")
+
+
+def _cmd_rollup_user_activity(args):
+    db = SessionLocal()
+    try:
+        n = user_activity.run(db, args.through)
+    finally:
+        db.close()
+    print(f"Rolled up user activity for {n} day(s).")
+
+
+def _cmd_index_post_search(args):
+    db = SessionLocal()
+    try:
+        n = post_search.backfill(db, args.batch_size, args.post_id)
+    finally:
+        db.close()
+    print(f"Indexed {n} post(s) for search.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill / recompute denormalized data.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("recount-group-members", help="Recompute groups.member_count.")
+    p.add_argument("--group-id", type=int, help="Only this group.")
+    p.set_defaults(func=_cmd_recount_group_members)
+
+    p = sub.add_parser("recount-page-followers", help="Recompute pages.follower_count.")
+    p.add_argument("--page-id", type=int, help="Only this page.")
+    p.set_defaults(func=_cmd_recount_page_followers)
+
+    p = sub.add_parser("recount-event-rsvps", help="Recompute the events RSVP counters.")
+    p.add_argument("--event-id", type=int, help="Only this event.")
+    p.set_defaults(func=_cmd_recount_event_rsvps)
+
+    p = sub.add_parser("rollup-page-stats", help="Roll up page_daily_stats up to a day (default: yesterday).")
+    p.add_argument("--through", type=date.fromisoformat, help="Last day to roll up.")
+    p.set_defaults(func=_cmd_rollup_page_stats)
+
+    p = sub.add_parser("backfill-post-sentiment", help="Recompute posts.sentiment_score from reactions.")
+    p.add_argument("--post-id", type=int, help="Only this post.")
+    p.add_argument("--batch-size", type=int, default=1000, help="Posts per transaction.")
+    p.set_defaults(func=_cmd_backfill_post_sentiment)
+
+    p = sub.add_parser("rollup-user-activity", help="Roll up user_monthly_activity up to a day (default: yesterday).")
+    p.add_argument("--through", type=date.fromisoformat, help="Last day to roll up.")
+    p.set_defaults(func=_cmd_rollup_user_activity)
+
+    p = sub.add_parser("index-post-search", help="Rebuild post_search_terms from posts.text_content.")
+    p.add_argument("--post-id", type=int, help="Only this post.")
+    p.add_argument("--batch-size", type=int, default=1000, help="Posts per transaction.")
+    p.set_defaults(func=_cmd_index_post_search)
+
+    args = parser.parse_args()
+    args.func(args)
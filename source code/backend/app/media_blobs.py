@@ -0,0 +1,151 @@
+"""Content-addressed index of stored upload blobs.
+
+Every File written by upload_media carries the sha256 of its bytes (or
+"md5:<etag>" for objects uploaded straight to Cloudinary). The
+first upload of some content stores the object and inserts a media_blobs row;
+later uploads of the same bytes only bump ref_count and reuse the stored URL.
+Deleting a File releases its reference, and the object is removed from
+storage once nothing points at it any more.
+"""
+import hashlib
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models, storage
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_stream(fileobj) -> tuple[str, int]:
+    """sha256 hex digest and size of a file-like object, read in chunks; rewinds it afterwards."""
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = fileobj.read(HASH_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest(), size
+
+
+def spool(fileobj, path: str) -> tuple[str, int]:
+    """Copy a file-like object to `path` in chunks, hashing on the way. Returns (sha256, size)."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "wb") as out:
+        while True:
+            chunk = fileobj.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def acquire(db: Session, content_hash: str):
+    """Take a reference on an existing blob. Returns the blob, or None if the content is new."""
+    updated = db.query(models.MediaBlob).filter(models.MediaBlob.content_hash == content_hash).update(
+        {models.MediaBlob.ref_count: models.MediaBlob.ref_count + 1},
+        synchronize_session=False,
+    )
+    if not updated:
+        return None
+    return db.query(models.MediaBlob).filter(models.MediaBlob.content_hash == content_hash).first()
+
+
+def register(db: Session, content_hash: str, stored: dict):
+    """
+    Record a freshly stored object with ref_count = 1 (flushed, not committed).
+    If another request stored the same content concurrently, drop our copy
+    and reference theirs instead. Only the insert is rolled back (savepoint),
+    so earlier work in the caller's transaction is kept.
+    """
+    blob = models.MediaBlob(
+        content_hash=content_hash,
+        storage_key=stored["key"],
+        file_url=stored["url"],
+        file_size=stored["bytes"],
+        resource_type=stored.get("resource_type", "raw"),
+        ref_count=1,
+    )
+    try:
+        with db.begin_nested():
+            db.add(blob)
+        return blob
+    except IntegrityError:
+        winner = acquire(db, content_hash)
+        # không bao giờ xoá object mà blob còn lại đang trỏ tới
+        if winner is None or winner.storage_key != stored["key"]:
+            storage.delete(stored["key"], stored.get("resource_type", "raw"))
+        return winner
+
+
+def store(db: Session, content_hash: str, read_bytes, key: str, mime_type: str):
+    """
+    Reference the blob for this content, uploading it first if it is new.
+    `read_bytes()` is only called on a miss. Returns (blob, bytes or None if deduplicated).
+    """
+    blob = acquire(db, content_hash)
+    if blob:
+        return blob, None
+    data = read_bytes()
+    stored = storage.put_bytes(data, key, mime_type)
+    return register(db, content_hash, stored), data
+
+
+def adopt(db: Session, content_hash: str, stored: dict):
+    """
+    Reference an object the client uploaded straight to storage (signed upload).
+    Returns (blob, fresh). When the content was already stored, the new object
+    is redundant: fresh is False and the caller purges stored["key"] after commit.
+    """
+    blob = acquire(db, content_hash)
+    if blob:
+        return blob, False
+    blob = register(db, content_hash, stored)
+    # register() đã tự xoá bản mới nếu thua race
+    return blob, blob.storage_key == stored["key"]
+
+
+def existing_renditions(db: Session, content_hash: str):
+    """thumbnail_url / renditions already generated for this content (by any File), if any."""
+    return (
+        db.query(models.File.thumbnail_url, models.File.renditions)
+        .filter(models.File.content_hash == content_hash, models.File.renditions.isnot(None))
+        .first()
+    )
+
+
+def release(db: Session, file_obj) -> list[tuple[str, str]]:
+    """
+    Drop the File's reference (call before committing its deletion).
+    Returns (key, resource_type) pairs to purge from storage after commit
+    when this was the last reference.
+    """
+    # file PENDING/FAILED chưa giữ reference nào
+    if not file_obj.content_hash or file_obj.status != models.FileStatus.READY:
+        return []
+    db.query(models.MediaBlob).filter(models.MediaBlob.content_hash == file_obj.content_hash).update(
+        {models.MediaBlob.ref_count: models.MediaBlob.ref_count - 1},
+        synchronize_session=False,
+    )
+    blob = db.query(models.MediaBlob).filter(models.MediaBlob.content_hash == file_obj.content_hash).first()
+    if not blob or blob.ref_count > 0:
+        return []
+    stale = [(blob.storage_key, blob.resource_type)]
+    stale += [(r["key"], "image") for r in (file_obj.renditions or []) if r.get("key")]
+    db.delete(blob)
+    return stale
+
+
+def purge(stale: list[tuple[str, str]]):
+    """Best-effort removal of unreferenced objects from storage."""
+    for key, resource_type in stale:
+        try:
+            storage.delete(key, resource_type)
+        except Exception as e:
+            print(f"WARNING: could not delete stored object {key}: {e}")
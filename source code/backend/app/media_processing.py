@@ -0,0 +1,290 @@
+"""Background thumbnail / rendition pipeline for uploaded media.
+
+upload_media enqueues (file_id, bytes, mime_type, content_hash, source_url) jobs; a
+dispatcher thread feeds them to a process pool which resizes images (or
+extracts a poster frame from videos with ffmpeg), stores the renditions and
+hands the metadata back so it can be written to files.thumbnail_url /
+files.renditions of every File sharing that content. Images on the
+Cloudinary backend are skipped: media_urls resizes them with URL
+transformations instead.
+
+A File that needs renditions is committed with renditions_pending set, and
+the flag is cleared when its result is saved. A job dropped because the
+queue was full, cancelled at shutdown or failed stays flagged, and start()
+queues the flagged files again, one job per content. Renditions are keyed
+by content, so a job that another API process is still running and that
+gets redone here only overwrites the same objects.
+"""
+import io
+import multiprocessing
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Optional
+
+from . import storage
+
+try:
+    from PIL import Image, ImageOps, features
+    PIL_ENABLED = True
+    WEBP_ENABLED = features.check("webp")
+except ImportError:
+    PIL_ENABLED = False
+    WEBP_ENABLED = False
+    print("WARNING: Pillow not installed. Thumbnail generation will be disabled.")
+
+FFMPEG_PATH = shutil.which("ffmpeg")
+
+# Chiều rộng các bản resize (px); bản nhỏ nhất >= THUMBNAIL_WIDTH dùng làm thumbnail
+RENDITION_WIDTHS = (160, 320, 640, 1080)
+THUMBNAIL_WIDTH = 320
+JPEG_QUALITY = 80
+WEBP_QUALITY = 75
+# format -> (đuôi file, MIME); JPEG luôn có để làm fallback
+RENDITION_FORMATS = {"jpeg": ("jpg", "image/jpeg")}
+if WEBP_ENABLED:
+    RENDITION_FORMATS["webp"] = ("webp", "image/webp")
+
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "2"))
+MEDIA_QUEUE_SIZE = int(os.getenv("MEDIA_QUEUE_SIZE", "256"))
+
+_jobs: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=MEDIA_QUEUE_SIZE)
+_slots = threading.BoundedSemaphore(MEDIA_WORKERS * 2)
+_pool: Optional[ProcessPoolExecutor] = None
+_dispatcher: Optional[threading.Thread] = None
+
+
+def renditions_in(renditions: Optional[list], fmt: str = "jpeg") -> list:
+    """Renditions of one format, narrowest first."""
+    return sorted((r for r in renditions or [] if r.get("format", "jpeg") == fmt), key=lambda r: r["width"])
+
+
+def pick_rendition(renditions: Optional[list], width: int, fmt: str = "jpeg") -> Optional[dict]:
+    """Smallest rendition at least `width` px wide, else the largest one available."""
+    ordered = renditions_in(renditions, fmt)
+    if not ordered:
+        return None
+    for r in ordered:
+        if r["width"] >= width:
+            return r
+    return ordered[-1]
+
+
+# --- Worker side (runs inside the process pool) ---
+def _extract_poster(data: bytes) -> Optional[bytes]:
+    """Grab a frame ~1s into the video with ffmpeg. Returns JPEG bytes or None."""
+    if not FFMPEG_PATH:
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "source")
+        dst = os.path.join(tmp, "poster.jpg")
+        with open(src, "wb") as fh:
+            fh.write(data)
+        for offset in ("1", "0"):
+            proc = subprocess.run(
+                [FFMPEG_PATH, "-y", "-loglevel", "error", "-ss", offset, "-i", src, "-frames:v", "1", dst],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=60,
+            )
+            if proc.returncode == 0 and os.path.exists(dst) and os.path.getsize(dst) > 0:
+                with open(dst, "rb") as fh:
+                    return fh.read()
+    return None
+
+
+def process_media(
+    file_id: int,
+    data: Optional[bytes],
+    mime_type: str,
+    content_hash: Optional[str] = None,
+    source_url: Optional[str] = None,
+) -> Optional[dict]:
+    """
+    Generate and store renditions for one file. Returns metadata or None if not applicable.
+    Signed uploads never reach the API process, so their bytes are fetched from source_url here.
+    """
+    if not PIL_ENABLED:
+        return None
+    if data is None:
+        data = storage.get_bytes(source_url)
+    if mime_type.startswith("video/"):
+        source = _extract_poster(data)
+        if source is None:
+            return None
+    elif mime_type.startswith("image/"):
+        source = data
+    else:
+        return None
+
+    # renditions đi theo nội dung (dedup), file cũ chưa có hash thì theo file_id
+    prefix = f"renditions/{content_hash or file_id}"
+    renditions = []
+    with Image.open(io.BytesIO(source)) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        widths = [w for w in RENDITION_WIDTHS if w < img.width] or [img.width]
+        for w in widths:
+            h = max(1, round(img.height * w / img.width))
+            resized = img.resize((w, h), Image.LANCZOS)
+            for fmt, (ext, mime) in RENDITION_FORMATS.items():
+                buf = io.BytesIO()
+                if fmt == "webp":
+                    resized.save(buf, "WEBP", quality=WEBP_QUALITY, method=4)
+                else:
+                    resized.save(buf, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+                # format nằm trong tên: Cloudinary bỏ đuôi khỏi public_id, jpg/webp không được trùng key
+                stored = storage.put_bytes(buf.getvalue(), f"{prefix}/w{w}-{fmt}.{ext}", mime)
+                renditions.append({
+                    "width": w,
+                    "height": h,
+                    "format": fmt,
+                    "url": stored["url"],
+                    "key": stored["key"],
+                    "bytes": stored["bytes"],
+                })
+
+    return {
+        "thumbnail_url": pick_rendition(renditions, THUMBNAIL_WIDTH)["url"],
+        "renditions": renditions,
+    }
+
+
+# --- API process side ---
+def applies(mime_type: Optional[str]) -> bool:
+    """Whether files of this type get stored renditions (images and videos; not images on Cloudinary)."""
+    mime_type = mime_type or ""
+    if not PIL_ENABLED or not (mime_type.startswith("image/") or mime_type.startswith("video/")):
+        return False
+    # ảnh trên Cloudinary được resize qua URL (media_urls.cloudinary_url), không cần lưu renditions
+    return not (storage.STORAGE_BACKEND == "cloudinary" and mime_type.startswith("image/"))
+
+
+def _save_result(file_id: int, content_hash: Optional[str], result: Optional[dict]):
+    """Write the renditions (if any) to every File of this content and clear renditions_pending."""
+    from .database import SessionLocal
+    from . import models, timeline_cache
+
+    if content_hash:
+        target = models.File.content_hash == content_hash
+    else:
+        target = models.File.file_id == file_id
+    values = {"renditions_pending": False}
+    if result:
+        values.update(thumbnail_url=result["thumbnail_url"], renditions=result["renditions"])
+    db = SessionLocal()
+    try:
+        db.query(models.File).filter(target).update(values, synchronize_session=False)
+        if result:
+            timeline_cache.invalidate_files(db, [fid for (fid,) in db.query(models.File.file_id).filter(target)])
+        db.commit()
+    finally:
+        db.close()
+
+
+def _on_done(file_id: int, content_hash: Optional[str], future):
+    try:
+        if future.cancelled():
+            # shutdown: renditions_pending vẫn bật, lần start() sau sẽ chạy lại
+            return
+        _save_result(file_id, content_hash, future.result())
+    except Exception as e:
+        print(f"WARNING: media processing failed for file {file_id}: {e}")
+    finally:
+        _slots.release()
+
+
+def _dispatch_loop():
+    while True:
+        job = _jobs.get()
+        if job is None:
+            break
+        _slots.acquire()
+        try:
+            future = _pool.submit(process_media, *job)
+        except RuntimeError:
+            # pool đã shutdown
+            _slots.release()
+            break
+        future.add_done_callback(partial(_on_done, job[0], job[3]))
+
+
+def enqueue(
+    file_id: int,
+    data: Optional[bytes],
+    mime_type: str,
+    content_hash: Optional[str] = None,
+    source_url: Optional[str] = None,
+) -> bool:
+    """
+    Queue a file for rendition generation. Pass either the bytes or, for objects
+    already in storage, data=None and source_url. Returns False if the pipeline is off or full;
+    the file keeps renditions_pending and is queued again at the next start().
+    """
+    if _pool is None or not applies(mime_type):
+        return False
+    try:
+        _jobs.put_nowait((file_id, data, mime_type, content_hash, source_url))
+        return True
+    except queue.Full:
+        print(f"WARNING: media queue full, renditions for file {file_id} deferred to the next restart")
+        return False
+
+
+def _requeue_pending():
+    """Queue the READY files still flagged renditions_pending, one job per content, up to the queue size."""
+    from .database import SessionLocal
+    from . import models
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(models.File.file_id, models.File.file_type, models.File.content_hash, models.File.file_url)
+            .filter(models.File.renditions_pending == True, models.File.status == models.FileStatus.READY)
+            .order_by(models.File.file_id)
+            .limit(MEDIA_QUEUE_SIZE)
+            .all()
+        )
+    finally:
+        db.close()
+    queued = set()
+    for file_id, mime_type, content_hash, file_url in rows:
+        if (content_hash or file_id) in queued:
+            continue
+        if not enqueue(file_id, None, mime_type, content_hash, file_url):
+            break
+        queued.add(content_hash or file_id)
+
+
+def start():
+    global _pool, _dispatcher
+    if _pool is not None or not PIL_ENABLED:
+        return
+    # spawn thay vì fork: process API đang chạy nhiều thread
+    _pool = ProcessPoolExecutor(max_workers=MEDIA_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    _dispatcher = threading.Thread(target=_dispatch_loop, name="media-dispatcher", daemon=True)
+    _dispatcher.start()
+    try:
+        _requeue_pending()
+    except Exception as e:
+        print(f"WARNING: could not requeue pending renditions: {e}")
+
+
+def stop():
+    global _pool, _dispatcher
+    if _pool is None:
+        return
+    try:
+        _jobs.put(None, timeout=5)
+    except queue.Full:
+        pass
+    _dispatcher.join(timeout=5)
+    _pool.shutdown(wait=True, cancel_futures=True)
+    _pool = None
+    _dispatcher = None
@@ -0,0 +1,71 @@
+"""Size- and format-specific delivery URLs for stored media.
+
+Post responses expose, per file, a `preview_url` sized for the requested
+width class plus `srcset` / `srcset_webp` strings for <img srcset> /
+<picture>. Images stored on Cloudinary are resized on the fly with its URL
+transformation syntax; everything else is served from the renditions that
+media_processing pre-generates (JPEG, and WebP when Pillow supports it).
+"""
+from typing import Optional
+
+from fastapi import HTTPException
+
+from .media_processing import RENDITION_WIDTHS, pick_rendition, renditions_in
+
+# width class client gửi lên -> chiều rộng hiển thị (px)
+WIDTH_CLASSES = {"sm": 320, "md": 640, "lg": 1080}
+DEFAULT_WIDTH_CLASS = "md"
+
+CLOUDINARY_HOST = "res.cloudinary.com"
+CLOUDINARY_IMAGE_PATH = "/image/upload/"
+
+
+def width_for(width_class: Optional[str]) -> int:
+    """Pixel width for a width class query param; 400 INVALID_WIDTH_CLASS if unknown."""
+    width = WIDTH_CLASSES.get(width_class or DEFAULT_WIDTH_CLASS)
+    if width is None:
+        raise HTTPException(status_code=400, detail="INVALID_WIDTH_CLASS")
+    return width
+
+
+def _is_cloudinary_image(url: Optional[str]) -> bool:
+    return bool(url) and CLOUDINARY_HOST in url and CLOUDINARY_IMAGE_PATH in url
+
+
+def cloudinary_url(url: str, width: int, fmt: str = "auto") -> str:
+    """Insert a resize transformation into a Cloudinary delivery URL (never upscales)."""
+    transform = f"w_{width},c_limit,q_auto,f_{fmt}"
+    return url.replace(CLOUDINARY_IMAGE_PATH, f"{CLOUDINARY_IMAGE_PATH}{transform}/", 1)
+
+
+def _cloudinary_format(fmt: str) -> str:
+    # bản "mặc định" để Cloudinary tự chọn định dạng theo trình duyệt (f_auto)
+    return "auto" if fmt == "jpeg" else fmt
+
+
+def delivery_url(file_obj, width: int, fmt: str = "jpeg") -> str:
+    """URL to show a file `width` px wide; falls back to the original."""
+    if _is_cloudinary_image(file_obj.file_url):
+        return cloudinary_url(file_obj.file_url, width, _cloudinary_format(fmt))
+    r = pick_rendition(file_obj.renditions, width, fmt) or pick_rendition(file_obj.renditions, width)
+    return r["url"] if r else file_obj.file_url
+
+
+def srcset(file_obj, fmt: str = "jpeg") -> Optional[str]:
+    """`url 320w, url 640w, ...` for the file, or None when there is nothing to choose from."""
+    if _is_cloudinary_image(file_obj.file_url):
+        cl_fmt = _cloudinary_format(fmt)
+        return ", ".join(f"{cloudinary_url(file_obj.file_url, w, cl_fmt)} {w}w" for w in RENDITION_WIDTHS)
+    variants = renditions_in(file_obj.renditions, fmt)
+    if not variants:
+        return None
+    return ", ".join(f"{r['url']} {r['width']}w" for r in variants)
+
+
+def variants(file_obj, width: int) -> dict:
+    """preview_url / srcset / srcset_webp fields for one file in a post response."""
+    return {
+        "preview_url": delivery_url(file_obj, width),
+        "srcset": srcset(file_obj),
+        "srcset_webp": srcset(file_obj, "webp"),
+    }
@@ -8,11 +8,13 @@ from sqlalchemy import (
     DateTime,
     Enum as SAEnum,
     ForeignKey,
+    Index,
     Integer,
     JSON,
     String,
     Text,
     PrimaryKeyConstraint,
+    SmallInteger,
     func,
 )
 
@@ -109,6 +111,11 @@ class RSVPStatus(str, Enum):
     CANT_GO = "CANT_GO"
 
 
+class EventReminderKind(str, Enum):
+    REMINDER = "REMINDER"
+    STARTING = "STARTING"
+
+
 class ReportableType(str, Enum):
     POST = "POST"
     COMMENT = "COMMENT"
@@ -131,6 +138,12 @@ class ReportActionType(str, Enum):
     DISMISS_REPORT = "DISMISS_REPORT"
 
 
+class FileStatus(str, Enum):
+    PENDING = "PENDING"
+    READY = "READY"
+    FAILED = "FAILED"
+
+
 class FriendshipStatus(str, Enum):
     PENDING = "PENDING"
     ACCEPTED = "ACCEPTED"
@@ -192,6 +205,12 @@ class Friendship(Base):
 
 class Post(Base):
     __tablename__ = "posts"
+    # /admin/posts-sentiment: lọc khoảng điểm + ORDER BY sentiment_score, created_at
+    __table_args__ = (
+        Index("ix_posts_sentiment", "sentiment_score", "created_at"),
+        # rollup theo ngày quét posts theo created_at
+        Index("ix_posts_created", "created_at"),
+    )
 
     post_id = Column(BigInteger, primary_key=True, autoincrement=True)
     author_id = Column(BigInteger, nullable=False)
@@ -202,19 +221,42 @@ class Post(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     post_type = Column(SAEnum(PostType), server_default=PostType.ORIGINAL.value)
     parent_post_id = Column(BigInteger, ForeignKey("posts.post_id"))
+    # tổng trọng số reaction (app/post_sentiment.py), cập nhật cùng transaction với reactions
+    sentiment_score = Column(Integer, nullable=False, server_default="0")
 
 
 class PostLocation(Base):
     __tablename__ = "post_locations"
-    __table_args__ = (PrimaryKeyConstraint("post_id", "location_id", "location_type"),)
+    __table_args__ = (
+        PrimaryKeyConstraint("post_id", "location_id", "location_type"),
+        # timeline group/page: WHERE location_type = ? AND location_id = ? ORDER BY post_id DESC
+        Index("ix_post_locations_target", "location_type", "location_id", "post_id"),
+    )
 
     post_id = Column(BigInteger, ForeignKey("posts.post_id"), nullable=False)
     location_id = Column(BigInteger, nullable=False)
     location_type = Column(SAEnum(LocationType), nullable=False)
 
 
+class PostSearchTerm(Base):
+    """Inverted index of post text (app/post_search.py)."""
+    __tablename__ = "post_search_terms"
+    __table_args__ = (
+        # posting list của một từ, post mới trước: WHERE term = ? ORDER BY post_id DESC
+        PrimaryKeyConstraint("term", "post_id"),
+        Index("ix_post_search_terms_post", "post_id"),
+    )
+
+    # utf8mb4_bin: "phở" và "pho" là hai term khác nhau
+    term = Column(String(64).with_variant(String(64, collation="utf8mb4_bin"), "mysql"), nullable=False)
+    post_id = Column(BigInteger, ForeignKey("posts.post_id", ondelete="CASCADE"), nullable=False)
+    tf = Column(SmallInteger, nullable=False)
+
+
 class File(Base):
     __tablename__ = "files"
+    # gallery: WHERE uploader_user_id = ? ORDER BY created_at DESC, file_id DESC
+    __table_args__ = (Index("ix_files_uploader_created", "uploader_user_id", "created_at"),)
 
     file_id = Column(BigInteger, primary_key=True, autoincrement=True)
     uploader_user_id = Column(BigInteger, ForeignKey("users.user_id"), nullable=False)
@@ -223,9 +265,41 @@ class File(Base):
     file_size = Column(Integer, nullable=False)
     file_url = Column(String(255), nullable=False)
     thumbnail_url = Column(String(255))
+    # [{"width", "height", "format", "url", "key", "bytes"}, ...] do media_processing ghi lại
+    renditions = Column(JSON)
+    # renditions chưa làm xong (queue đầy / shutdown); media_processing.start() chạy lại
+    renditions_pending = Column(Boolean, nullable=False, server_default="0", index=True)
+    # sha256 của nội dung; trỏ tới media_blobs khi file được lưu qua upload_media
+    content_hash = Column(String(64), index=True)
+    # PENDING: đã nhận bytes (spool), đang đẩy lên storage ở background
+    status = Column(SAEnum(FileStatus), nullable=False, server_default=FileStatus.READY.value)
+    # lúc một uploader nhận file PENDING (lease, xem upload_worker._claim)
+    upload_claimed_at = Column(DateTime)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class MediaBlob(Base):
+    """One stored object per distinct upload content; files rows reference it by content_hash."""
+    __tablename__ = "media_blobs"
+
+    content_hash = Column(String(64), primary_key=True)
+    storage_key = Column(String(255), nullable=False)
+    file_url = Column(String(255), nullable=False)
+    file_size = Column(Integer, nullable=False)
+    resource_type = Column(String(20), nullable=False, server_default="raw")
+    ref_count = Column(Integer, nullable=False, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
 
+class UploadTicketClaim(Base):
+    """One row per confirmed upload ticket (keyed by the ticket's storage key); a ticket confirms once."""
+    __tablename__ = "upload_ticket_claims"
+
+    storage_key = Column(String(255), primary_key=True)
+    user_id = Column(BigInteger, ForeignKey("users.user_id"), nullable=False)
+    claimed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
 class PostFile(Base):
     __tablename__ = "post_files"
     __table_args__ = (PrimaryKeyConstraint("post_id", "file_id"),)
@@ -237,6 +311,8 @@ class PostFile(Base):
 
 class Comment(Base):
     __tablename__ = "comments"
+    # rollup theo ngày quét comments theo created_at
+    __table_args__ = (Index("ix_comments_created", "created_at"),)
 
     comment_id = Column(BigInteger, primary_key=True, autoincrement=True)
     commenter_user_id = Column(BigInteger, ForeignKey("users.user_id"), nullable=False)
@@ -249,7 +325,12 @@ class Comment(Base):
 
 class Reaction(Base):
     __tablename__ = "reactions"
-    __table_args__ = (PrimaryKeyConstraint("reactor_user_id", "reactable_id", "reactable_type"),)
+    __table_args__ = (
+        PrimaryKeyConstraint("reactor_user_id", "reactable_id", "reactable_type"),
+        Index("ix_reactions_created", "created_at"),
+        # reaction của một post / comment / file (đếm, tính lại sentiment)
+        Index("ix_reactions_target", "reactable_type", "reactable_id", "reaction_type"),
+    )
 
     reactor_user_id = Column(BigInteger, ForeignKey("users.user_id"), nullable=False)
     reactable_id = Column(BigInteger, nullable=False)
@@ -258,6 +339,19 @@ class Reaction(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
 
+class UserSeenPost(Base):
+    """First time a user saw a post (POST /interactions/seen); feeds page reach."""
+    __tablename__ = "user_seen_posts"
+    __table_args__ = (
+        PrimaryKeyConstraint("user_id", "post_id"),
+        Index("ix_user_seen_posts_seen", "seen_at"),
+    )
+
+    user_id = Column(BigInteger, ForeignKey("users.user_id"), nullable=False)
+    post_id = Column(BigInteger, ForeignKey("posts.post_id"), nullable=False)
+    seen_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
 class Page(Base):
     __tablename__ = "pages"
 
@@ -267,6 +361,8 @@ class Page(Base):
     category = Column(String(100))
     description = Column(Text)
     contact_info = Column(JSON)
+    # số người follow; cập nhật cùng statement follow/unfollow (xem _page_follow_changed)
+    follower_count = Column(Integer, nullable=False, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
 
@@ -279,9 +375,57 @@ class PageRole(Base):
     role = Column(SAEnum(PageRoleEnum), nullable=False)
 
 
+class PageDailyStat(Base):
+    """Per-page daily rollup written by app/page_analytics.py; the analytics endpoint reads only this."""
+    __tablename__ = "page_daily_stats"
+    __table_args__ = (PrimaryKeyConstraint("page_id", "day"),)
+
+    page_id = Column(BigInteger, ForeignKey("pages.page_id"), nullable=False)
+    day = Column(Date, nullable=False)
+    new_followers = Column(Integer, nullable=False, server_default="0")
+    posts = Column(Integer, nullable=False, server_default="0")
+    reactions_like = Column(Integer, nullable=False, server_default="0")
+    reactions_love = Column(Integer, nullable=False, server_default="0")
+    reactions_haha = Column(Integer, nullable=False, server_default="0")
+    reactions_sad = Column(Integer, nullable=False, server_default="0")
+    reactions_angry = Column(Integer, nullable=False, server_default="0")
+    comments = Column(Integer, nullable=False, server_default="0")
+    reach = Column(Integer, nullable=False, server_default="0")
+
+
+class UserMonthlyActivity(Base):
+    """Per-user monthly rollup written by app/user_activity.py; /admin/stats reads only this."""
+    __tablename__ = "user_monthly_activity"
+    __table_args__ = (
+        PrimaryKeyConstraint("user_id", "month"),
+        # /admin/stats: khoảng tháng rồi gom theo user
+        Index("ix_user_monthly_activity_month", "month", "user_id"),
+    )
+
+    user_id = Column(BigInteger, ForeignKey("users.user_id"), nullable=False)
+    month = Column(Date, nullable=False)  # ngày 1 của tháng
+    original_posts = Column(Integer, nullable=False, server_default="0")
+    shares = Column(Integer, nullable=False, server_default="0")
+    comments = Column(Integer, nullable=False, server_default="0")
+    reactions_given = Column(Integer, nullable=False, server_default="0")
+
+
+class RollupWatermark(Base):
+    """Last fully rolled-up day of each background rollup job."""
+    __tablename__ = "rollup_watermarks"
+
+    job_name = Column(String(50), primary_key=True)
+    through_day = Column(Date, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
 class PageFollow(Base):
     __tablename__ = "page_follows"
-    __table_args__ = (PrimaryKeyConstraint("user_id", "page_id"),)
+    # danh sách follower của page: WHERE page_id ORDER BY followed_at DESC
+    __table_args__ = (
+        PrimaryKeyConstraint("user_id", "page_id"),
+        Index("ix_page_follows_page_followed", "page_id", "followed_at"),
+    )
 
     user_id = Column(BigInteger, ForeignKey("users.user_id"), nullable=False)
     page_id = Column(BigInteger, ForeignKey("pages.page_id"), nullable=False)
@@ -290,6 +434,8 @@ class PageFollow(Base):
 
 class Group(Base):
     __tablename__ = "groups"
+    # thư mục /groups: WHERE is_visible ORDER BY member_count DESC
+    __table_args__ = (Index("ix_groups_visible_members", "is_visible", "member_count"),)
 
     group_id = Column(BigInteger, primary_key=True, autoincrement=True)
     creator_user_id = Column(BigInteger, ForeignKey("users.user_id"), nullable=False)
@@ -298,12 +444,19 @@ class Group(Base):
     cover_photo_url = Column(String(255))
     privacy_type = Column(SAEnum(GroupPrivacy), nullable=False)
     is_visible = Column(Boolean, nullable=False, server_default="1")
+    # số thành viên JOINED; cập nhật cùng transaction với group_memberships (xem _membership_changed)
+    member_count = Column(Integer, nullable=False, server_default="0")
+    # tăng mỗi lần các card trên timeline group đổi (xem timeline_cache)
+    timeline_version = Column(Integer, nullable=False, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
 
 class GroupMembership(Base):
     __tablename__ = "group_memberships"
-    __table_args__ = (PrimaryKeyConstraint("user_id", "group_id"),)
+    __table_args__ = (
+        PrimaryKeyConstraint("user_id", "group_id"),
+        Index("ix_group_memberships_group_status_joined", "group_id", "status", "joined_at"),
+    )
 
     user_id = Column(BigInteger, ForeignKey("users.user_id"), nullable=False)
     group_id = Column(BigInteger, ForeignKey("groups.group_id"), nullable=False)
@@ -343,6 +496,8 @@ class MembershipAnswer(Base):
 
 class Event(Base):
     __tablename__ = "events"
+    # danh sách event: keyset theo (start_time, event_id)
+    __table_args__ = (Index("ix_events_start", "start_time", "event_id"),)
 
     event_id = Column(BigInteger, primary_key=True, autoincrement=True)
     host_id = Column(BigInteger, nullable=False)
@@ -353,6 +508,12 @@ class Event(Base):
     end_time = Column(DateTime(timezone=True))
     location_text = Column(Text)
     privacy_setting = Column(SAEnum(EventPrivacy), nullable=False)
+    # counter theo rsvp_status, API cập nhật cùng transaction với event_participants
+    going_count = Column(Integer, nullable=False, server_default="0")
+    interested_count = Column(Integer, nullable=False, server_default="0")
+    cant_go_count = Column(Integer, nullable=False, server_default="0")
+    # đổi khi sửa event (ETag của calendar feed); không đổi theo counter
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
 
 class EventPublication(Base):
@@ -368,7 +529,13 @@ class EventPublication(Base):
 
 class EventParticipant(Base):
     __tablename__ = "event_participants"
-    __table_args__ = (PrimaryKeyConstraint("event_id", "user_id"),)
+    __table_args__ = (
+        PrimaryKeyConstraint("event_id", "user_id"),
+        # danh sách participant: keyset theo (updated_at, user_id), có thể lọc theo status
+        Index("ix_event_participants_event_status_updated", "event_id", "rsvp_status", "updated_at"),
+        # calendar feed của một user: lọc status, MAX(updated_at) cho ETag đọc từ index
+        Index("ix_event_participants_user_status_updated", "user_id", "rsvp_status", "updated_at"),
+    )
 
     event_id = Column(BigInteger, ForeignKey("events.event_id"), nullable=False)
     user_id = Column(BigInteger, ForeignKey("users.user_id"), nullable=False)
@@ -376,6 +543,41 @@ class EventParticipant(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
 
+class EventReminder(Base):
+    """Reminder delivered by app/event_scheduler.py to a GOING / INTERESTED participant."""
+    __tablename__ = "event_reminders"
+    __table_args__ = (
+        # mỗi participant nhận mỗi loại nhắc một lần, kể cả khi job chạy lại
+        Index("ux_event_reminders_event_user_kind", "event_id", "user_id", "kind", unique=True),
+        Index("ix_event_reminders_user_created", "user_id", "created_at"),
+    )
+
+    reminder_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    event_id = Column(BigInteger, ForeignKey("events.event_id"), nullable=False)
+    user_id = Column(BigInteger, ForeignKey("users.user_id"), nullable=False)
+    kind = Column(SAEnum(EventReminderKind), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class SchedulerWatermark(Base):
+    """Time up to which every job of an in-process scheduler has fired."""
+    __tablename__ = "scheduler_watermarks"
+
+    job_name = Column(String(50), primary_key=True)
+    fired_through = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class TypeaheadChange(Base):
+    """A person / page / group whose typeahead entry changed; every API worker re-reads it (app/typeahead.py)."""
+    __tablename__ = "typeahead_changes"
+
+    change_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    entity_type = Column(String(10), nullable=False)  # USER | PAGE | GROUP
+    entity_id = Column(BigInteger, nullable=False)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+
 class ReportReason(Base):
     __tablename__ = "report_reasons"
 
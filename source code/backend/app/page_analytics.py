@@ -0,0 +1,203 @@
+"""Daily per-page analytics rollups (page_daily_stats).
+
+A background thread rolls up every finished day after the job's
+rollup_watermarks entry: new followers, posts, reactions by type, comments
+and reach (distinct users who first saw one of the page's posts that day).
+Each day costs one GROUP BY query per metric over that day's rows only, and
+is written in the same transaction that advances the watermark, so a crash
+or a second API worker never counts a day twice. GET /pages/{id}/analytics
+reads the rollup table only.
+
+    python -m app.maintenance rollup-page-stats
+"""
+import os
+import threading
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from sqlalchemy import distinct, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+
+JOB_NAME = "page_daily_stats"
+PAGE_ANALYTICS_ENABLED = os.getenv("PAGE_ANALYTICS_ENABLED", "1") == "1"
+PAGE_ANALYTICS_INTERVAL_SECONDS = int(os.getenv("PAGE_ANALYTICS_INTERVAL_SECONDS", "3600"))
+# lần chạy đầu (chưa có watermark) chỉ tính lại chừng này ngày
+PAGE_ANALYTICS_BACKFILL_DAYS = int(os.getenv("PAGE_ANALYTICS_BACKFILL_DAYS", "30"))
+
+REACTION_COLUMNS = {
+    models.ReactionType.LIKE: "reactions_like",
+    models.ReactionType.LOVE: "reactions_love",
+    models.ReactionType.HAHA: "reactions_haha",
+    models.ReactionType.SAD: "reactions_sad",
+    models.ReactionType.ANGRY: "reactions_angry",
+}
+
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def _day_stats(db: Session, day: date) -> dict:
+    """{page_id: {column: count}} for one day."""
+    start = datetime.combine(day, time.min)
+    end = start + timedelta(days=1)
+    page_posts = (
+        select(models.PostLocation.post_id, models.PostLocation.location_id.label("page_id"))
+        .where(models.PostLocation.location_type == models.LocationType.PAGE_TIMELINE)
+        .subquery()
+    )
+    stats = defaultdict(dict)
+
+    followers = db.query(models.PageFollow.page_id, func.count()).filter(
+        models.PageFollow.followed_at >= start, models.PageFollow.followed_at < end
+    ).group_by(models.PageFollow.page_id)
+    for page_id, n in followers:
+        stats[page_id]["new_followers"] = n
+
+    posts = db.query(page_posts.c.page_id, func.count()).join(
+        models.Post, models.Post.post_id == page_posts.c.post_id
+    ).filter(models.Post.created_at >= start, models.Post.created_at < end).group_by(page_posts.c.page_id)
+    for page_id, n in posts:
+        stats[page_id]["posts"] = n
+
+    reactions = db.query(page_posts.c.page_id, models.Reaction.reaction_type, func.count()).select_from(models.Reaction).join(
+        page_posts, page_posts.c.post_id == models.Reaction.reactable_id
+    ).filter(
+        models.Reaction.reactable_type == models.ReactionTargetType.POST,
+        models.Reaction.created_at >= start,
+        models.Reaction.created_at < end,
+    ).group_by(page_posts.c.page_id, models.Reaction.reaction_type)
+    for page_id, reaction_type, n in reactions:
+        stats[page_id][REACTION_COLUMNS[models.ReactionType(reaction_type)]] = n
+
+    comments = db.query(page_posts.c.page_id, func.count()).select_from(models.Comment).join(
+        page_posts, page_posts.c.post_id == models.Comment.commentable_id
+    ).filter(
+        models.Comment.commentable_type == models.CommentableType.POST,
+        models.Comment.created_at >= start,
+        models.Comment.created_at < end,
+    ).group_by(page_posts.c.page_id)
+    for page_id, n in comments:
+        stats[page_id]["comments"] = n
+
+    reach = db.query(page_posts.c.page_id, func.count(distinct(models.UserSeenPost.user_id))).select_from(models.UserSeenPost).join(
+        page_posts, page_posts.c.post_id == models.UserSeenPost.post_id
+    ).filter(
+        models.UserSeenPost.seen_at >= start, models.UserSeenPost.seen_at < end
+    ).group_by(page_posts.c.page_id)
+    for page_id, n in reach:
+        stats[page_id]["reach"] = n
+
+    return stats
+
+
+def rollup_day(db: Session, day: date):
+    """Replace the rollup rows of one day (does not commit)."""
+    db.query(models.PageDailyStat).filter(models.PageDailyStat.day == day).delete(synchronize_session=False)
+    rows = [{"page_id": page_id, "day": day, **counts} for page_id, counts in _day_stats(db, day).items()]
+    if rows:
+        db.execute(models.PageDailyStat.__table__.insert(), rows)
+
+
+def run(db: Session, through: Optional[date] = None) -> int:
+    """
+    Roll up every finished day after the watermark, one transaction per day.
+    Returns the number of days rolled up.
+    """
+    through = through or date.today() - timedelta(days=1)
+    done = 0
+    while True:
+        # khóa dòng watermark: worker khác chờ tới khi ngày này xong
+        wm = db.query(models.RollupWatermark).filter(
+            models.RollupWatermark.job_name == JOB_NAME
+        ).with_for_update().first()
+        if wm is None:
+            wm = models.RollupWatermark(
+                job_name=JOB_NAME,
+                through_day=through - timedelta(days=PAGE_ANALYTICS_BACKFILL_DAYS),
+            )
+            db.add(wm)
+            try:
+                db.flush()
+            except IntegrityError:
+                db.rollback()
+                continue
+        day = wm.through_day + timedelta(days=1)
+        if day > through:
+            db.commit()
+            return done
+        rollup_day(db, day)
+        wm.through_day = day
+        db.commit()
+        done += 1
+
+
+def through_day(db: Session) -> Optional[date]:
+    """Last rolled-up day (None before the first run)."""
+    return db.query(models.RollupWatermark.through_day).filter(
+        models.RollupWatermark.job_name == JOB_NAME
+    ).scalar()
+
+
+def series(db: Session, page_id: int, start: date, end: date) -> list[dict]:
+    """Daily points for start..end from page_daily_stats; days without activity are zero."""
+    rows = {
+        r.day: r
+        for r in db.query(models.PageDailyStat).filter(
+            models.PageDailyStat.page_id == page_id,
+            models.PageDailyStat.day >= start,
+            models.PageDailyStat.day <= end,
+        )
+    }
+    points = []
+    day = start
+    while day <= end:
+        r = rows.get(day)
+        points.append({
+            "day": day,
+            "new_followers": r.new_followers if r else 0,
+            "posts": r.posts if r else 0,
+            "reactions": {
+                reaction_type.value: getattr(r, column) if r else 0
+                for reaction_type, column in REACTION_COLUMNS.items()
+            },
+            "comments": r.comments if r else 0,
+            "reach": r.reach if r else 0,
+        })
+        day += timedelta(days=1)
+    return points
+
+
+def _loop():
+    while not _stop.is_set():
+        db = SessionLocal()
+        try:
+            run(db)
+        except Exception as e:
+            db.rollback()
+            print(f"WARNING: page analytics rollup failed: {e}")
+        finally:
+            db.close()
+        _stop.wait(PAGE_ANALYTICS_INTERVAL_SECONDS)
+
+
+def start():
+    global _thread
+    if _thread is not None or not PAGE_ANALYTICS_ENABLED:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name="page-analytics", daemon=True)
+    _thread.start()
+
+
+def stop():
+    global _thread
+    if _thread is None:
+        return
+    _stop.set()
+    _thread.join(timeout=5)
+    _thread = None
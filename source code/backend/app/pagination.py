@@ -0,0 +1,79 @@
+"""Opaque keyset cursors for list endpoints.
+
+A cursor encodes the sort key of the last row of a page; the next request
+continues strictly after it. Endpoints keep returning plain JSON arrays and
+send the cursor for the following page in the X-Next-Cursor response header
+(absent on the last page).
+"""
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 100
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "value"):  # Enum
+        return value.value
+    return value
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None, *parsers):
+    """
+    Decode a cursor into a list of values, applying one parser per position
+    (e.g. datetime.fromisoformat, int). Returns None when no cursor was given.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(values) != len(parsers):
+            raise ValueError("cursor arity")
+        return [parse(v) if v is not None else None for parse, v in zip(parsers, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="INVALID_CURSOR")
+
+
+def parse_datetime(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def keyset_before(sort_col, id_col, sort_value, id_value):
+    """Rows strictly after (sort_value, id_value) in `ORDER BY sort_col DESC, id_col DESC`."""
+    return or_(sort_col < sort_value, and_(sort_col == sort_value, id_col < id_value))
+
+
+def keyset_after(sort_col, id_col, sort_value, id_value):
+    """Rows strictly after (sort_value, id_value) in `ORDER BY sort_col ASC, id_col ASC`."""
+    return or_(sort_col > sort_value, and_(sort_col == sort_value, id_col > id_value))
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def set_next_cursor(response: Response, *values):
+    response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*values)
+
+
+def paginate(response: Response, rows: list, limit: int, key) -> list:
+    """
+    Trim a `limit + 1` fetch to `limit` rows and set X-Next-Cursor from
+    `key(last_row)` when another page exists.
+    """
+    page = rows[:limit]
+    if len(rows) > limit and page:
+        set_next_cursor(response, *key(page[-1]))
+    return page
@@ -0,0 +1,194 @@
+"""Post search: an inverted index of post text (post_search_terms).
+
+Text is lowercased and split into words. Each word is stored diacritic-folded
+("phở", "phố" -> "pho", "đi" -> "di"), and also as written when it carries
+Vietnamese marks, with its term frequency. A query matches posts that
+contain every folded word; the accented forms only add to the score, so
+"pho" finds every spelling and "phở" ranks "phở" above "phố". InnoDB
+FULLTEXT is no substitute here: it drops words shorter than
+innodb_ft_min_token_size (3), and most Vietnamese syllables are 1-3 letters.
+
+Ranking is sum(tf * idf) in integer points. Document frequencies are counted
+on the term's posting list, capped at POST_SEARCH_DF_CAP rows. Candidates
+are the newest POST_SEARCH_MAX_CANDIDATES posts of the query's rarest word
+that the caller's visibility condition lets through (a PK range scan on
+the posting list, joined to posts), so the cost of a query does not grow
+with the index and posts the viewer cannot see never use up the window.
+
+create_post / share_post index the post and DELETE /posts/{id} removes it,
+in the same transaction as the post. The admin text filter uses this index
+too, on every database.
+
+    python -m app.maintenance index-post-search
+"""
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+POST_SEARCH_MAX_CANDIDATES = int(os.getenv("POST_SEARCH_MAX_CANDIDATES", "2000"))
+POST_SEARCH_DF_CAP = int(os.getenv("POST_SEARCH_DF_CAP", "100000"))
+MAX_QUERY_WORDS = 8
+MAX_TERM_LENGTH = 64
+# một từ lặp nhiều lần trong post không kéo điểm lên mãi
+MAX_TF = 5
+# trọng số của dạng có dấu so với idf của nó
+ACCENT_WEIGHT = 0.5
+
+_WORD = re.compile(r"\w+")
+
+
+def fold(word: str) -> str:
+    """Lowercase and strip diacritics: "Phở" -> "pho", "Đà" -> "da"."""
+    decomposed = unicodedata.normalize("NFD", word.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).replace("đ", "d")
+
+
+def _words(text: str) -> list[tuple[str, str]]:
+    """[(word as written, folded)] of a text, lowercased and NFC-normalized."""
+    words = []
+    for word in _WORD.findall(unicodedata.normalize("NFC", text.lower())):
+        word = word[:MAX_TERM_LENGTH]
+        words.append((word, fold(word)[:MAX_TERM_LENGTH]))
+    return words
+
+
+def terms(text: Optional[str]) -> Counter:
+    """Index terms of a text with their frequencies: folded words, plus accented words as written."""
+    counts = Counter()
+    for word, folded in _words(text or ""):
+        counts[folded] += 1
+        if word != folded:
+            counts[word] += 1
+    return counts
+
+
+def query_terms(q: str) -> tuple[list[str], list[str]]:
+    """(required folded terms, optional accented terms) of a search query."""
+    required, accented = [], []
+    for word, folded in _words(q)[:MAX_QUERY_WORDS]:
+        if folded not in required:
+            required.append(folded)
+        if word != folded and word not in accented:
+            accented.append(word)
+    return required, accented
+
+
+def index_post(db: Session, post_id: int, text: Optional[str]):
+    """(Re)index one post; call before the post's commit."""
+    table = models.PostSearchTerm.__table__
+    db.execute(table.delete().where(table.c.post_id == post_id))
+    rows = [{"term": term, "post_id": post_id, "tf": min(n, MAX_TF)} for term, n in terms(text).items()]
+    if rows:
+        db.execute(table.insert(), rows)
+
+
+def unindex_post(db: Session, post_id: int):
+    table = models.PostSearchTerm.__table__
+    db.execute(table.delete().where(table.c.post_id == post_id))
+
+
+def _doc_frequency(db: Session, term: str) -> int:
+    t = models.PostSearchTerm
+    postings = select(t.post_id).where(t.term == term).limit(POST_SEARCH_DF_CAP).subquery()
+    return db.execute(select(func.count()).select_from(postings)).scalar()
+
+
+def scored_subquery(db: Session, q: str, visible=None):
+    """
+    Subquery (post_id, score) of the posts matching every word of q, or None
+    when nothing can match (empty query, a word no post contains).
+    `visible` is an optional condition on models.Post applied while choosing candidates.
+    """
+    required, accented = query_terms(q)
+    if not required:
+        return None
+    df = {term: _doc_frequency(db, term) for term in required + accented}
+    if not all(df[term] for term in required):
+        return None
+    total = max(db.query(func.max(models.Post.post_id)).scalar() or 1, max(df.values()))
+
+    # điểm nguyên để cursor (score, post_id) so sánh chính xác
+    weights = {}
+    for term in required:
+        weights[term] = round(100 * math.log(1 + total / df[term]))
+    for term in accented:
+        if df[term]:
+            weights[term] = round(100 * ACCENT_WEIGHT * math.log(1 + total / df[term]))
+
+    t = models.PostSearchTerm
+    rarest = min(required, key=lambda term: df[term])
+    candidates = select(t.post_id).where(t.term == rarest)
+    if visible is not None:
+        # lọc quyền xem trước LIMIT, không thì post ẩn chiếm hết cửa sổ ứng viên
+        candidates = candidates.join(models.Post, models.Post.post_id == t.post_id).where(visible)
+    candidates = candidates.order_by(t.post_id.desc()).limit(POST_SEARCH_MAX_CANDIDATES).subquery("candidates")
+    score = func.sum(case(*[(t.term == term, w) for term, w in weights.items()], else_=0) * t.tf)
+    matched = func.sum(case((t.term.in_(required), 1), else_=0))
+    return (
+        select(t.post_id, score.label("score"))
+        .join(candidates, candidates.c.post_id == t.post_id)
+        .where(t.term.in_(list(weights)))
+        .group_by(t.post_id)
+        .having(matched == len(required))
+        .subquery("scored")
+    )
+
+
+def text_filter(q: str, post_id_column: str = "p.post_id"):
+    """
+    (SQL condition, params) matching posts that contain every folded word of
+    q, for raw-SQL queries. Goes through post_search_terms on every database,
+    so short syllables ("đi", "ở") match the same as in /posts/search.
+    """
+    required, _ = query_terms(q)
+    if not required:
+        return "1 = 0", {}
+    names = [f"search_term_{i}" for i in range(len(required))]
+    condition = (
+        f"{post_id_column} IN (SELECT post_id FROM post_search_terms"
+        f" WHERE term IN ({', '.join(':' + n for n in names)})"
+        f" GROUP BY post_id HAVING COUNT(*) = {len(required)})"
+    )
+    return condition, dict(zip(names, required))
+
+
+def backfill(db: Session, batch_size: int = 1000, post_id: Optional[int] = None) -> int:
+    """Rebuild the index from posts.text_content, batch_size posts per transaction. Returns posts indexed."""
+    if post_id is not None:
+        text = db.query(models.Post.text_content).filter(models.Post.post_id == post_id).scalar()
+        index_post(db, post_id, text)
+        db.commit()
+        return 1
+
+    indexed = 0
+    last_id = 0
+    while True:
+        batch = (
+            db.query(models.Post.post_id, models.Post.text_content)
+            .filter(models.Post.post_id > last_id)
+            .order_by(models.Post.post_id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            return indexed
+        table = models.PostSearchTerm.__table__
+        db.execute(table.delete().where(table.c.post_id > last_id, table.c.post_id <= batch[-1][0]))
+        rows = [
+            {"term": term, "post_id": pid, "tf": min(n, MAX_TF)}
+            for pid, text in batch
+            for term, n in terms(text).items()
+        ]
+        if rows:
+            db.execute(table.insert(), rows)
+        db.commit()
+        indexed += len(batch)
+        last_id = batch[-1][0]
@@ -0,0 +1,84 @@
+"""Stored post sentiment scores (posts.sentiment_score).
+
+The score is the weighted sum of the post's reactions, with the weights of
+the func_calculate_post_sentiment SQL function. The reaction write paths
+apply each change as a delta in the same transaction, so
+GET /admin/posts-sentiment filters and sorts on an indexed column instead
+of calling the function per post.
+
+    python -m app.maintenance backfill-post-sentiment
+"""
+from typing import Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+WEIGHTS = {
+    models.ReactionType.LOVE: 3,
+    models.ReactionType.LIKE: 1,
+    models.ReactionType.HAHA: 1,
+    models.ReactionType.SAD: -1,
+    models.ReactionType.ANGRY: -2,
+}
+
+
+def reaction_changed(db: Session, reactable_type, reactable_id: int, old_type, new_type):
+    """Apply one reaction insert / change / delete to the post's score; call before commit."""
+    if models.ReactionTargetType(reactable_type) != models.ReactionTargetType.POST:
+        return
+    delta = (WEIGHTS[models.ReactionType(new_type)] if new_type is not None else 0) - (
+        WEIGHTS[models.ReactionType(old_type)] if old_type is not None else 0
+    )
+    if delta:
+        db.query(models.Post).filter(models.Post.post_id == reactable_id).update(
+            {models.Post.sentiment_score: models.Post.sentiment_score + delta},
+            synchronize_session=False,
+        )
+
+
+def _score_of_post():
+    weight = case(
+        *[(models.Reaction.reaction_type == reaction_type, w) for reaction_type, w in WEIGHTS.items()],
+        else_=0,
+    )
+    return (
+        select(func.coalesce(func.sum(weight), 0))
+        .where(
+            models.Reaction.reactable_type == models.ReactionTargetType.POST,
+            models.Reaction.reactable_id == models.Post.post_id,
+        )
+        .scalar_subquery()
+    )
+
+
+def backfill(db: Session, batch_size: int = 1000, post_id: Optional[int] = None) -> int:
+    """Recompute the scores from reactions, batch_size posts per transaction. Returns the number of posts updated."""
+    score = _score_of_post()
+    if post_id is not None:
+        updated = db.query(models.Post).filter(models.Post.post_id == post_id).update(
+            {models.Post.sentiment_score: score}, synchronize_session=False
+        )
+        db.commit()
+        return updated
+
+    updated = 0
+    last_id = 0
+    while True:
+        # post_id cuối của batch tiếp theo, đi theo PK
+        batch = (
+            select(models.Post.post_id)
+            .where(models.Post.post_id > last_id)
+            .order_by(models.Post.post_id)
+            .limit(batch_size)
+            .subquery()
+        )
+        upper = db.execute(select(func.max(batch.c.post_id))).scalar()
+        if upper is None:
+            return updated
+        updated += db.query(models.Post).filter(
+            models.Post.post_id > last_id, models.Post.post_id <= upper
+        ).update({models.Post.sentiment_score: score}, synchronize_session=False)
+        db.commit()
+        last_id = upper
@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import csv
+import io
+import json
+from collections import defaultdict
+from itertools import groupby
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 from sqlalchemy.exc import SQLAlchemyError
 from pydantic import BaseModel
+from datetime import date
 from typing import Optional
 
-from ..database import get_db
+from .. import pagination, post_search, typeahead, user_activity
+from ..database import SessionLocal, get_db
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -25,46 +34,172 @@ class UpdateUserRequest(BaseModel):
     role_id: Optional[int] = None
 
 
+EXPORT_BATCH_SIZE = 500
+EXPORT_COLUMNS = ["id", "email", "phone", "is_active", "created_at", "last_login", "roles", "primary_role_id"]
+
+
+def _user_filters(email: Optional[str], role_id: Optional[int], is_active: Optional[bool]):
+    """SQL conditions + params for the user list / export filters."""
+    conditions = []
+    params = {}
+    if email:
+        # tiền tố: còn dùng được ix_users_email
+        conditions.append("u.email LIKE :email_prefix")
+        params["email_prefix"] = email.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    if role_id is not None:
+        conditions.append("EXISTS (SELECT 1 FROM user_roles fr WHERE fr.user_id = u.user_id AND fr.role_id = :role_id)")
+        params["role_id"] = role_id
+    if is_active is not None:
+        conditions.append("u.is_active = :is_active")
+        params["is_active"] = is_active
+    return conditions, params
+
+
+def _user_row(row, roles: list) -> dict:
+    """roles: [(role_id, role_name)] of the user."""
+    roles = sorted(roles, key=lambda r: r[1])
+    return {
+        # Frontend expects these keys
+        "id": row.user_id,
+        "email": row.email,
+        "phone": row.phone_number,
+        "is_active": bool(row.is_active),
+        "created_at": str(row.created_at) if row.created_at else None,
+        "last_login": str(row.last_login) if row.last_login else None,
+        "roles": ", ".join(name for _, name in roles) or None,
+        "primary_role_id": int(min(rid for rid, _ in roles)) if roles else None,
+    }
+
+
 @router.get("/users")
-def list_users(db: Session = Depends(get_db)):
-    """List all users with their roles (aggregated) from the database."""
+def list_users(
+    response: Response,
+    email: Optional[str] = Query(default=None, description="email prefix"),
+    role_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """List users with their roles, by user_id.
+    Filters: email prefix, role, active flag. Keyset-paginated, next page cursor in the X-Next-Cursor header.
+    """
+    limit = pagination.clamp_limit(limit)
+    conditions, params = _user_filters(email, role_id, is_active)
+    after = pagination.decode_cursor(cursor, int)
+    if after:
+        conditions.append("u.user_id > :after_id")
+        params["after_id"] = after[0]
+    where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
     try:
-        result = db.execute(text(
-            """
-            SELECT 
-                u.user_id,
-                u.email,
-                u.phone_number,
-                u.is_active,
-                u.created_at,
-                u.last_login,
-                GROUP_CONCAT(r.role_name ORDER BY r.role_name SEPARATOR ', ') AS roles,
-                MIN(r.role_id) AS primary_role_id
-            FROM users u
-            LEFT JOIN user_roles ur ON ur.user_id = u.user_id
-            LEFT JOIN roles r ON r.role_id = ur.role_id
-            GROUP BY u.user_id
-            """
-        ))
-        users = []
-        for row in result:
-            users.append({
-                # Frontend expects these keys
-                "id": row.user_id,
-                "email": row.email,
-                "phone": row.phone_number,
-                "is_active": bool(row.is_active),
-                "created_at": str(row.created_at) if row.created_at else None,
-                "last_login": str(row.last_login) if row.last_login else None,
-                # New: roles display and primary role id for preselect
-                "roles": getattr(row, 'roles', None),
-                "primary_role_id": int(row.primary_role_id) if getattr(row, 'primary_role_id', None) is not None else None,
-            })
-        return users
+        rows = db.execute(
+            text(
+                f"""
+                SELECT u.user_id, u.email, u.phone_number, u.is_active, u.created_at, u.last_login
+                FROM users u
+                {where}
+                ORDER BY u.user_id
+                LIMIT :limit
+                """
+            ),
+            {**params, "limit": limit + 1},
+        ).all()
+        rows = pagination.paginate(response, rows, limit, lambda r: (r.user_id,))
+
+        # role của cả trang trong một query
+        roles = defaultdict(list)
+        if rows:
+            role_rows = db.execute(
+                text(
+                    """
+                    SELECT ur.user_id, r.role_id, r.role_name
+                    FROM user_roles ur
+                    JOIN roles r ON r.role_id = ur.role_id
+                    WHERE ur.user_id IN :user_ids
+                    """
+                ).bindparams(bindparam("user_ids", expanding=True)),
+                {"user_ids": [r.user_id for r in rows]},
+            )
+            for user_id, rid, role_name in role_rows:
+                roles[user_id].append((rid, role_name))
+        return [_user_row(row, roles[row.user_id]) for row in rows]
     except SQLAlchemyError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+def _export_rows(conditions: list, params: dict):
+    """Users with their roles, streamed in user_id order through a server-side cursor (own session)."""
+    where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            text(
+                f"""
+                SELECT u.user_id, u.email, u.phone_number, u.is_active, u.created_at, u.last_login,
+                       r.role_id, r.role_name
+                FROM users u
+                LEFT JOIN user_roles ur ON ur.user_id = u.user_id
+                LEFT JOIN roles r ON r.role_id = ur.role_id
+                {where}
+                ORDER BY u.user_id
+                """
+            ).execution_options(yield_per=EXPORT_BATCH_SIZE),
+            params,
+        )
+        # các dòng của một user liền nhau (ORDER BY user_id)
+        for _, group in groupby(result, key=lambda r: r.user_id):
+            group = list(group)
+            yield _user_row(group[0], [(r.role_id, r.role_name) for r in group if r.role_id is not None])
+    finally:
+        db.close()
+
+
+def _csv_chunks(rows):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for n, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if n % EXPORT_BATCH_SIZE == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def _ndjson_chunks(rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, ensure_ascii=False) + "\n")
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield "".join(lines)
+            lines = []
+    yield "".join(lines)
+
+
+@router.get("/users/export")
+def export_users(
+    format: str = "csv",
+    email: Optional[str] = Query(default=None, description="email prefix"),
+    role_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+):
+    """Export users (same filters as the list) as CSV or NDJSON, streamed with constant memory."""
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="INVALID_FORMAT")
+    conditions, params = _user_filters(email, role_id, is_active)
+    rows = _export_rows(conditions, params)
+    if format == "csv":
+        body, media_type = _csv_chunks(rows), "text/csv; charset=utf-8"
+    else:
+        body, media_type = _ndjson_chunks(rows), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
+    )
+
+
 @router.post("/users", status_code=status.HTTP_201_CREATED)
 def create_user(payload: CreateUserRequest, db: Session = Depends(get_db)):
     """Create a new user by calling the stored procedure sp_create_user."""
@@ -95,6 +230,7 @@ def update_user(user_id: int, payload: UpdateUserRequest, db: Session = Depends(
             {"user_id": user_id, "phone": phone, "is_active": payload.is_active, "role_id": payload.role_id}
         )
         db.commit()
+        typeahead.user_changed(db, user_id)
         return {"message": "User updated successfully"}
     except SQLAlchemyError as e:
         db.rollback()
@@ -109,6 +245,7 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
         # Call stored procedure: sp_delete_user(user_id)
         db.execute(text("CALL sp_delete_user(:user_id)"), {"user_id": user_id})
         db.commit()
+        typeahead.user_changed(db, user_id)
     except SQLAlchemyError as e:
         db.rollback()
         # Extract the MySQL error message (e.g., "Cannot delete user who owns a group")
@@ -134,24 +271,72 @@ def list_roles(db: Session = Depends(get_db)):
 
 
 @router.get("/stats")
-def get_statistics(year: int = 2025, min_posts: int = 0, db: Session = Depends(get_db)):
-    """Get active users statistics by calling the stored procedure sp_get_active_users."""
+def get_statistics(
+    response: Response,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    year: Optional[int] = Query(default=None, ge=1, le=9999),
+    min_posts: int = 0,
+    limit: int = Query(default=500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+):
+    """Most active users between start and end (month granularity; `year` is shorthand for a whole year).
+    Served from the user_monthly_activity rollup; activity_score follows func_calculate_user_activity_score.
+    The last rolled-up day is returned in the X-Stats-Through header.
+    """
+    if year is not None and start is None and end is None:
+        start, end = date(year, 1, 1), date(year, 12, 31)
+    if start and end and start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="INVALID_RANGE")
     try:
-        # Call stored procedure: sp_get_active_users(year, min_posts)
+        conditions = []
+        params = {"min_posts": min_posts, "limit": limit}
+        if start is not None:
+            conditions.append("a.month >= :start_month")
+            params["start_month"] = user_activity.month_of(start)
+        if end is not None:
+            conditions.append("a.month <= :end_month")
+            params["end_month"] = user_activity.month_of(end)
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
         result = db.execute(
-            text("CALL sp_get_active_users(:year, :min_posts)"),
-            {"year": year, "min_posts": min_posts}
+            text(
+                f"""
+                SELECT t.*, u.email FROM (
+                    SELECT
+                        a.user_id,
+                        SUM(a.original_posts) AS original_posts,
+                        SUM(a.shares) AS shares,
+                        SUM(a.comments) AS comments,
+                        SUM(a.reactions_given) AS reactions_given
+                    FROM user_monthly_activity a
+                    {where}
+                    GROUP BY a.user_id
+                    HAVING SUM(a.original_posts) + SUM(a.shares) >= :min_posts
+                    ORDER BY SUM(a.original_posts) + SUM(a.shares) DESC, a.user_id
+                    LIMIT :limit
+                ) t
+                JOIN users u ON u.user_id = t.user_id
+                ORDER BY t.original_posts + t.shares DESC, t.user_id
+                """
+            ),
+            params,
         )
-        
+
         stats = []
         for row in result:
-            # Assume the procedure returns: user_id, email, total_posts, activity_score
+            original_posts, shares = int(row.original_posts), int(row.shares)
             stats.append({
-                "user_id": row[0],
-                "email": row[1],
-                "total_posts": row[2],
-                "activity_score": row[3] if len(row) > 3 else None,
+                "user_id": row.user_id,
+                "email": row.email,
+                "total_posts": original_posts + shares,
+                "activity_score": user_activity.activity_score(original_posts, shares),
+                "original_posts": original_posts,
+                "shares": shares,
+                "comments": int(row.comments),
+                "reactions_given": int(row.reactions_given),
             })
+        through = user_activity.through_day(db)
+        response.headers["X-Stats-Through"] = through.isoformat() if through else ""
         return stats
     except SQLAlchemyError as e:
         db.rollback()
@@ -161,43 +346,50 @@ def get_statistics(year: int = 2025, min_posts: int = 0, db: Session = Depends(g
 
 @router.get("/posts-sentiment")
 def list_posts_with_sentiment(
-    year: Optional[int] = Query(default=None),
+    year: Optional[int] = Query(default=None, ge=1, le=9998),
     min_score: Optional[int] = Query(default=None),
     max_score: Optional[int] = Query(default=None),
     q: Optional[str] = Query(default=None, description="keyword in text_content"),
     limit: int = Query(default=500, ge=1, le=5000),
     db: Session = Depends(get_db),
 ):
-    """List posts with their sentiment score computed by func_calculate_post_sentiment.
+    """List posts with their stored sentiment score (posts.sentiment_score, kept up to date from reactions).
     Supports filtering by year, score range, and keyword.
     """
     try:
+        # chỉ đưa vào các điều kiện được truyền, năm -> khoảng created_at,
+        # để khoảng sentiment_score + ORDER BY chạy theo ix_posts_sentiment
+        conditions = []
+        params = {"limit": limit}
+        if year is not None:
+            conditions.append("p.created_at >= :year_start AND p.created_at < :year_end")
+            params.update(year_start=date(year, 1, 1), year_end=date(year + 1, 1, 1))
+        if q:
+            # qua post_search_terms, như /posts/search
+            condition, search_params = post_search.text_filter(q)
+            conditions.append(condition)
+            params.update(search_params)
+        if min_score is not None:
+            conditions.append("p.sentiment_score >= :min_score")
+            params["min_score"] = min_score
+        if max_score is not None:
+            conditions.append("p.sentiment_score <= :max_score")
+            params["max_score"] = max_score
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
         sql = text(
-            """
-            SELECT * FROM (
-                SELECT 
-                    p.post_id,
-                    p.author_id,
-                    p.text_content,
-                    p.created_at,
-                    func_calculate_post_sentiment(p.post_id) AS sentiment_score
-                FROM posts p
-                WHERE (:year IS NULL OR YEAR(p.created_at) = :year)
-                  AND (:q IS NULL OR p.text_content LIKE CONCAT('%', :q, '%'))
-            ) t
-            WHERE (:min_score IS NULL OR t.sentiment_score >= :min_score)
-              AND (:max_score IS NULL OR t.sentiment_score <= :max_score)
-            ORDER BY t.sentiment_score DESC, t.created_at DESC
+            f"""
+            SELECT
+                p.post_id,
+                p.author_id,
+                p.text_content,
+                p.created_at,
+                p.sentiment_score
+            FROM posts p
+            {where}
+            ORDER BY p.sentiment_score DESC, p.created_at DESC
             LIMIT :limit
             """
         )
-        params = {
-            "year": year,
-            "q": q,
-            "min_score": min_score,
-            "max_score": max_score,
-            "limit": limit,
-        }
         result = db.execute(sql, params)
         rows = []
         for row in result:
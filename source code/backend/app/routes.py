@@ -1,20 +1,41 @@
-from typing import Optional
+from typing import NamedTuple, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response,UploadFile, File as FastAPIFile
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
 from sqlalchemy import or_, and_
 import os
-from datetime import datetime, timedelta
+from collections import defaultdict
+from datetime import date, datetime, timedelta
 
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 
+from .cache import TTLCache
 from .database import get_db
-from . import models, schemas
-from sqlalchemy import desc, func
+from . import (
+    calendar_feed,
+    event_scheduler,
+    group_cache,
+    media_blobs,
+    media_processing,
+    media_urls,
+    models,
+    page_analytics,
+    pagination,
+    post_search,
+    post_sentiment,
+    schemas,
+    storage,
+    timeline_cache,
+    typeahead,
+    upload_tickets,
+    upload_worker,
+)
+from sqlalchemy import desc, func, select
+from sqlalchemy.exc import IntegrityError
 from typing import Optional
-from .cloudinary_utils import upload_to_cloudinary
 from uuid import uuid4
 from fastapi import Body
+from fastapi.responses import StreamingResponse
 
 router = APIRouter()
 
@@ -153,6 +174,7 @@ def auth_register(payload: dict, response: Response, db: Session = Depends(get_d
             )
             db.add(profile)
             db.commit()
+            typeahead.profile_changed(profile)
         except Exception:
             db.rollback()
 
@@ -311,14 +333,104 @@ def users_suggestions(request: Request, db: Session = Depends(get_db)):
     return results
 
 
+MAX_TYPEAHEAD_RESULTS = 20
+
+
+@router.get('/search/typeahead')
+def search_typeahead(
+    request: Request,
+    db: Session = Depends(get_db),
+    q: str = "",
+    limit: int = 10,
+    types: Optional[str] = None,
+):
+    """
+    People, pages and groups with a name word starting with q (diacritics optional),
+    from the in-memory typeahead index. Friends, joined groups and followed pages come first.
+    types: comma-separated USER,PAGE,GROUP (default all).
+    """
+    wanted = typeahead.TYPES
+    if types:
+        wanted = tuple(t.strip().upper() for t in types.split(",") if t.strip())
+        if not wanted or any(t not in typeahead.TYPES for t in wanted):
+            raise HTTPException(status_code=400, detail="INVALID_TYPES")
+    limit = max(1, min(limit, MAX_TYPEAHEAD_RESULTS))
+    try:
+        viewer_id = get_current_user_from_cookie(request, db).user_id
+    except HTTPException:
+        viewer_id = None
+
+    related = typeahead.relations(db, viewer_id)
+    results = typeahead.search(q, limit, wanted, related, exclude=(typeahead.USER, viewer_id))
+    return [
+        {
+            "type": entry.entity_type,
+            "id": entry.entity_id,
+            "name": entry.name,
+            "username": entry.username,
+            "avatar_url": entry.avatar_url,
+            "is_related": is_related,
+        }
+        for entry, is_related in results
+    ]
+
+
+def _feed_visibility(current_id: Optional[int]):
+    """
+    Posts the viewer may see in the feed / search: public posts, their own
+    posts, friends' FRIENDS posts, posts in joined groups and on followed pages.
+    Anonymous viewers see public posts only. Group posts are stored PUBLIC, so
+    posts in a non-PUBLIC group are dropped unless the viewer is a JOINED member.
+    """
+    def located_in(location_type, location_ids):
+        return models.Post.post_id.in_(
+            select(models.PostLocation.post_id).where(
+                models.PostLocation.location_type == location_type,
+                models.PostLocation.location_id.in_(location_ids),
+            )
+        )
+
+    closed_groups = select(models.Group.group_id).where(models.Group.privacy_type != models.GroupPrivacy.PUBLIC)
+    conds = [models.Post.privacy_setting == models.PrivacySetting.PUBLIC]
+    if not current_id:
+        return and_(or_(*conds), ~located_in(models.LocationType.GROUP, closed_groups))
+    friendship = models.Friendship
+    friends_two = select(friendship.user_two_id).where(
+        friendship.user_one_id == current_id, friendship.status == models.FriendshipStatus.ACCEPTED
+    )
+    friends_one = select(friendship.user_one_id).where(
+        friendship.user_two_id == current_id, friendship.status == models.FriendshipStatus.ACCEPTED
+    )
+    joined_groups = select(models.GroupMembership.group_id).where(
+        models.GroupMembership.user_id == current_id,
+        models.GroupMembership.status == models.GroupMemberStatus.JOINED,
+    )
+    followed_pages = select(models.PageFollow.page_id).where(models.PageFollow.user_id == current_id)
+
+    conds += [
+        and_(models.Post.author_type == models.PostAuthorType.USER, models.Post.author_id == current_id),
+        and_(
+            models.Post.privacy_setting == models.PrivacySetting.FRIENDS,
+            models.Post.author_type == models.PostAuthorType.USER,
+            or_(models.Post.author_id.in_(friends_two), models.Post.author_id.in_(friends_one)),
+        ),
+        located_in(models.LocationType.GROUP, joined_groups),
+        located_in(models.LocationType.PAGE_TIMELINE, followed_pages),
+    ]
+    hidden_groups = closed_groups.where(models.Group.group_id.not_in(joined_groups))
+    return and_(or_(*conds), ~located_in(models.LocationType.GROUP, hidden_groups))
+
+
 @router.get('/feed')
-def get_feed(request: Request, db: Session = Depends(get_db), limit: int = 20):
+def get_feed(request: Request, db: Session = Depends(get_db), limit: int = 20, width_class: str = media_urls.DEFAULT_WIDTH_CLASS):
     """Return feed posts that the current user is allowed to see.
     Rules:
       - Public posts are visible to everyone
       - Friends posts are visible to accepted friends
       - Users always see their own posts
+      - Posts in private groups are visible to joined members only
     """
+    image_width = media_urls.width_for(width_class)
     try:
         current = get_current_user_from_cookie(request, db)
         current_id = current.user_id
@@ -327,59 +439,7 @@ def get_feed(request: Request, db: Session = Depends(get_db), limit: int = 20):
         current = None
         current_id = None
 
-    friend_ids = set()
-    if current_id:
-        frs = db.query(models.Friendship).filter(
-            or_(models.Friendship.user_one_id == current_id, models.Friendship.user_two_id == current_id),
-            models.Friendship.status == models.FriendshipStatus.ACCEPTED,
-        ).all()
-        for f in frs:
-            other = f.user_two_id if f.user_one_id == current_id else f.user_one_id
-            friend_ids.add(other)
-
-    # build query - include public posts, user's own posts, friends' posts, group posts, and followed page posts
-    conds = [models.Post.privacy_setting == models.PrivacySetting.PUBLIC]
-    if current_id:
-        conds.append(models.Post.author_id == current_id)
-        if friend_ids:
-            conds.append(and_(models.Post.privacy_setting == models.PrivacySetting.FRIENDS, models.Post.author_id.in_(list(friend_ids))))
-        
-        # Add posts from groups the user has joined
-        joined_groups = db.query(models.GroupMembership.group_id).filter(
-            models.GroupMembership.user_id == current_id,
-            models.GroupMembership.status == models.GroupMemberStatus.JOINED
-        ).all()
-        joined_group_ids = [g[0] for g in joined_groups]
-        
-        if joined_group_ids:
-            # Get post IDs from these groups
-            group_post_ids = db.query(models.PostLocation.post_id).filter(
-                models.PostLocation.location_type == models.LocationType.GROUP,
-                models.PostLocation.location_id.in_(joined_group_ids)
-            ).all()
-            group_post_ids = [p[0] for p in group_post_ids]
-            
-            if group_post_ids:
-                conds.append(models.Post.post_id.in_(group_post_ids))
-        
-        # Add posts from pages the user follows
-        followed_pages = db.query(models.PageFollow.page_id).filter(
-            models.PageFollow.user_id == current_id
-        ).all()
-        followed_page_ids = [p[0] for p in followed_pages]
-        
-        if followed_page_ids:
-            # Get post IDs from these pages
-            page_post_ids = db.query(models.PostLocation.post_id).filter(
-                models.PostLocation.location_type == models.LocationType.PAGE_TIMELINE,
-                models.PostLocation.location_id.in_(followed_page_ids)
-            ).all()
-            page_post_ids = [p[0] for p in page_post_ids]
-            
-            if page_post_ids:
-                conds.append(models.Post.post_id.in_(page_post_ids))
-
-    query = db.query(models.Post).filter(or_(*conds)).order_by(desc(models.Post.created_at)).limit(limit)
+    query = db.query(models.Post).filter(_feed_visibility(current_id)).order_by(desc(models.Post.created_at)).limit(limit)
     posts = []
     for p in query.all():
         profile = db.query(models.Profile).filter(models.Profile.user_id == p.author_id).first()
@@ -424,7 +484,7 @@ def get_feed(request: Request, db: Session = Depends(get_db), limit: int = 20):
         post_location = db.query(models.PostLocation).filter(models.PostLocation.post_id == p.post_id).first()
         if post_location:
             if post_location.location_type == models.LocationType.GROUP:
-                group = db.query(models.Group).filter(models.Group.group_id == post_location.location_id).first()
+                group = group_cache.get(db, post_location.location_id)
                 if group:
                     post_data["location"] = {
                         "type": "GROUP",
@@ -432,7 +492,7 @@ def get_feed(request: Request, db: Session = Depends(get_db), limit: int = 20):
                         "group_name": group.group_name
                     }
             elif post_location.location_type == models.LocationType.PAGE_TIMELINE:
-                page = db.query(models.Page).filter(models.Page.page_id == post_location.location_id).first()
+                page = _page_header(db, post_location.location_id)
                 if page:
                     post_data["location"] = {
                         "type": "PAGE",
@@ -451,7 +511,7 @@ def get_feed(request: Request, db: Session = Depends(get_db), limit: int = 20):
             .all()
         )
         for pf in post_files:
-            file_obj = db.query(models.File).filter(models.File.file_id == pf.file_id).first()
+            file_obj = db.query(models.File).filter(models.File.file_id == pf.file_id, models.File.status == models.FileStatus.READY).first()
             if file_obj:
                 # Determine file kind
                 kind = "FILE"
@@ -490,6 +550,7 @@ def get_feed(request: Request, db: Session = Depends(get_db), limit: int = 20):
                     "file_type": file_obj.file_type,
                     "file_url": file_obj.file_url,
                     "thumbnail_url": file_obj.thumbnail_url,
+                    **media_urls.variants(file_obj, image_width),
                     "kind": kind,
                     "stats": {"likes": int(file_likes or 0), "comments": int(file_comments or 0)},
                     "is_liked_by_me": bool(file_is_liked)
@@ -522,7 +583,7 @@ def get_feed(request: Request, db: Session = Depends(get_db), limit: int = 20):
                     .all()
                 )
                 for spf in shared_post_files:
-                    sfile_obj = db.query(models.File).filter(models.File.file_id == spf.file_id).first()
+                    sfile_obj = db.query(models.File).filter(models.File.file_id == spf.file_id, models.File.status == models.FileStatus.READY).first()
                     if sfile_obj:
                         kind = "FILE"
                         if sfile_obj.file_type.startswith("image/"):
@@ -535,6 +596,7 @@ def get_feed(request: Request, db: Session = Depends(get_db), limit: int = 20):
                             "file_type": sfile_obj.file_type,
                             "file_url": sfile_obj.file_url,
                             "thumbnail_url": sfile_obj.thumbnail_url,
+                            **media_urls.variants(sfile_obj, image_width),
                             "kind": kind
                         })
                 
@@ -697,7 +759,11 @@ def _get_simple_object(db: Session, model_cls, pk_field: str, item_id: int):
     return obj
 
 
-def register_simple_crud(prefix: str, model_cls, create_schema, update_schema, response_schema, pk_field: str):
+def register_simple_crud(prefix: str, model_cls, create_schema, update_schema, response_schema, pk_field: str, on_delete=None, on_change=None):
+    """Register list/create/read/update/delete routes for a table.
+    `on_delete(db, obj)` replaces the default delete + commit when given.
+    `on_change(obj)` runs after a create / update / delete has been committed.
+    """
     list_path = f"/{prefix}"
     item_path = f"/{prefix}/{{item_id}}"
 
@@ -707,6 +773,8 @@ def register_simple_crud(prefix: str, model_cls, create_schema, update_schema, r
         db.add(obj)
         db.commit()
         db.refresh(obj)
+        if on_change:
+            on_change(obj)
         return obj
 
     @router.get(list_path, response_model=list[response_schema])
@@ -725,13 +793,28 @@ def register_simple_crud(prefix: str, model_cls, create_schema, update_schema, r
             setattr(obj, key, value)
         db.commit()
         db.refresh(obj)
+        if on_change:
+            on_change(obj)
         return obj
 
     @router.delete(item_path, status_code=status.HTTP_204_NO_CONTENT)
     def delete_item(item_id: int, db: Session = Depends(get_db)):
         obj = _get_simple_object(db, model_cls, pk_field, item_id)
-        db.delete(obj)
-        db.commit()
+        if on_delete:
+            on_delete(db, obj)
+        else:
+            db.delete(obj)
+            db.commit()
+        if on_change:
+            on_change(obj)
+
+
+def _delete_file(db: Session, file_obj):
+    """Delete a File row; the stored blob goes too once no other File references it."""
+    stale = media_blobs.release(db, file_obj)
+    db.delete(file_obj)
+    db.commit()
+    media_blobs.purge(stale)
 
 
 # Register CRUD routes for single primary-key tables
@@ -751,6 +834,7 @@ register_simple_crud(
     update_schema=schemas.ProfileUpdate,
     response_schema=schemas.Profile,
     pk_field="profile_id",
+    on_change=typeahead.profile_changed,
 )
 register_simple_crud(
     prefix="roles",
@@ -777,6 +861,7 @@ register_simple_crud(
     update_schema=schemas.FileUpdate,
     response_schema=schemas.File,
     pk_field="file_id",
+    on_delete=_delete_file,
 )
 
 # Groups CRUD - Using custom endpoints instead of register_simple_crud
@@ -790,6 +875,14 @@ register_simple_crud(
 # )
 
 # Group Rules CRUD
+@router.get("/group-rules")
+def list_group_rules(group_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """Rules of one group (from group_cache), or every rule when no group_id is given"""
+    if group_id is None:
+        return db.query(models.GroupRule).all()
+    meta = group_cache.get(db, group_id)
+    return [{"group_id": group_id, **r._asdict()} for r in meta.rules] if meta else []
+
 register_simple_crud(
     prefix="group-rules",
     model_cls=models.GroupRule,
@@ -797,6 +890,7 @@ register_simple_crud(
     update_schema=schemas.GroupRuleUpdate,
     response_schema=schemas.GroupRule,
     pk_field="rule_id",
+    on_change=group_cache.child_changed,
 )
 
 # Membership Questions CRUD - Using custom endpoint with group_id filter
@@ -809,12 +903,52 @@ register_simple_crud(
 #     pk_field="question_id",
 # )
 
+def _save_membership_answers(db: Session, user_id: int, group_id: int, answers: dict):
+    """
+    Check {question_id: answer_text} against the group's questions, then
+    upsert it for one applicant in a single statement (INSERT ... ON DUPLICATE
+    KEY UPDATE on MySQL). Does not commit. The questions are read live, not
+    from group_cache: a question added or removed on another worker counts at once.
+    """
+    questions = {
+        q.question_id: q
+        for q in db.query(
+            models.MembershipQuestion.question_id,
+            models.MembershipQuestion.question_text,
+            models.MembershipQuestion.is_required,
+        ).filter(models.MembershipQuestion.group_id == group_id)
+    }
+    if answers.keys() - questions.keys():
+        raise HTTPException(status_code=400, detail="INVALID_QUESTION")
+    missing = {qid for qid, q in questions.items() if q.is_required} - answers.keys()
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Question '{questions[min(missing)].question_text}' is required")
+    if not answers:
+        return
+    table = models.MembershipAnswer.__table__
+    rows = [
+        {"user_id": user_id, "group_id": group_id, "question_id": qid, "answer_text": text}
+        for qid, text in answers.items()
+    ]
+    if db.get_bind().dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+        stmt = mysql_insert(table).values(rows)
+        db.execute(stmt.on_duplicate_key_update(answer_text=stmt.inserted.answer_text))
+        return
+    # DB khác: xóa câu trả lời cũ của các câu hỏi này rồi insert lại
+    db.execute(table.delete().where(
+        table.c.user_id == user_id,
+        table.c.group_id == group_id,
+        table.c.question_id.in_(list(answers)),
+    ))
+    db.execute(table.insert().values(rows))
+
+
 @router.get("/membership-questions")
 def get_membership_questions(group_id: int, db: Session = Depends(get_db)):
     """Get membership questions for a specific group"""
-    return db.query(models.MembershipQuestion).filter(
-        models.MembershipQuestion.group_id == group_id
-    ).all()
+    return get_group_questions(group_id, db)
 
 @router.post("/membership-questions", status_code=status.HTTP_201_CREATED)
 def create_membership_question(payload: schemas.MembershipQuestionCreate, db: Session = Depends(get_db)):
@@ -823,6 +957,7 @@ def create_membership_question(payload: schemas.MembershipQuestionCreate, db: Se
     db.add(obj)
     db.commit()
     db.refresh(obj)
+    group_cache.child_changed(obj)
     return obj
 
 @router.delete("/membership-questions/{question_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -835,6 +970,7 @@ def delete_membership_question(question_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Question not found")
     db.delete(question)
     db.commit()
+    group_cache.child_changed(question)
 
 @router.post("/comments", status_code=status.HTTP_201_CREATED)
 def create_comment(payload: schemas.CommentCreate, request: Request, db: Session = Depends(get_db)):
@@ -922,6 +1058,7 @@ def update_comment(comment_id: int, payload: schemas.CommentUpdate, db: Session
 @router.delete("/comments/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_comment(comment_id: int, db: Session = Depends(get_db)):
     obj = _get_simple_object(db, models.Comment, "comment_id", comment_id)
+    post_id = obj.commentable_id if obj.commentable_type == models.CommentableType.POST else None
     db.delete(obj)
     db.commit()
 
@@ -944,6 +1081,7 @@ def create_page(payload: schemas.PageCreate, request: Request, db: Session = Dep
     db.add(page_role)
     db.commit()
     db.refresh(obj)
+    typeahead.page_changed(db, obj.page_id)
     return obj
 
 @router.get("/pages", response_model=list[schemas.Page])
@@ -958,6 +1096,8 @@ def update_page(item_id: int, payload: schemas.PageUpdate, db: Session = Depends
         setattr(obj, key, value)
     db.commit()
     db.refresh(obj)
+    _page_header_cache.delete(item_id)
+    typeahead.page_changed(db, item_id)
     return obj
 
 @router.delete("/pages/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -965,6 +1105,8 @@ def delete_page(item_id: int, db: Session = Depends(get_db)):
     obj = _get_simple_object(db, models.Page, "page_id", item_id)
     db.delete(obj)
     db.commit()
+    _page_header_cache.delete(item_id)
+    typeahead.page_changed(db, item_id)
 
 # Groups CRUD - Using custom endpoints (duplicate removed)
 # register_simple_crud(
@@ -982,6 +1124,7 @@ register_simple_crud(
     update_schema=schemas.GroupRuleUpdate,
     response_schema=schemas.GroupRule,
     pk_field="rule_id",
+    on_change=group_cache.child_changed,
 )
 register_simple_crud(
     prefix="membership-questions",
@@ -990,15 +1133,17 @@ register_simple_crud(
     update_schema=schemas.MembershipQuestionUpdate,
     response_schema=schemas.MembershipQuestion,
     pk_field="question_id",
+    on_change=group_cache.child_changed,
 )
-register_simple_crud(
-    prefix="events",
-    model_cls=models.Event,
-    create_schema=schemas.EventCreate,
-    update_schema=schemas.EventUpdate,
-    response_schema=schemas.Event,
-    pk_field="event_id",
-)
+# Events CRUD - Using custom endpoints (the generic routes were registered first and shadowed them)
+# register_simple_crud(
+#     prefix="events",
+#     model_cls=models.Event,
+#     create_schema=schemas.EventCreate,
+#     update_schema=schemas.EventUpdate,
+#     response_schema=schemas.Event,
+#     pk_field="event_id",
+# )
 register_simple_crud(
     prefix="event-publications",
     model_cls=models.EventPublication,
@@ -1124,7 +1269,7 @@ def create_post(
     {
         "text_content": "hello",
         "privacy_setting": "PUBLIC",      # PUBLIC | FRIENDS | ONLY_ME
-        "file_ids": [1, 2, 3],            # optional
+        "file_ids": [1, 2, 3],            # optional, có thể là file PENDING (upload async)
         "location_type": "USER_TIMELINE", # USER_TIMELINE | GROUP | PAGE_TIMELINE
         "location_id": 123                # với USER_TIMELINE có thể bỏ, mặc định = user hiện tại
     }
@@ -1167,12 +1312,8 @@ def create_post(
     elif location_type == models.LocationType.GROUP:
         if not location_id:
             raise HTTPException(status_code=400, detail="MISSING_LOCATION_ID")
-        gm = db.query(models.GroupMembership).filter(
-            models.GroupMembership.group_id == location_id,
-            models.GroupMembership.user_id == current.user_id,
-            models.GroupMembership.status == models.GroupMemberStatus.JOINED,
-        ).first()
-        if not gm:
+        group_cache.require(db, location_id)
+        if not _is_group_member(db, location_id, current.user_id):
             raise HTTPException(status_code=403, detail="GROUP_NOT_JOINED")
         
         # Bài đăng trong group luôn là PUBLIC, visibility do group privacy quyết định
@@ -1230,15 +1371,27 @@ def create_post(
         file_obj = db.query(models.File).filter(
             models.File.file_id == fid,
             models.File.uploader_user_id == current.user_id,  # đảm bảo file của chính user
+            models.File.status != models.FileStatus.FAILED,   # PENDING vẫn gắn được, hiện khi READY
         ).first()
         if not file_obj:
-            # bỏ qua file không tồn tại/không đúng owner
+            # bỏ qua file không tồn tại/không đúng owner/upload lỗi
             continue
         link = models.PostFile(post_id=post.post_id, file_id=file_obj.file_id)
         db.merge(link)
 
+    post_search.index_post(db, post.post_id, text_content)
+    timeline_version = None
+    if location_type == models.LocationType.GROUP:
+        timeline_cache.invalidate(db, [location_id])
+        # đang giữ lock row group -> đây đúng là version sau bài này
+        timeline_version = db.query(models.Group.timeline_version).filter(
+            models.Group.group_id == location_id
+        ).scalar()
     db.commit()
 
+    if timeline_version is not None:
+        timeline_cache.push(location_id, timeline_version, _load_group_cards(db, [post])[0])
+
     return {
         "post_id": post.post_id,
         "author_id": current.user_id,
@@ -1278,6 +1431,8 @@ def delete_post_location(
         {"post_id": post_id, "location_id": location_id, "location_type": location_type},
     )
     db.delete(obj)
+    if location_type == models.LocationType.GROUP:
+        timeline_cache.invalidate(db, [location_id])
     db.commit()
 
 
@@ -1285,6 +1440,7 @@ def delete_post_location(
 def create_post_file(payload: schemas.PostFileBase, db: Session = Depends(get_db)):
     record = models.PostFile(**payload.model_dump())
     db.add(record)
+    timeline_cache.invalidate_posts(db, [record.post_id])
     db.commit()
     return record
 
@@ -1309,6 +1465,7 @@ def update_post_file(post_id: int, file_id: int, payload: schemas.PostFileUpdate
 def delete_post_file(post_id: int, file_id: int, db: Session = Depends(get_db)):
     obj = _get_composite_object(db, models.PostFile, {"post_id": post_id, "file_id": file_id})
     db.delete(obj)
+    timeline_cache.invalidate_posts(db, [post_id])
     db.commit()
 
 
@@ -1333,6 +1490,7 @@ def create_reaction(payload: schemas.ReactionBase, request: Request, db: Session
             raise
 
     # check for existing reaction by this user on the same target
+    # (locked: the sentiment delta below depends on the old reaction_type)
     existing = (
         db.query(models.Reaction)
         .filter(
@@ -1340,6 +1498,7 @@ def create_reaction(payload: schemas.ReactionBase, request: Request, db: Session
             models.Reaction.reactable_id == payload.reactable_id,
             models.Reaction.reactable_type == payload.reactable_type,
         )
+        .with_for_update()
         .first()
     )
 
@@ -1348,10 +1507,14 @@ def create_reaction(payload: schemas.ReactionBase, request: Request, db: Session
         if existing.reaction_type == payload.reaction_type:
             # same reaction -> remove (toggle off)
             db.delete(existing)
+            post_sentiment.reaction_changed(db, existing.reactable_type, existing.reactable_id, existing.reaction_type, None)
             db.commit()
             return Response(status_code=status.HTTP_204_NO_CONTENT)
         else:
             # change type
+            post_sentiment.reaction_changed(
+                db, existing.reactable_type, existing.reactable_id, existing.reaction_type, payload.reaction_type
+            )
             existing.reaction_type = payload.reaction_type
             db.commit()
             db.refresh(existing)
@@ -1365,6 +1528,7 @@ def create_reaction(payload: schemas.ReactionBase, request: Request, db: Session
         reaction_type=payload.reaction_type,
     )
     db.add(record)
+    post_sentiment.reaction_changed(db, record.reactable_type, record.reactable_id, None, record.reaction_type)
     db.commit()
     db.refresh(record)
     return record
@@ -1388,9 +1552,11 @@ def update_reaction(
         models.Reaction,
         {"reactor_user_id": reactor_user_id, "reactable_id": reactable_id, "reactable_type": reactable_type},
     )
+    old_type = obj.reaction_type
     update_data = payload.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(obj, key, value)
+    post_sentiment.reaction_changed(db, reactable_type, reactable_id, old_type, obj.reaction_type)
     db.commit()
     db.refresh(obj)
     return obj
@@ -1406,6 +1572,7 @@ def delete_reaction(
         {"reactor_user_id": reactor_user_id, "reactable_id": reactable_id, "reactable_type": reactable_type},
     )
     db.delete(obj)
+    post_sentiment.reaction_changed(db, reactable_type, reactable_id, obj.reaction_type, None)
     db.commit()
 
 
@@ -1444,6 +1611,7 @@ def delete_page_role(user_id: int, page_id: int, db: Session = Depends(get_db)):
 def create_page_follow(payload: schemas.PageFollowBase, db: Session = Depends(get_db)):
     record = models.PageFollow(**payload.model_dump(exclude_unset=True))
     db.add(record)
+    _page_follow_changed(db, record.page_id, 1)
     db.commit()
     return record
 
@@ -1457,6 +1625,7 @@ def list_page_follows(db: Session = Depends(get_db)):
 def delete_page_follow(user_id: int, page_id: int, db: Session = Depends(get_db)):
     obj = _get_composite_object(db, models.PageFollow, {"user_id": user_id, "page_id": page_id})
     db.delete(obj)
+    _page_follow_changed(db, page_id, -1)
     db.commit()
 
 
@@ -1464,6 +1633,7 @@ def delete_page_follow(user_id: int, page_id: int, db: Session = Depends(get_db)
 def create_group_membership(payload: schemas.GroupMembershipCreate, db: Session = Depends(get_db)):
     record = models.GroupMembership(**payload.model_dump())
     db.add(record)
+    _membership_changed(db, record.group_id, record.user_id, None, record.status)
     db.commit()
     db.refresh(record)
     return record
@@ -1480,6 +1650,8 @@ def update_group_membership(
 ):
     obj = _get_composite_object(db, models.GroupMembership, {"user_id": user_id, "group_id": group_id})
     update_data = payload.model_dump(exclude_unset=True)
+    if "status" in update_data:
+        _membership_changed(db, group_id, user_id, obj.status, update_data["status"])
     for key, value in update_data.items():
         setattr(obj, key, value)
     db.commit()
@@ -1490,6 +1662,7 @@ def update_group_membership(
 @router.delete("/group-memberships/{user_id}/{group_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_group_membership(user_id: int, group_id: int, db: Session = Depends(get_db)):
     obj = _get_composite_object(db, models.GroupMembership, {"user_id": user_id, "group_id": group_id})
+    _membership_changed(db, group_id, user_id, obj.status, None)
     db.delete(obj)
     db.commit()
 
@@ -1545,6 +1718,7 @@ def delete_membership_answer(user_id: int, group_id: int, question_id: int, db:
 def create_event_participant(payload: schemas.EventParticipantCreate, db: Session = Depends(get_db)):
     record = models.EventParticipant(**payload.model_dump())
     db.add(record)
+    _rsvp_changed(db, record.event_id, None, record.rsvp_status)
     db.commit()
     db.refresh(record)
     return record
@@ -1558,9 +1732,11 @@ def list_event_participants(db: Session = Depends(get_db)):
 @router.put("/event-participants/{event_id}/{user_id}", response_model=schemas.EventParticipant)
 def update_event_participant(event_id: int, user_id: int, payload: schemas.EventParticipantUpdate, db: Session = Depends(get_db)):
     obj = _get_composite_object(db, models.EventParticipant, {"event_id": event_id, "user_id": user_id})
+    old_status = obj.rsvp_status
     update_data = payload.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(obj, key, value)
+    _rsvp_changed(db, event_id, old_status, obj.rsvp_status)
     db.commit()
     db.refresh(obj)
     return obj
@@ -1570,6 +1746,7 @@ def update_event_participant(event_id: int, user_id: int, payload: schemas.Event
 def delete_event_participant(event_id: int, user_id: int, db: Session = Depends(get_db)):
     obj = _get_composite_object(db, models.EventParticipant, {"event_id": event_id, "user_id": user_id})
     db.delete(obj)
+    _rsvp_changed(db, event_id, obj.rsvp_status, None)
     db.commit()
 
 
@@ -1620,10 +1797,11 @@ def update_me(payload: dict, request: Request, db: Session = Depends(get_db)):
             setattr(profile, field, payload[field])
     db.commit()
     db.refresh(profile)
+    typeahead.profile_changed(profile)
     return {"message": "Update success", "data": payload}
 
-@router.get("/users/{user_id}/posts")
-def user_posts(user_id: int, request: Request, db: Session = Depends(get_db), limit: int = 10, offset: int = 0):
+def _profile_post_conds(request: Request, db: Session, user_id: int) -> list:
+    """Filters on Post for what the (optional) viewer may see on user_id's profile."""
     viewer = None
     try:
         viewer = get_current_user_from_cookie(request, db)
@@ -1641,6 +1819,20 @@ def user_posts(user_id: int, request: Request, db: Session = Depends(get_db), li
         conds.append(models.Post.privacy_setting.in_([models.PrivacySetting.PUBLIC, models.PrivacySetting.FRIENDS]))
     else:
         conds.append(models.Post.privacy_setting == models.PrivacySetting.PUBLIC)
+    return conds
+
+
+@router.get("/users/{user_id}/posts")
+def user_posts(
+    user_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    limit: int = 10,
+    offset: int = 0,
+    width_class: str = media_urls.DEFAULT_WIDTH_CLASS,
+):
+    image_width = media_urls.width_for(width_class)
+    conds = _profile_post_conds(request, db, user_id)
     posts = (
         db.query(models.Post)
         .filter(and_(*conds))
@@ -1666,11 +1858,11 @@ def user_posts(user_id: int, request: Request, db: Session = Depends(get_db), li
         post_location = db.query(models.PostLocation).filter(models.PostLocation.post_id == post.post_id).first()
         if post_location:
             if post_location.location_type == models.LocationType.GROUP:
-                group = db.query(models.Group).filter(models.Group.group_id == post_location.location_id).first()
+                group = group_cache.get(db, post_location.location_id)
                 if group:
                     location_info = {"type": "GROUP", "id": group.group_id, "name": group.group_name}
             elif post_location.location_type == models.LocationType.PAGE_TIMELINE:
-                page = db.query(models.Page).filter(models.Page.page_id == post_location.location_id).first()
+                page = _page_header(db, post_location.location_id)
                 if page:
                     location_info = {"type": "PAGE", "id": page.page_id, "name": page.page_name}
         
@@ -1678,13 +1870,14 @@ def user_posts(user_id: int, request: Request, db: Session = Depends(get_db), li
         post_files_links = db.query(models.PostFile).filter(models.PostFile.post_id == post.post_id).all()
         files = []
         for pf in post_files_links:
-            file = db.query(models.File).filter(models.File.file_id == pf.file_id).first()
+            file = db.query(models.File).filter(models.File.file_id == pf.file_id, models.File.status == models.FileStatus.READY).first()
             if file:
                 files.append({
                     "file_id": file.file_id,
                     "file_url": file.file_url,
                     "file_type": file.file_type,
-                    "thumbnail_url": file.thumbnail_url
+                    "thumbnail_url": file.thumbnail_url,
+                    **media_urls.variants(file, image_width),
                 })
         
         result.append({
@@ -1701,6 +1894,64 @@ def user_posts(user_id: int, request: Request, db: Session = Depends(get_db), li
     
     return result
 
+@router.get("/users/{user_id}/media")
+def user_media(
+    user_id: int,
+    request: Request,
+    response: Response,
+    kind: Optional[str] = None,
+    limit: int = 24,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Photo/video gallery of a user: files they attached to posts the viewer may see.
+    Newest first, keyset-paginated on (created_at, file_id); the next page's
+    cursor is returned in the X-Next-Cursor header.
+    """
+    if kind not in (None, "image", "video"):
+        raise HTTPException(status_code=400, detail="INVALID_KIND")
+    limit = pagination.clamp_limit(limit)
+
+    # EXISTS thay vì JOIN: một file gắn vào nhiều bài vẫn chỉ ra một lần
+    visible = (
+        db.query(models.PostFile.file_id)
+        .join(models.Post, models.Post.post_id == models.PostFile.post_id)
+        .filter(models.PostFile.file_id == models.File.file_id, *_profile_post_conds(request, db, user_id))
+        .exists()
+    )
+    q = db.query(
+        models.File.file_id,
+        models.File.file_type,
+        models.File.file_url,
+        models.File.thumbnail_url,
+        models.File.created_at,
+    ).filter(
+        models.File.uploader_user_id == user_id,
+        models.File.status == models.FileStatus.READY,
+        visible,
+    )
+    q = q.filter(models.File.file_type.like(f"{kind}/%")) if kind else q.filter(
+        or_(models.File.file_type.like("image/%"), models.File.file_type.like("video/%"))
+    )
+    after = pagination.decode_cursor(cursor, pagination.parse_datetime, int)
+    if after:
+        q = q.filter(pagination.keyset_before(models.File.created_at, models.File.file_id, *after))
+    rows = q.order_by(desc(models.File.created_at), desc(models.File.file_id)).limit(limit + 1).all()
+    rows = pagination.paginate(response, rows, limit, lambda r: (r.created_at, r.file_id))
+
+    result = []
+    for r in rows:
+        is_video = r.file_type.startswith("video/")
+        result.append({
+            "file_id": r.file_id,
+            "kind": "VIDEO" if is_video else "IMAGE",
+            # ảnh cũ chưa có rendition thì dùng bản gốc; video chưa có poster thì để null
+            "thumbnail_url": r.thumbnail_url or (None if is_video else r.file_url),
+            "created_at": r.created_at,
+        })
+    return result
+
 # --- Friends extras: cancel, block, list with pagination ---
 @router.delete("/friends/{target_id}/cancel", status_code=status.HTTP_204_NO_CONTENT)
 def cancel_friend_request(target_id: int, request: Request, db: Session = Depends(get_db)):
@@ -1761,24 +2012,56 @@ def list_friends_v2(request: Request, db: Session = Depends(get_db), user_id: Op
     return results
 
 # --- Media upload (placeholder storage) ---
+def _media_kind(resource_type: str) -> str:
+    if resource_type == "image":
+        return "IMAGE"
+    if resource_type == "video":
+        return "VIDEO"
+    return "FILE"
+
+
+def _require_storage():
+    """503 như khi Cloudinary chưa cấu hình: không âm thầm ghi file xuống đĩa local."""
+    if not storage.available():
+        raise HTTPException(
+            status_code=503,
+            detail="File upload service unavailable: Cloudinary is not configured and STORAGE_BACKEND is not local",
+        )
+
+
 @router.post("/media/upload", status_code=status.HTTP_201_CREATED)
 def upload_media(
     file: UploadFile = FastAPIFile(...),
     request: Request = None,
+    response: Response = None,
+    async_upload: bool = False,
     db: Session = Depends(get_db),
 ):
+    """
+    Upload file lên storage.
+    async_upload=true: lưu tạm xuống đĩa, tạo File PENDING và trả 202 ngay;
+    uploader chạy nền đẩy file lên storage, client poll /media/{file_id}/status.
+    """
     # 1. Check login
     user = get_current_user_from_cookie(request, db)
+    _require_storage()
+    mime_type = file.content_type or "application/octet-stream"
+
+    if async_upload:
+        return _upload_media_async(file, user, mime_type, request, response, db)
 
-    # 2. Đọc file
-    content = file.file.read()
-    if not content:
+    # 2. Hash nội dung theo từng chunk (không giữ cả file trong RAM nếu đã có blob)
+    content_hash, size = media_blobs.hash_stream(file.file)
+    if not size:
+        file.file.close()
         raise HTTPException(status_code=400, detail="INVALID_FILE")
 
-    # 3. Upload lên Cloudinary
-    unique_name = f"user_{user.user_id}_{uuid4().hex}"
+    # 3. Nội dung đã có -> dùng lại object, chỉ tăng ref_count;
+    #    chưa có -> upload lên storage backend (Cloudinary hoặc local)
+    ext = os.path.splitext(file.filename or "")[1].lower()
+    unique_name = f"user_{user.user_id}_{uuid4().hex}{ext}"
     try:
-        result = upload_to_cloudinary(content, unique_name)
+        blob, content = media_blobs.store(db, content_hash, file.file.read, unique_name, mime_type)
     except ValueError as e:
         # Cloudinary not configured
         raise HTTPException(
@@ -1793,35 +2076,182 @@ def upload_media(
     finally:
         file.file.close()
 
-    file_url = result["secure_url"]
-    file_size = result.get("bytes", len(content))
-    resource_type = result.get("resource_type", "raw")  # image, video, raw
-    mime_type = file.content_type or "application/octet-stream"
+    thumbnail_url = None
+    renditions = None
+    if content is None:
+        existing = media_blobs.existing_renditions(db, content_hash)
+        if existing:
+            thumbnail_url, renditions = existing
 
     # 4. Lưu DB
     rec = models.File(
         uploader_user_id=user.user_id,
         file_name=file.filename,
         file_type=mime_type,
-        file_size=file_size,
-        file_url=file_url,
+        file_size=blob.file_size,
+        file_url=blob.file_url,
+        thumbnail_url=thumbnail_url,
+        renditions=renditions,
+        renditions_pending=content is not None and media_processing.applies(mime_type),
+        content_hash=content_hash,
+        status=models.FileStatus.READY,
     )
     db.add(rec)
     db.commit()
     db.refresh(rec)
 
-    # 5. Xác định loại cho FE
-    kind = "FILE"
-    if resource_type == "image":
-        kind = "IMAGE"
-    elif resource_type == "video":
-        kind = "VIDEO"
+    # 5. Tạo thumbnail / renditions ở background (chỉ khi nội dung mới)
+    if content is not None:
+        media_processing.enqueue(rec.file_id, content, mime_type, content_hash)
+
+    # 6. Xác định loại cho FE
+    return {
+        "file_id": rec.file_id,
+        "url": rec.file_url,
+        "type": rec.file_type,
+        "kind": _media_kind(blob.resource_type),
+    }
+
+
+def _upload_media_async(file: UploadFile, user, mime_type: str, request: Request, response: Response, db: Session):
+    tmp_path = upload_worker.new_spool_path()
+    try:
+        content_hash, size = media_blobs.spool(file.file, tmp_path)
+    finally:
+        file.file.close()
+    if not size:
+        os.remove(tmp_path)
+        raise HTTPException(status_code=400, detail="INVALID_FILE")
+
+    rec = models.File(
+        uploader_user_id=user.user_id,
+        file_name=file.filename,
+        file_type=mime_type,
+        file_size=size,
+        file_url="",
+        content_hash=content_hash,
+        status=models.FileStatus.PENDING,
+    )
+    db.add(rec)
+    db.commit()
+    db.refresh(rec)
+    os.replace(tmp_path, upload_worker.spool_path(rec.file_id))
+
+    if not upload_worker.submit(rec.file_id):
+        rec.status = models.FileStatus.FAILED
+        db.commit()
+        os.remove(upload_worker.spool_path(rec.file_id))
+        raise HTTPException(status_code=503, detail="UPLOAD_QUEUE_FULL")
+
+    response.status_code = status.HTTP_202_ACCEPTED
+    return {
+        "file_id": rec.file_id,
+        "status": rec.status.value,
+        "status_url": str(request.url_for("media_upload_status", file_id=rec.file_id)),
+        "type": rec.file_type,
+        "kind": _media_kind(storage.resource_type_for(mime_type)),
+    }
+
+
+@router.get("/media/{file_id}/status")
+def media_upload_status(file_id: int, request: Request, db: Session = Depends(get_db)):
+    """Poll trạng thái upload async: PENDING -> READY | FAILED."""
+    current = get_current_user_from_cookie(request, db)
+    rec = db.query(models.File).filter(
+        models.File.file_id == file_id,
+        models.File.uploader_user_id == current.user_id,
+    ).first()
+    if not rec:
+        raise HTTPException(status_code=404, detail="File not found")
+    ready = rec.status == models.FileStatus.READY
+    return {
+        "file_id": rec.file_id,
+        "status": rec.status.value,
+        "url": rec.file_url if ready else None,
+        "thumbnail_url": rec.thumbnail_url,
+        "type": rec.file_type,
+    }
+
+# --- Media: signed direct-to-storage uploads ---
+@router.post("/media/upload-tickets", status_code=status.HTTP_201_CREATED)
+def create_upload_ticket(payload: dict, request: Request, db: Session = Depends(get_db)):
+    """
+    Cấp ticket để client upload thẳng lên storage (không qua API).
+    Body: {file_name, file_type, file_size}. Sau khi upload xong gọi /media/upload-tickets/confirm.
+    """
+    user = get_current_user_from_cookie(request, db)
+    file_name = (payload.get("file_name") or "").strip()
+    try:
+        file_size = int(payload.get("file_size") or 0)
+    except (TypeError, ValueError):
+        file_size = -1
+    if not file_name or file_size < 0:
+        raise HTTPException(status_code=400, detail="INVALID_FILE")
+    _require_storage()
+    mime_type = payload.get("file_type") or "application/octet-stream"
+    return upload_tickets.issue(user.user_id, file_name, mime_type, file_size)
+
+
+@router.post("/media/upload-tickets/confirm", status_code=status.HTTP_201_CREATED)
+def confirm_upload_ticket(payload: dict, request: Request, db: Session = Depends(get_db)):
+    """
+    Xác nhận upload trực tiếp: kiểm tra object trên storage rồi tạo File.
+    Body: {ticket, receipt?} — receipt là response của upload server local (Cloudinary thì không cần).
+    """
+    user = get_current_user_from_cookie(request, db)
+    claims = upload_tickets.read_ticket(payload.get("ticket"))
+    if claims["sub"] != str(user.user_id):
+        raise HTTPException(status_code=403, detail="TICKET_NOT_YOURS")
+
+    stored = upload_tickets.locate(claims, payload.get("receipt"))
+    # nhận ticket trước: PK trùng -> một confirm khác đã (hoặc đang) dùng nó
+    db.add(models.UploadTicketClaim(storage_key=claims["key"], user_id=user.user_id))
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="TICKET_ALREADY_USED")
+    if stored["bytes"] > claims["max"]:
+        db.commit()
+        media_blobs.purge([(stored["key"], stored["resource_type"])])
+        raise HTTPException(status_code=413, detail="FILE_TOO_LARGE")
+
+    content_hash = stored["content_hash"]
+    blob, fresh = media_blobs.adopt(db, content_hash, stored)
+    thumbnail_url = None
+    renditions = None
+    if not fresh:
+        existing = media_blobs.existing_renditions(db, content_hash)
+        if existing:
+            thumbnail_url, renditions = existing
+
+    rec = models.File(
+        uploader_user_id=user.user_id,
+        file_name=claims["name"],
+        file_type=claims["mime"],
+        file_size=blob.file_size,
+        file_url=blob.file_url,
+        thumbnail_url=thumbnail_url,
+        renditions=renditions,
+        renditions_pending=fresh and media_processing.applies(claims["mime"]),
+        content_hash=content_hash,
+        status=models.FileStatus.READY,
+    )
+    db.add(rec)
+    db.commit()
+    db.refresh(rec)
+
+    if fresh:
+        media_processing.enqueue(rec.file_id, None, rec.file_type, content_hash, blob.file_url)
+    elif stored["key"] != blob.storage_key:
+        # nội dung đã có sẵn -> bỏ bản client vừa upload
+        media_blobs.purge([(stored["key"], stored["resource_type"])])
 
     return {
         "file_id": rec.file_id,
         "url": rec.file_url,
         "type": rec.file_type,
-        "kind": kind,
+        "kind": _media_kind(blob.resource_type),
     }
 
 # --- Posts: share ---
@@ -1844,21 +2274,128 @@ def share_post(post_id: int, payload: dict, request: Request, db: Session = Depe
         parent_post_id=original.post_id,  # Store immediate parent, not original
     )
     db.add(share)
+    db.flush()
+    post_search.index_post(db, share.post_id, text_content)
     db.commit()
     db.refresh(share)
     return {"post_id": share.post_id, "parent_post_id": share.parent_post_id}
 
+
+# --- Posts: search ---
+@router.get("/posts/search")
+def search_posts(
+    q: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    width_class: str = media_urls.DEFAULT_WIDTH_CLASS,
+):
+    """
+    Posts containing every word of q (diacritics optional: "pho" finds "phở"),
+    best match first, limited to what the viewer may see in the feed.
+    Keyset-paginated on (score, post_id), next page cursor in the X-Next-Cursor header.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="EMPTY_QUERY")
+    image_width = media_urls.width_for(width_class)
+    limit = pagination.clamp_limit(limit)
+    try:
+        current_id = get_current_user_from_cookie(request, db).user_id
+    except HTTPException:
+        current_id = None
+
+    scored = post_search.scored_subquery(db, q, visible=_feed_visibility(current_id))
+    if scored is None:
+        return []
+    # candidates đã lọc theo quyền xem của viewer
+    query = db.query(models.Post, scored.c.score).join(scored, scored.c.post_id == models.Post.post_id)
+    after = pagination.decode_cursor(cursor, int, int)
+    if after:
+        query = query.filter(pagination.keyset_before(scored.c.score, models.Post.post_id, *after))
+    rows = query.order_by(desc(scored.c.score), desc(models.Post.post_id)).limit(limit + 1).all()
+    rows = pagination.paginate(response, rows, limit, lambda row: (int(row[1]), row[0].post_id))
+
+    cards = _render_group_cards(_load_group_cards(db, [post for post, _ in rows]), image_width)
+    for card, (post, score) in zip(cards, rows):
+        if post.author_type == models.PostAuthorType.PAGE:
+            page = _page_header(db, post.author_id)
+            card["author_name"] = page.page_name if page else None
+            card["author_avatar"] = None
+        card["author_type"] = post.author_type
+        card["post_type"] = post.post_type
+        card["score"] = int(score)
+    return cards
+
+
+# --- Posts: delete ---
+@router.delete("/posts/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_post(post_id: int, request: Request, db: Session = Depends(get_db)):
+    """Delete a post with its comments, reactions, locations and search terms (uploaded files stay)."""
+    current = get_current_user_from_cookie(request, db)
+    post = db.query(models.Post).filter(models.Post.post_id == post_id).with_for_update().first()
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    if post.author_type == models.PostAuthorType.PAGE:
+        allowed = db.query(models.PageRole).filter(
+            models.PageRole.user_id == current.user_id, models.PageRole.page_id == post.author_id
+        ).first() is not None
+    else:
+        allowed = post.author_id == current.user_id
+    if not allowed:
+        raise HTTPException(status_code=403, detail="NOT_POST_AUTHOR")
+
+    group_ids = [
+        group_id
+        for (group_id,) in db.query(models.PostLocation.location_id).filter(
+            models.PostLocation.post_id == post_id,
+            models.PostLocation.location_type == models.LocationType.GROUP,
+        )
+    ]
+    comment_ids = select(models.Comment.comment_id).where(
+        models.Comment.commentable_type == models.CommentableType.POST,
+        models.Comment.commentable_id == post_id,
+    )
+    db.query(models.Reaction).filter(
+        or_(
+            and_(models.Reaction.reactable_type == models.ReactionTargetType.POST, models.Reaction.reactable_id == post_id),
+            and_(
+                models.Reaction.reactable_type == models.ReactionTargetType.COMMENT,
+                models.Reaction.reactable_id.in_(comment_ids),
+            ),
+        )
+    ).delete(synchronize_session=False)
+    comments = db.query(models.Comment).filter(
+        models.Comment.commentable_type == models.CommentableType.POST,
+        models.Comment.commentable_id == post_id,
+    )
+    # gỡ reply khỏi comment cha trước, FK parent_comment_id không cascade
+    comments.update({models.Comment.parent_comment_id: None}, synchronize_session=False)
+    comments.delete(synchronize_session=False)
+    # bài share còn lại, chỉ mất bài gốc
+    db.query(models.Post).filter(models.Post.parent_post_id == post_id).update(
+        {models.Post.parent_post_id: None}, synchronize_session=False
+    )
+    for model in (models.PostFile, models.PostLocation, models.UserSeenPost):
+        db.query(model).filter(model.post_id == post_id).delete(synchronize_session=False)
+    post_search.unindex_post(db, post_id)
+    db.delete(post)
+    timeline_cache.invalidate(db, group_ids)
+    db.commit()
+
 # --- Interactions: seen tracking ---
 @router.post("/interactions/seen")
 def mark_seen(payload: dict, request: Request, db: Session = Depends(get_db)):
     current = get_current_user_from_cookie(request, db)
     post_ids = payload.get("post_ids") or []
-    # Assume a table USER_SEEN_POSTS exists; if not, skip DB insert and just echo.
+    # IGNORE: giữ seen_at của lần xem đầu (reach của page tính theo đó)
     try:
-        for pid in post_ids:
-            db.execute(
-                models.UserSeenPost.__table__.insert().prefix_with("IGNORE"),
-                {"user_id": current.user_id, "post_id": pid},
+        if post_ids:
+            _insert_ignore(
+                db,
+                models.UserSeenPost.__table__,
+                [{"user_id": current.user_id, "post_id": pid} for pid in post_ids],
             )
         db.commit()
     except Exception:
@@ -1866,35 +2403,79 @@ def mark_seen(payload: dict, request: Request, db: Session = Depends(get_db)):
     return {"status": "synced"}
 
 # --- Groups ---
+def _is_group_member(db: Session, group_id: int, user_id: Optional[int]) -> bool:
+    """
+    JOINED membership check (one PK lookup). Not cached: it gates access, and
+    a cached answer would outlive a kick / ban on the other API workers.
+    """
+    if not user_id:
+        return False
+    return db.query(models.GroupMembership.user_id).filter(
+        models.GroupMembership.group_id == group_id,
+        models.GroupMembership.user_id == user_id,
+        models.GroupMembership.status == models.GroupMemberStatus.JOINED,
+    ).first() is not None
+
+
+MAX_BULK_MEMBERSHIP_USERS = 500
+
+
+def _bulk_user_ids(payload: dict) -> list[int]:
+    """Distinct, sorted user ids from payload["user_ids"] of the bulk membership endpoints."""
+    raw_ids = payload.get("user_ids")
+    if not isinstance(raw_ids, list) or not raw_ids:
+        raise HTTPException(status_code=400, detail="INVALID_USER_IDS")
+    try:
+        user_ids = sorted({int(u) for u in raw_ids})
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="INVALID_USER_IDS")
+    if len(user_ids) > MAX_BULK_MEMBERSHIP_USERS:
+        raise HTTPException(status_code=400, detail="TOO_MANY_USERS")
+    return user_ids
+
+
+def _membership_changed(db: Session, group_id: int, user_id: int, old_status, new_status):
+    """
+    Keep groups.member_count (JOINED members) in step with a membership
+    status change. Pass None for a membership being created / deleted; call
+    before commit.
+    """
+    joined = models.GroupMemberStatus.JOINED
+    delta = int(new_status in (joined, joined.value)) - int(old_status in (joined, joined.value))
+    if delta:
+        db.query(models.Group).filter(models.Group.group_id == group_id).update(
+            {models.Group.member_count: models.Group.member_count + delta},
+            synchronize_session=False,
+        )
+
+
 @router.get("/groups/my-groups")
 async def get_my_groups(request: Request, db: Session = Depends(get_db)):
     """Get all groups user is a member of"""
     current = get_current_user_from_cookie(request, db)
     
-    memberships = db.query(models.GroupMembership).filter(
-        models.GroupMembership.user_id == current.user_id,
-        models.GroupMembership.status.in_([models.GroupMemberStatus.JOINED, models.GroupMemberStatus.PENDING])
-    ).all()
+    rows = (
+        db.query(models.GroupMembership, models.Group)
+        .join(models.Group, models.Group.group_id == models.GroupMembership.group_id)
+        .filter(
+            models.GroupMembership.user_id == current.user_id,
+            models.GroupMembership.status.in_([models.GroupMemberStatus.JOINED, models.GroupMemberStatus.PENDING])
+        )
+        .all()
+    )
     
     result = []
-    for m in memberships:
-        group = db.query(models.Group).filter(models.Group.group_id == m.group_id).first()
-        if group:
-            member_count = db.query(models.GroupMembership).filter(
-                models.GroupMembership.group_id == group.group_id,
-                models.GroupMembership.status == models.GroupMemberStatus.JOINED
-            ).count()
-            
-            result.append({
-                "group_id": group.group_id,
-                "group_name": group.group_name,
-                "description": group.description,
-                "cover_photo_url": group.cover_photo_url,
-                "privacy_type": group.privacy_type,
-                "member_count": member_count,
-                "my_role": m.role,
-                "my_status": m.status,
-            })
+    for m, group in rows:
+        result.append({
+            "group_id": group.group_id,
+            "group_name": group.group_name,
+            "description": group.description,
+            "cover_photo_url": group.cover_photo_url,
+            "privacy_type": group.privacy_type,
+            "member_count": group.member_count,
+            "my_role": m.role,
+            "my_status": m.status,
+        })
     
     return result
 
@@ -1906,116 +2487,108 @@ def get_group(group_id: int, request: Request, db: Session = Depends(get_db)):
     except:
         current_id = None
     
-    group = db.query(models.Group).filter(models.Group.group_id == group_id).first()
-    if not group:
-        raise HTTPException(status_code=404, detail="Group not found")
+    group = group_cache.require(db, group_id)
     
-    # Check if user is banned
+    # member_count / privacy_type không nằm trong group_cache; đọc cùng membership của user
+    query = db.query(models.Group.member_count, models.Group.privacy_type).filter(models.Group.group_id == group_id)
     if current_id:
-        membership = db.query(models.GroupMembership).filter(
-            models.GroupMembership.user_id == current_id,
-            models.GroupMembership.group_id == group_id,
-        ).first()
-        
-        if membership and membership.status == models.GroupMemberStatus.BANNED:
-            raise HTTPException(status_code=403, detail="You are banned from this group")
-        
-        my_status = getattr(membership, "status", None)
-        my_role = getattr(membership, "role", None)
-    else:
-        my_status = None
-        my_role = None
-    
-    # Get creator profile
-    creator_profile = db.query(models.Profile).filter(models.Profile.user_id == group.creator_user_id).first()
-    creator_name = None
-    if creator_profile:
-        creator_name = f"{creator_profile.first_name} {creator_profile.last_name}".strip()
+        query = query.add_columns(models.GroupMembership.status, models.GroupMembership.role).outerjoin(
+            models.GroupMembership,
+            and_(
+                models.GroupMembership.group_id == models.Group.group_id,
+                models.GroupMembership.user_id == current_id,
+            ),
+        )
+    row = query.first()
+    if not row:
+        group_cache.invalidate(group_id)
+        raise HTTPException(status_code=404, detail="Group not found")
+    my_status = getattr(row, "status", None)
+    my_role = getattr(row, "role", None)
     
-    # Get member count
-    member_count = db.query(models.GroupMembership).filter(
-        models.GroupMembership.group_id == group_id,
-        models.GroupMembership.status == models.GroupMemberStatus.JOINED
-    ).count()
+    # Check if user is banned
+    if my_status == models.GroupMemberStatus.BANNED:
+        raise HTTPException(status_code=403, detail="You are banned from this group")
     
     return {
         "group_id": group.group_id,
         "group_name": group.group_name,
         "description": group.description,
         "cover_photo_url": group.cover_photo_url,
-        "privacy_type": group.privacy_type,
+        "privacy_type": row.privacy_type,
         "is_visible": group.is_visible,
         "creator_user_id": group.creator_user_id,
-        "creator_name": creator_name,
+        "creator_name": group.creator_name,
         "created_at": group.created_at,
-        "member_count": member_count,
+        "member_count": row.member_count,
         "my_status": my_status,
         "my_role": my_role,
     }
 
-@router.get("/groups/{group_id}/posts")
-def get_group_posts(group_id: int, request: Request, db: Session = Depends(get_db)):
-    """Get all posts in a group"""
-    try:
-        current = get_current_user_from_cookie(request, db)
-        current_id = current.user_id
-    except:
-        current_id = None
-    
+@router.put("/groups/{group_id}")
+def update_group(group_id: int, payload: schemas.GroupUpdate, request: Request, db: Session = Depends(get_db)):
+    """Update group settings (admin only)"""
+    current = get_current_user_from_cookie(request, db)
+    role = db.query(models.GroupMembership.role).filter(
+        models.GroupMembership.group_id == group_id,
+        models.GroupMembership.user_id == current.user_id,
+        models.GroupMembership.status == models.GroupMemberStatus.JOINED,
+    ).scalar()
+    if role != models.GroupMemberRole.ADMIN:
+        raise HTTPException(status_code=403, detail="No permission")
     group = db.query(models.Group).filter(models.Group.group_id == group_id).first()
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
     
-    # For PRIVATE groups, only members can see posts
-    if group.privacy_type == models.GroupPrivacy.PRIVATE:
-        if not current_id:
-            raise HTTPException(status_code=401, detail="Login required")
-        
-        membership = db.query(models.GroupMembership).filter(
-            models.GroupMembership.user_id == current_id,
-            models.GroupMembership.group_id == group_id,
-            models.GroupMembership.status == models.GroupMemberStatus.JOINED
-        ).first()
-        
-        if not membership:
-            raise HTTPException(status_code=403, detail="Only members can view posts in private groups")
-    
-    # Get post locations for this group
-    post_locations = db.query(models.PostLocation).filter(
-        models.PostLocation.location_type == models.LocationType.GROUP,
-        models.PostLocation.location_id == group_id
-    ).all()
-    
-    post_ids = [pl.post_id for pl in post_locations]
-    if not post_ids:
+    for key, value in payload.model_dump(exclude_unset=True).items():
+        setattr(group, key, value)
+    db.commit()
+    group_cache.invalidate(group_id)
+    typeahead.group_changed(db, group_id)
+    return get_group(group_id, request, db)
+
+class _CardFile(NamedTuple):
+    file_id: int
+    file_url: str
+    file_type: str
+    thumbnail_url: Optional[str]
+    renditions: Optional[list]
+
+
+def _load_group_cards(db: Session, posts: list) -> list[dict]:
+    """Post cards for a group timeline: authors and files loaded for the whole page at once."""
+    if not posts:
         return []
-    
-    # Get posts
-    posts = db.query(models.Post).filter(models.Post.post_id.in_(post_ids)).order_by(models.Post.created_at.desc()).all()
-    
+    post_ids = [p.post_id for p in posts]
+    profiles = {
+        pr.user_id: pr
+        for pr in db.query(models.Profile).filter(models.Profile.user_id.in_({p.author_id for p in posts}))
+    }
+    files_by_post = defaultdict(list)
+    file_rows = (
+        db.query(
+            models.PostFile.post_id,
+            models.File.file_id,
+            models.File.file_url,
+            models.File.file_type,
+            models.File.thumbnail_url,
+            models.File.renditions,
+        )
+        .join(models.File, models.File.file_id == models.PostFile.file_id)
+        .filter(models.PostFile.post_id.in_(post_ids), models.File.status == models.FileStatus.READY)
+        .order_by(models.PostFile.post_id, models.PostFile.display_order)
+    )
+    for post_id, *file in file_rows:
+        files_by_post[post_id].append(_CardFile(*file))
+
     result = []
     for post in posts:
-        # Get author info
-        author_profile = db.query(models.Profile).filter(models.Profile.user_id == post.author_id).first()
+        author_profile = profiles.get(post.author_id)
         author_name = "Unknown"
         author_avatar = None
         if author_profile:
             author_name = f"{author_profile.first_name} {author_profile.last_name}".strip()
             author_avatar = author_profile.profile_picture_url
-        
-        # Get files
-        post_files_links = db.query(models.PostFile).filter(models.PostFile.post_id == post.post_id).all()
-        files = []
-        for pf in post_files_links:
-            file = db.query(models.File).filter(models.File.file_id == pf.file_id).first()
-            if file:
-                files.append({
-                    "file_id": file.file_id,
-                    "file_url": file.file_url,
-                    "file_type": file.file_type,
-                    "thumbnail_url": file.thumbnail_url
-                })
-        
         result.append({
             "post_id": post.post_id,
             "author_id": post.author_id,
@@ -2024,38 +2597,150 @@ def get_group_posts(group_id: int, request: Request, db: Session = Depends(get_d
             "text_content": post.text_content,
             "privacy_setting": post.privacy_setting,
             "created_at": post.created_at,
-            "files": files
+            "files": files_by_post[post.post_id],
         })
-    
     return result
 
+
+def _render_group_cards(cards, image_width: int) -> list[dict]:
+    """Response dicts for cards (cached ones are shared, so never mutate them)."""
+    return [
+        {
+            **card,
+            "files": [
+                {
+                    "file_id": f.file_id,
+                    "file_url": f.file_url,
+                    "file_type": f.file_type,
+                    "thumbnail_url": f.thumbnail_url,
+                    **media_urls.variants(f, image_width),
+                }
+                for f in card["files"]
+            ],
+        }
+        for card in cards
+    ]
+
+
+@router.get("/groups/{group_id}/posts")
+@router.get("/groups/{group_id}/feed")
+def get_group_posts(
+    group_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    last_post_id: Optional[int] = None,
+    width_class: str = media_urls.DEFAULT_WIDTH_CLASS,
+):
+    """
+    Group timeline, newest first. Keyset-paginated on post_id: the next page's
+    cursor is in the X-Next-Cursor header (last_post_id still works for older clients).
+    The first page comes from timeline_cache when the group is hot.
+    """
+    image_width = media_urls.width_for(width_class)
+    limit = pagination.clamp_limit(limit)
+    first_page = not cursor and not last_post_id and limit <= timeline_cache.HOT_TIMELINE_SIZE
+
+    # privacy đọc live (quyết định quyền xem); timeline_version cho biết trang cache còn đúng không
+    group = db.query(models.Group.privacy_type, models.Group.timeline_version).filter(
+        models.Group.group_id == group_id
+    ).first()
+    if group is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    hot = timeline_cache.get(group_id, group.timeline_version) if first_page else None
+    
+    # For PRIVATE groups, only members can see posts
+    if group.privacy_type == models.GroupPrivacy.PRIVATE:
+        try:
+            current_id = get_current_user_from_cookie(request, db).user_id
+        except HTTPException:
+            raise HTTPException(status_code=401, detail="Login required")
+        if not _is_group_member(db, group_id, current_id):
+            raise HTTPException(status_code=403, detail="Only members can view posts in private groups")
+
+    if hot:
+        cards = hot.cards[:limit]
+        if cards and (len(hot.cards) > limit or hot.has_more):
+            pagination.set_next_cursor(response, cards[-1]["post_id"])
+        return _render_group_cards(cards, image_width)
+
+    after = pagination.decode_cursor(cursor, int)
+    before_id = after[0] if after else last_post_id
+    # trang đầu load đủ HOT_TIMELINE_SIZE bài để nạp cache
+    fetch = timeline_cache.HOT_TIMELINE_SIZE if first_page else limit
+    # post_id tăng dần theo thời gian tạo -> sắp theo post_id, đi thẳng trên index post_locations
+    query = (
+        db.query(models.Post)
+        .join(models.PostLocation, models.PostLocation.post_id == models.Post.post_id)
+        .filter(models.PostLocation.location_type == models.LocationType.GROUP, models.PostLocation.location_id == group_id)
+    )
+    if before_id:
+        query = query.filter(models.PostLocation.post_id < before_id)
+    posts = query.order_by(desc(models.PostLocation.post_id)).limit(fetch + 1).all()
+    cards = _load_group_cards(db, posts[:fetch])
+    if first_page:
+        timeline_cache.fill(group_id, group.timeline_version, cards, has_more=len(posts) > fetch)
+    page = cards[:limit]
+    if page and len(posts) > limit:
+        pagination.set_next_cursor(response, page[-1]["post_id"])
+    return _render_group_cards(page, image_width)
+
 @router.get("/groups")
-def get_all_groups(db: Session = Depends(get_db)):
-    """Get all visible groups with member counts"""
-    groups = db.query(models.Group).filter(
-        models.Group.is_visible == True
-    ).all()
+def get_all_groups(
+    response: Response,
+    db: Session = Depends(get_db),
+    q: Optional[str] = None,
+    privacy_type: Optional[models.GroupPrivacy] = None,
+    sort: str = "popular",
+    limit: int = 20,
+    cursor: Optional[str] = None,
+):
+    """
+    Directory of visible groups (one query).
+    q: search by name; privacy_type: PUBLIC / PRIVATE; sort: popular (member_count) | newest.
+    Keyset-paginated, next page cursor in the X-Next-Cursor header.
+    """
+    if sort not in ("popular", "newest"):
+        raise HTTPException(status_code=400, detail="INVALID_SORT")
+    limit = pagination.clamp_limit(limit)
 
-    result = []
-    for group in groups:
-        member_count = db.query(models.GroupMembership).filter(
-            models.GroupMembership.group_id == group.group_id,
-            models.GroupMembership.status == models.GroupMemberStatus.JOINED
-        ).count()
-
-        creator = db.query(models.User).filter(models.User.user_id == group.creator_user_id).first()
-        creator_profile = db.query(models.Profile).filter(models.Profile.user_id == group.creator_user_id).first() if creator else None
-        creator_name = None
-        if creator_profile:
-            creator_name = ((creator_profile.first_name or '') + ' ' + (creator_profile.last_name or '')).strip() or None
+    query = (
+        db.query(models.Group, models.Profile.first_name, models.Profile.last_name)
+        .outerjoin(models.Profile, models.Profile.user_id == models.Group.creator_user_id)
+        .filter(models.Group.is_visible == True)
+    )
+    if q and q.strip():
+        query = query.filter(models.Group.group_name.contains(q.strip(), autoescape=True))
+    if privacy_type:
+        query = query.filter(models.Group.privacy_type == privacy_type)
+
+    if sort == "popular":
+        after = pagination.decode_cursor(cursor, int, int)
+        if after:
+            query = query.filter(pagination.keyset_before(models.Group.member_count, models.Group.group_id, *after))
+        query = query.order_by(desc(models.Group.member_count), desc(models.Group.group_id))
+        key = lambda row: (row[0].member_count, row[0].group_id)
+    else:
+        after = pagination.decode_cursor(cursor, int)
+        if after:
+            query = query.filter(models.Group.group_id < after[0])
+        query = query.order_by(desc(models.Group.group_id))
+        key = lambda row: (row[0].group_id,)
 
+    rows = pagination.paginate(response, query.limit(limit + 1).all(), limit, key)
+
+    result = []
+    for group, first_name, last_name in rows:
+        creator_name = ((first_name or '') + ' ' + (last_name or '')).strip() or None
         result.append({
             "group_id": group.group_id,
             "group_name": group.group_name,
             "description": group.description,
             "cover_photo_url": group.cover_photo_url,
             "privacy_type": group.privacy_type,
-            "member_count": member_count,
+            "member_count": group.member_count,
             "creator_name": creator_name,
             "created_at": group.created_at.isoformat() if group.created_at else None
         })
@@ -2075,6 +2760,7 @@ def create_group_with_setup(payload: dict, request: Request, db: Session = Depen
         cover_photo_url=payload.get("cover_photo_url"),
         privacy_type=payload.get("privacy_type", "PUBLIC"),
         is_visible=payload.get("is_visible", True),
+        member_count=1,  # người tạo (ADMIN, JOINED)
     )
     db.add(group)
     db.flush()
@@ -2111,6 +2797,7 @@ def create_group_with_setup(payload: dict, request: Request, db: Session = Depen
     
     db.commit()
     db.refresh(group)
+    typeahead.group_changed(db, group.group_id)
     
     return {
         "group_id": group.group_id,
@@ -2121,13 +2808,17 @@ def create_group_with_setup(payload: dict, request: Request, db: Session = Depen
 
 @router.get("/groups/{group_id}/questions")
 def get_group_questions(group_id: int, db: Session = Depends(get_db)):
-    return db.query(models.MembershipQuestion).filter(models.MembershipQuestion.group_id == group_id).all()
+    meta = group_cache.get(db, group_id)
+    return [
+        {"question_id": qid, "group_id": group_id, "question_text": q.question_text, "is_required": q.is_required}
+        for qid, q in meta.questions.items()
+    ] if meta else []
 
 @router.post("/groups/{group_id}/join")
 def join_group(group_id: int, payload: dict, request: Request, db: Session = Depends(get_db)):
     current = get_current_user_from_cookie(request, db)
-    group = db.query(models.Group).filter(models.Group.group_id == group_id).first()
-    if not group:
+    privacy = group_cache.privacy(db, group_id)
+    if privacy is None:
         raise HTTPException(status_code=404, detail="Group not found")
     
     # Check if user is banned
@@ -2139,23 +2830,20 @@ def join_group(group_id: int, payload: dict, request: Request, db: Session = Dep
     if existing and existing.status == models.GroupMemberStatus.BANNED:
         raise HTTPException(status_code=403, detail="You are banned from this group")
     
-    # Check required questions
-    required_questions = db.query(models.MembershipQuestion).filter(
-        models.MembershipQuestion.group_id == group_id,
-        models.MembershipQuestion.is_required == True
-    ).all()
-    
-    answers = payload.get("answers") or []
-    answered_question_ids = [ans["question_id"] for ans in answers]
-    
-    for req_q in required_questions:
-        if req_q.question_id not in answered_question_ids:
-            raise HTTPException(status_code=400, detail=f"Question '{req_q.question_text}' is required")
+    answers = {}
+    for ans in payload.get("answers") or []:
+        try:
+            answers[int(ans["question_id"])] = ans["answer_text"]
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="INVALID_ANSWER")
+    # Check required questions, save answers
+    _save_membership_answers(db, current.user_id, group_id, answers)
     
     # Determine status based on group privacy
-    status_val = models.GroupMemberStatus.JOINED if group.privacy_type == models.GroupPrivacy.PUBLIC else models.GroupMemberStatus.PENDING
+    status_val = models.GroupMemberStatus.JOINED if privacy == models.GroupPrivacy.PUBLIC else models.GroupMemberStatus.PENDING
     
     if existing:
+        _membership_changed(db, group_id, current.user_id, existing.status, status_val)
         existing.status = status_val
         existing.role = models.GroupMemberRole.MEMBER
     else:
@@ -2166,25 +2854,7 @@ def join_group(group_id: int, payload: dict, request: Request, db: Session = Dep
             status=status_val
         )
         db.add(gm)
-    
-    # Save answers
-    for ans in answers:
-        answer_obj = db.query(models.MembershipAnswer).filter(
-            models.MembershipAnswer.user_id == current.user_id,
-            models.MembershipAnswer.group_id == group_id,
-            models.MembershipAnswer.question_id == ans["question_id"]
-        ).first()
-        
-        if answer_obj:
-            answer_obj.answer_text = ans["answer_text"]
-        else:
-            rec = models.MembershipAnswer(
-                user_id=current.user_id,
-                group_id=group_id,
-                question_id=ans["question_id"],
-                answer_text=ans["answer_text"]
-            )
-            db.add(rec)
+        _membership_changed(db, group_id, current.user_id, None, status_val)
     
     db.commit()
     return {"status": status_val.value, "message": "Request sent" if status_val == models.GroupMemberStatus.PENDING else "Joined successfully"}
@@ -2194,33 +2864,11 @@ def leave_group(group_id: int, request: Request, db: Session = Depends(get_db)):
     current = get_current_user_from_cookie(request, db)
     gm = db.query(models.GroupMembership).filter(models.GroupMembership.group_id == group_id, models.GroupMembership.user_id == current.user_id).first()
     if gm:
+        _membership_changed(db, group_id, current.user_id, gm.status, None)
         db.delete(gm)
         db.commit()
     return {"status": "LEFT"}
 
-@router.get("/groups/{group_id}/feed")
-def group_feed(group_id: int, request: Request, db: Session = Depends(get_db), limit: int = 10, last_post_id: Optional[int] = None):
-    current = get_current_user_from_cookie(request, db)
-    group = db.query(models.Group).filter(models.Group.group_id == group_id).first()
-    if not group:
-        raise HTTPException(status_code=404, detail="Group not found")
-    if group.privacy_type == models.GroupPrivacy.PRIVATE:
-        gm = db.query(models.GroupMembership).filter(
-            models.GroupMembership.group_id == group_id,
-            models.GroupMembership.user_id == current.user_id,
-            models.GroupMembership.status == models.GroupMemberStatus.JOINED,
-        ).first()
-        if not gm:
-            raise HTTPException(status_code=403, detail="GROUP_NOT_JOINED")
-    query = (
-        db.query(models.Post)
-        .join(models.PostLocation, models.PostLocation.post_id == models.Post.post_id)
-        .filter(models.PostLocation.location_type == models.LocationType.GROUP, models.PostLocation.location_id == group_id)
-    )
-    if last_post_id:
-        query = query.filter(models.Post.post_id < last_post_id)
-    return query.order_by(desc(models.Post.created_at)).limit(limit).all()
-
 @router.get("/groups/{group_id}/members")
 def group_members(group_id: int, request: Request, db: Session = Depends(get_db), status_filter: Optional[models.GroupMemberStatus] = models.GroupMemberStatus.JOINED):
     get_current_user_from_cookie(request, db)
@@ -2242,6 +2890,7 @@ def update_group_member(group_id: int, user_id: int, payload: dict, request: Req
     if not gm:
         raise HTTPException(status_code=404, detail="Membership not found")
     if "status" in payload:
+        _membership_changed(db, group_id, user_id, gm.status, payload["status"])
         gm.status = payload["status"]
     if "role" in payload and admin_membership.role == models.GroupMemberRole.ADMIN:
         gm.role = payload["role"]
@@ -2267,6 +2916,7 @@ def approve_member(group_id: int, user_id: int, request: Request, db: Session =
     if not gm:
         raise HTTPException(status_code=404, detail="Request not found")
     
+    _membership_changed(db, group_id, user_id, gm.status, models.GroupMemberStatus.JOINED)
     gm.status = models.GroupMemberStatus.JOINED
     db.commit()
     return {"message": "Member approved", "status": "JOINED"}
@@ -2287,6 +2937,7 @@ def reject_member(group_id: int, user_id: int, request: Request, db: Session = D
         models.GroupMembership.user_id == user_id
     ).first()
     if gm:
+        _membership_changed(db, group_id, user_id, gm.status, None)
         db.delete(gm)
         db.commit()
     
@@ -2309,6 +2960,7 @@ def ban_member(group_id: int, user_id: int, request: Request, db: Session = Depe
     ).first()
     
     if gm:
+        _membership_changed(db, group_id, user_id, gm.status, models.GroupMemberStatus.BANNED)
         gm.status = models.GroupMemberStatus.BANNED
     else:
         gm = models.GroupMembership(
@@ -2356,6 +3008,7 @@ def invite_friend_to_group(group_id: int, user_id: int, request: Request, db: Se
             raise HTTPException(status_code=400, detail="User is already a member")
         elif existing.status == models.GroupMemberStatus.PENDING:
             # Auto-approve if invited by admin
+            _membership_changed(db, group_id, user_id, existing.status, models.GroupMemberStatus.JOINED)
             existing.status = models.GroupMemberStatus.JOINED
             db.commit()
             return {"message": "Pending request approved", "status": "JOINED"}
@@ -2370,13 +3023,100 @@ def invite_friend_to_group(group_id: int, user_id: int, request: Request, db: Se
         status=models.GroupMemberStatus.JOINED
     )
     db.add(membership)
+    _membership_changed(db, group_id, user_id, None, models.GroupMemberStatus.JOINED)
     db.commit()
     
+    invitee_profile = db.query(models.Profile).filter(models.Profile.user_id == user_id).first()
+    invitee_name = f"{invitee_profile.first_name} {invitee_profile.last_name}".strip() if invitee_profile else invitee.email
     return {
-        "message": f"Successfully invited {invitee.full_name or invitee.username} to the group",
+        "message": f"Successfully invited {invitee_name} to the group",
         "status": "JOINED"
     }
 
+@router.post("/groups/{group_id}/invite")
+def bulk_invite_to_group(group_id: int, request: Request, payload: dict = Body(...), db: Session = Depends(get_db)):
+    """
+    Admin/Moderator invites many users at once.
+    payload: {"user_ids": [...]}
+    Returns one outcome per user: JOINED (new member), APPROVED (pending request
+    approved), ALREADY_MEMBER, BANNED or USER_NOT_FOUND.
+    """
+    admin = get_current_user_from_cookie(request, db)
+    user_ids = _bulk_user_ids(payload)
+
+    # quyền + group tồn tại: 1 query
+    admin_role = db.query(models.GroupMembership.role).join(
+        models.Group, models.Group.group_id == models.GroupMembership.group_id
+    ).filter(
+        models.GroupMembership.group_id == group_id,
+        models.GroupMembership.user_id == admin.user_id,
+    ).scalar()
+    if admin_role not in [models.GroupMemberRole.ADMIN, models.GroupMemberRole.MODERATOR]:
+        raise HTTPException(status_code=403, detail="No permission to invite members")
+
+    found = {uid for (uid,) in db.query(models.User.user_id).filter(models.User.user_id.in_(user_ids))}
+    existing = dict(
+        db.query(models.GroupMembership.user_id, models.GroupMembership.status).filter(
+            models.GroupMembership.group_id == group_id,
+            models.GroupMembership.user_id.in_(user_ids),
+        )
+    )
+
+    outcomes = {}
+    to_insert, to_approve = [], []
+    for uid in user_ids:
+        current_status = existing.get(uid)
+        if uid not in found:
+            outcomes[uid] = "USER_NOT_FOUND"
+        elif current_status is None:
+            to_insert.append(uid)
+            outcomes[uid] = "JOINED"
+        elif current_status == models.GroupMemberStatus.JOINED:
+            outcomes[uid] = "ALREADY_MEMBER"
+        elif current_status == models.GroupMemberStatus.BANNED:
+            outcomes[uid] = "BANNED"
+        else:
+            # PENDING / INVITED: admin mời thì duyệt luôn
+            to_approve.append(uid)
+            outcomes[uid] = "APPROVED"
+
+    added = 0
+    if to_insert:
+        db.execute(
+            models.GroupMembership.__table__.insert().values([
+                {
+                    "user_id": uid,
+                    "group_id": group_id,
+                    "role": models.GroupMemberRole.MEMBER,
+                    "status": models.GroupMemberStatus.JOINED,
+                }
+                for uid in to_insert
+            ])
+        )
+        added += len(to_insert)
+    if to_approve:
+        added += db.query(models.GroupMembership).filter(
+            models.GroupMembership.group_id == group_id,
+            models.GroupMembership.user_id.in_(to_approve),
+            models.GroupMembership.status.in_([models.GroupMemberStatus.PENDING, models.GroupMemberStatus.INVITED]),
+        ).update({models.GroupMembership.status: models.GroupMemberStatus.JOINED}, synchronize_session=False)
+    if added:
+        db.query(models.Group).filter(models.Group.group_id == group_id).update(
+            {models.Group.member_count: models.Group.member_count + added},
+            synchronize_session=False,
+        )
+    try:
+        db.commit()
+    except IntegrityError:
+        # có người vừa join/được mời song song
+        db.rollback()
+        raise HTTPException(status_code=409, detail="MEMBERSHIP_CONFLICT")
+
+    return {
+        "invited": added,
+        "results": [{"user_id": uid, "status": outcomes[uid]} for uid in user_ids],
+    }
+
 @router.post("/groups/{group_id}/members/{user_id}/unban")
 def unban_member(group_id: int, user_id: int, request: Request, db: Session = Depends(get_db)):
     """Unban a member from the group"""
@@ -2401,8 +3141,18 @@ def unban_member(group_id: int, user_id: int, request: Request, db: Session = De
     return {"message": "Member unbanned"}
 
 @router.get("/groups/{group_id}/pending-requests")
-def get_pending_requests(group_id: int, request: Request, db: Session = Depends(get_db)):
-    """Get pending join requests for a group (admin/moderator only)"""
+def get_pending_requests(
+    group_id: int,
+    request: Request,
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Pending join requests for a group, oldest first (admin/moderator only).
+    Keyset-paginated, next page cursor in the X-Next-Cursor header.
+    """
     admin = get_current_user_from_cookie(request, db)
     admin_membership = db.query(models.GroupMembership).filter(
         models.GroupMembership.group_id == group_id,
@@ -2410,37 +3160,167 @@ def get_pending_requests(group_id: int, request: Request, db: Session = Depends(
     ).first()
     if not admin_membership or admin_membership.role not in [models.GroupMemberRole.ADMIN, models.GroupMemberRole.MODERATOR]:
         raise HTTPException(status_code=403, detail="No permission")
-    
-    pending = db.query(models.GroupMembership).filter(
+    limit = pagination.clamp_limit(limit)
+
+    query = db.query(models.GroupMembership.user_id, models.GroupMembership.joined_at).filter(
         models.GroupMembership.group_id == group_id,
         models.GroupMembership.status == models.GroupMemberStatus.PENDING
-    ).all()
-    
+    )
+    after = pagination.decode_cursor(cursor, pagination.parse_datetime, int)
+    if after:
+        query = query.filter(pagination.keyset_after(models.GroupMembership.joined_at, models.GroupMembership.user_id, *after))
+    query = query.order_by(models.GroupMembership.joined_at, models.GroupMembership.user_id)
+    pending = pagination.paginate(response, query.limit(limit + 1).all(), limit, lambda r: (r.joined_at, r.user_id))
+    if not pending:
+        return []
+
+    # cả trang: 1 query profile + 1 query câu trả lời
+    user_ids = [p.user_id for p in pending]
+    profiles = {
+        row.user_id: row
+        for row in db.query(
+            models.Profile.user_id,
+            models.Profile.first_name,
+            models.Profile.last_name,
+            models.Profile.profile_picture_url,
+        ).filter(models.Profile.user_id.in_(user_ids))
+    }
+    answers = defaultdict(list)
+    for a in db.query(models.MembershipAnswer).filter(
+        models.MembershipAnswer.group_id == group_id,
+        models.MembershipAnswer.user_id.in_(user_ids),
+    ).order_by(models.MembershipAnswer.question_id):
+        answers[a.user_id].append(a)
+    meta = group_cache.get(db, group_id)
+    questions = meta.questions if meta else {}
+
     result = []
     for p in pending:
-        profile = db.query(models.Profile).filter(models.Profile.user_id == p.user_id).first()
-        answers = db.query(models.MembershipAnswer).filter(
-            models.MembershipAnswer.user_id == p.user_id,
-            models.MembershipAnswer.group_id == group_id
-        ).all()
-        
-        user_name = None
-        user_avatar = None
-        if profile:
-            user_name = f"{profile.first_name} {profile.last_name}".strip()
-            user_avatar = profile.profile_picture_url
-        
+        profile = profiles.get(p.user_id)
         result.append({
             "user_id": p.user_id,
-            "user_name": user_name,
-            "user_avatar": user_avatar,
+            "user_name": f"{profile.first_name} {profile.last_name}".strip() if profile else None,
+            "user_avatar": profile.profile_picture_url if profile else None,
             "joined_at": p.joined_at,
-            "answers": [{"question_id": a.question_id, "answer_text": a.answer_text} for a in answers]
+            "answers": [
+                {
+                    "question_id": a.question_id,
+                    "question_text": questions[a.question_id].question_text if a.question_id in questions else None,
+                    "answer_text": a.answer_text,
+                }
+                for a in answers[p.user_id]
+            ]
         })
-    
+
     return result
 
+@router.post("/groups/{group_id}/pending-requests/bulk")
+def bulk_review_pending_requests(group_id: int, request: Request, payload: dict = Body(...), db: Session = Depends(get_db)):
+    """
+    Approve or reject many pending requests at once (admin/moderator only).
+    payload: {"user_ids": [...], "action": "approve" | "reject"}
+    Users without a pending request are returned in "skipped".
+    """
+    admin = get_current_user_from_cookie(request, db)
+    admin_membership = db.query(models.GroupMembership).filter(
+        models.GroupMembership.group_id == group_id,
+        models.GroupMembership.user_id == admin.user_id,
+    ).first()
+    if not admin_membership or admin_membership.role not in [models.GroupMemberRole.ADMIN, models.GroupMemberRole.MODERATOR]:
+        raise HTTPException(status_code=403, detail="No permission")
+
+    action = payload.get("action")
+    if action not in ("approve", "reject"):
+        raise HTTPException(status_code=400, detail="INVALID_ACTION")
+    user_ids = _bulk_user_ids(payload)
+
+    pending_filter = (
+        models.GroupMembership.group_id == group_id,
+        models.GroupMembership.user_id.in_(user_ids),
+        models.GroupMembership.status == models.GroupMemberStatus.PENDING,
+    )
+    # khóa các dòng PENDING để UPDATE/DELETE bên dưới khớp đúng danh sách trả về
+    reviewed = sorted(
+        uid for (uid,) in db.query(models.GroupMembership.user_id).filter(*pending_filter).with_for_update()
+    )
+    if reviewed:
+        memberships = db.query(models.GroupMembership).filter(*pending_filter)
+        if action == "approve":
+            changed = memberships.update(
+                {models.GroupMembership.status: models.GroupMemberStatus.JOINED},
+                synchronize_session=False,
+            )
+            db.query(models.Group).filter(models.Group.group_id == group_id).update(
+                {models.Group.member_count: models.Group.member_count + changed},
+                synchronize_session=False,
+            )
+        else:
+            memberships.delete(synchronize_session=False)
+        db.commit()
+
+    reviewed_set = set(reviewed)
+    return {
+        "action": action,
+        "updated": reviewed,
+        "skipped": [uid for uid in user_ids if uid not in reviewed_set],
+    }
+
 # --- Pages ---
+MAX_ANALYTICS_DAYS = 366
+
+class _PageHeader(NamedTuple):
+    page_id: int
+    page_name: str
+    username: Optional[str]
+
+
+# page_id -> _PageHeader (tên page hiện trên mọi bài của page)
+_page_header_cache = TTLCache(ttl_seconds=300, max_entries=10000)
+
+
+def _page_header(db: Session, page_id: int) -> Optional[_PageHeader]:
+    """Name / username of a page, cached per page (missing pages are not cached)."""
+    header = _page_header_cache.get(page_id)
+    if header is None:
+        row = db.query(models.Page.page_id, models.Page.page_name, models.Page.username).filter(
+            models.Page.page_id == page_id
+        ).first()
+        if row is None:
+            return None
+        header = _PageHeader(*row)
+        _page_header_cache.set(page_id, header)
+    return header
+
+
+def _load_post_stats(db: Session, post_ids: list, viewer_id: Optional[int]):
+    """
+    Like counts, comment counts and the viewer's liked posts for a page of
+    posts: one GROUP BY / IN query each. Returns (likes, comments, liked_ids).
+    """
+    if not post_ids:
+        return {}, {}, set()
+    likes = dict(
+        db.query(models.Reaction.reactable_id, func.count())
+        .filter(models.Reaction.reactable_type == models.ReactionTargetType.POST, models.Reaction.reactable_id.in_(post_ids))
+        .group_by(models.Reaction.reactable_id)
+    )
+    comments = dict(
+        db.query(models.Comment.commentable_id, func.count())
+        .filter(models.Comment.commentable_type == models.CommentableType.POST, models.Comment.commentable_id.in_(post_ids))
+        .group_by(models.Comment.commentable_id)
+    )
+    liked_ids = set()
+    if viewer_id:
+        liked_ids = {
+            pid
+            for (pid,) in db.query(models.Reaction.reactable_id).filter(
+                models.Reaction.reactor_user_id == viewer_id,
+                models.Reaction.reactable_type == models.ReactionTargetType.POST,
+                models.Reaction.reactable_id.in_(post_ids),
+            )
+        }
+    return likes, comments, liked_ids
+
 @router.get("/pages/{page_id}")
 def get_page(page_id: int, request: Request, db: Session = Depends(get_db)):
     current = get_current_user_from_cookie(request, db)
@@ -2450,9 +3330,6 @@ def get_page(page_id: int, request: Request, db: Session = Depends(get_db)):
     role = db.query(models.PageRole).filter(models.PageRole.user_id == current.user_id, models.PageRole.page_id == page_id).first()
     follow = db.query(models.PageFollow).filter(models.PageFollow.user_id == current.user_id, models.PageFollow.page_id == page_id).first()
 
-    # Count followers
-    follower_count = db.query(models.PageFollow).filter(models.PageFollow.page_id == page_id).count()
-
     return {
         "page_id": page.page_id,
         "name": page.page_name,
@@ -2460,30 +3337,112 @@ def get_page(page_id: int, request: Request, db: Session = Depends(get_db)):
         "category": page.category,
         "description": page.description,
         "contact_info": page.contact_info,
-        "follower_count": follower_count,
+        "follower_count": page.follower_count,
         "is_followed": bool(follow),
         "my_role": getattr(role, "role", None)
     }
 
+def _insert_ignore(db: Session, table, values) -> bool:
+    """
+    INSERT IGNORE one row (dict) or a batch of rows (list of dicts); True when
+    at least one was inserted, False when every key already existed.
+    """
+    prefix = "OR IGNORE" if db.get_bind().dialect.name == "sqlite" else "IGNORE"
+    return db.execute(table.insert().prefix_with(prefix), values).rowcount > 0
+
+
+def _page_follow_changed(db: Session, page_id: int, delta: int):
+    """Keep pages.follower_count in step with page_follows; call before commit."""
+    db.query(models.Page).filter(models.Page.page_id == page_id).update(
+        {models.Page.follower_count: models.Page.follower_count + delta},
+        synchronize_session=False,
+    )
+
 @router.post("/pages/{page_id}/follow")
 def follow_page(page_id: int, request: Request, db: Session = Depends(get_db)):
     current = get_current_user_from_cookie(request, db)
-    db.merge(models.PageFollow(user_id=current.user_id, page_id=page_id))
+    # IGNORE cũng nuốt lỗi FK, nên kiểm tra page trước
+    if not db.query(models.Page.page_id).filter(models.Page.page_id == page_id).first():
+        raise HTTPException(status_code=404, detail="Page not found")
+    # follow lại lần nữa: không đổi followed_at, không tăng counter
+    if _insert_ignore(db, models.PageFollow.__table__, {"user_id": current.user_id, "page_id": page_id}):
+        _page_follow_changed(db, page_id, 1)
     db.commit()
     return {"status": "FOLLOWED"}
 
 @router.delete("/pages/{page_id}/follow")
 def unfollow_page(page_id: int, request: Request, db: Session = Depends(get_db)):
     current = get_current_user_from_cookie(request, db)
-    rec = db.query(models.PageFollow).filter(models.PageFollow.user_id == current.user_id, models.PageFollow.page_id == page_id).first()
-    if rec:
-        db.delete(rec)
-        db.commit()
+    deleted = db.query(models.PageFollow).filter(
+        models.PageFollow.user_id == current.user_id,
+        models.PageFollow.page_id == page_id,
+    ).delete(synchronize_session=False)
+    if deleted:
+        _page_follow_changed(db, page_id, -deleted)
+    db.commit()
     return {"status": "UNFOLLOWED"}
 
+@router.get("/pages/{page_id}/followers")
+def get_page_followers(
+    page_id: int,
+    request: Request,
+    response: Response,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Followers of a page, most recent first.
+    Keyset-paginated, next page cursor in the X-Next-Cursor header.
+    """
+    get_current_user_from_cookie(request, db)
+    limit = pagination.clamp_limit(limit)
+
+    query = (
+        db.query(
+            models.PageFollow.user_id,
+            models.PageFollow.followed_at,
+            models.Profile.first_name,
+            models.Profile.last_name,
+            models.Profile.profile_picture_url,
+        )
+        .outerjoin(models.Profile, models.Profile.user_id == models.PageFollow.user_id)
+        .filter(models.PageFollow.page_id == page_id)
+    )
+    after = pagination.decode_cursor(cursor, pagination.parse_datetime, int)
+    if after:
+        query = query.filter(pagination.keyset_before(models.PageFollow.followed_at, models.PageFollow.user_id, *after))
+    query = query.order_by(desc(models.PageFollow.followed_at), desc(models.PageFollow.user_id))
+    rows = pagination.paginate(response, query.limit(limit + 1).all(), limit, lambda r: (r.followed_at, r.user_id))
+
+    return [
+        {
+            "user_id": r.user_id,
+            "user_name": f"{r.first_name} {r.last_name}".strip() if r.first_name is not None else None,
+            "user_avatar": r.profile_picture_url,
+            "followed_at": r.followed_at,
+        }
+        for r in rows
+    ]
+
 @router.get("/pages/{page_id}/posts")
-def page_posts(page_id: int, db: Session = Depends(get_db), request: Request = None, limit: int = 10, last_post_id: Optional[int] = None):
-    """Get formatted posts for a page with author and file information"""
+def page_posts(
+    page_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    request: Request = None,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    last_post_id: Optional[int] = None,
+    width_class: str = media_urls.DEFAULT_WIDTH_CLASS,
+):
+    """
+    Get formatted posts for a page with author and file information, newest first.
+    Keyset-paginated on (created_at, post_id): the next page's cursor is in the
+    X-Next-Cursor header (last_post_id still works for older clients).
+    """
+    image_width = media_urls.width_for(width_class)
+    limit = pagination.clamp_limit(limit)
     current = None
     if request:
         try:
@@ -2493,7 +3452,7 @@ def page_posts(page_id: int, db: Session = Depends(get_db), request: Request = N
     viewer_id = getattr(current, "user_id", None)
 
     # Get page info
-    page = db.query(models.Page).filter(models.Page.page_id == page_id).first()
+    page = _page_header(db, page_id)
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
 
@@ -2503,39 +3462,35 @@ def page_posts(page_id: int, db: Session = Depends(get_db), request: Request = N
         models.PostLocation.location_type == models.LocationType.PAGE_TIMELINE,
         models.PostLocation.location_id == page_id,
     )
-    if last_post_id:
-        q = q.filter(models.Post.post_id < last_post_id)
-
-    posts = q.order_by(desc(models.Post.created_at)).limit(limit).all()
+    after = pagination.decode_cursor(cursor, pagination.parse_datetime, int)
+    if not after and last_post_id:
+        # client cũ chỉ gửi post_id: lấy created_at của bài đó làm cursor
+        last_created = db.query(models.Post.created_at).filter(models.Post.post_id == last_post_id).scalar()
+        if last_created:
+            after = (last_created, last_post_id)
+    if after:
+        q = q.filter(pagination.keyset_before(models.Post.created_at, models.Post.post_id, *after))
+
+    q = q.order_by(desc(models.Post.created_at), desc(models.Post.post_id))
+    posts = pagination.paginate(response, q.limit(limit + 1).all(), limit, lambda p: (p.created_at, p.post_id))
+
+    # cả trang: file, số like/comment, like của viewer mỗi loại 1 query
+    post_ids = [post.post_id for post in posts]
+    files_by_post = defaultdict(list)
+    if post_ids:
+        file_rows = (
+            db.query(models.PostFile.post_id, models.File)
+            .join(models.File, models.File.file_id == models.PostFile.file_id)
+            .filter(models.PostFile.post_id.in_(post_ids), models.File.status == models.FileStatus.READY)
+            .order_by(models.PostFile.post_id, models.PostFile.display_order)
+        )
+        for post_id, f in file_rows:
+            files_by_post[post_id].append(f)
+    likes, comments, liked_ids = _load_post_stats(db, post_ids, viewer_id)
 
     # Format posts with page information
     formatted_posts = []
     for post in posts:
-        # Get files
-        files_q = db.query(models.File).join(
-            models.PostFile, models.PostFile.file_id == models.File.file_id
-        ).filter(models.PostFile.post_id == post.post_id)
-        files = files_q.all()
-
-        # Get stats
-        like_count = db.query(models.Reaction).filter(
-            models.Reaction.reactable_id == post.post_id,
-            models.Reaction.reactable_type == models.ReactionTargetType.POST
-        ).count()
-
-        comment_count = db.query(models.Comment).filter(
-            models.Comment.commentable_id == post.post_id,
-            models.Comment.commentable_type == models.CommentableType.POST
-        ).count()
-
-        is_liked = False
-        if viewer_id:
-            is_liked = db.query(models.Reaction).filter(
-                models.Reaction.reactor_user_id == viewer_id,
-                models.Reaction.reactable_id == post.post_id,
-                models.Reaction.reactable_type == models.ReactionTargetType.POST
-            ).first() is not None
-
         formatted_posts.append({
             "post_id": post.post_id,
             "text_content": post.text_content,
@@ -2543,6 +3498,7 @@ def page_posts(page_id: int, db: Session = Depends(get_db), request: Request = N
             "privacy_setting": "PUBLIC",
             "author_id": page_id,
             "author_name": page.page_name,
+            "author_username": page.username,
             "author_avatar": None,
             "files": [
                 {
@@ -2550,19 +3506,53 @@ def page_posts(page_id: int, db: Session = Depends(get_db), request: Request = N
                     "file_url": f.file_url,
                     "file_name": f.file_name,
                     "file_type": f.file_type,
+                    "thumbnail_url": f.thumbnail_url,
+                    **media_urls.variants(f, image_width),
                     "kind": "IMAGE" if f.file_type.startswith("image/") else "VIDEO" if f.file_type.startswith("video/") else "FILE"
                 }
-                for f in files
+                for f in files_by_post[post.post_id]
             ],
             "stats": {
-                "likes": like_count,
-                "comments": comment_count
+                "likes": likes.get(post.post_id, 0),
+                "comments": comments.get(post.post_id, 0)
             },
-            "is_liked_by_me": is_liked
+            "is_liked_by_me": post.post_id in liked_ids
         })
 
     return formatted_posts
 
+@router.get("/pages/{page_id}/analytics")
+def page_analytics_series(
+    page_id: int,
+    request: Request,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Daily page stats (ADMIN / ANALYST of the page). Served from the
+    page_daily_stats rollup only; defaults to the 30 days up to the last
+    rolled-up day.
+    """
+    current = get_current_user_from_cookie(request, db)
+    role = db.query(models.PageRole.role).filter(
+        models.PageRole.user_id == current.user_id,
+        models.PageRole.page_id == page_id,
+    ).scalar()
+    if role not in (models.PageRoleEnum.ADMIN, models.PageRoleEnum.ANALYST):
+        raise HTTPException(status_code=403, detail="PAGE_ACCESS_DENIED")
+
+    through = page_analytics.through_day(db)
+    end = end or through or date.today() - timedelta(days=1)
+    start = start or end - timedelta(days=29)
+    if start > end or (end - start).days >= MAX_ANALYTICS_DAYS:
+        raise HTTPException(status_code=400, detail="INVALID_RANGE")
+    return {
+        "page_id": page_id,
+        "through_day": through,
+        "days": page_analytics.series(db, page_id, start, end),
+    }
+
 @router.get("/pages/{page_id}/roles")
 def page_roles(page_id: int, request: Request, db: Session = Depends(get_db)):
     admin = get_current_user_from_cookie(request, db)
@@ -2608,6 +3598,79 @@ def my_pages(request: Request, db: Session = Depends(get_db)):
     roles = db.query(models.PageRole, models.Page).join(models.Page, models.Page.page_id == models.PageRole.page_id).filter(models.PageRole.user_id == current.user_id).all()
     return [{"page_id": p.page_id, "name": p.page_name, "role": pr.role} for pr, p in roles]
 
+@router.get("/me/event-reminders")
+def my_event_reminders(
+    request: Request,
+    response: Response,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Reminders delivered by the event scheduler to the current user, newest first.
+    Keyset-paginated, next page cursor in the X-Next-Cursor header.
+    """
+    current = get_current_user_from_cookie(request, db)
+    limit = pagination.clamp_limit(limit)
+
+    reminder = models.EventReminder
+    q = (
+        db.query(
+            reminder.reminder_id,
+            reminder.kind,
+            reminder.created_at,
+            models.Event.event_id,
+            models.Event.event_name,
+            models.Event.start_time,
+            models.Event.location_text,
+        )
+        .join(models.Event, models.Event.event_id == reminder.event_id)
+        .filter(reminder.user_id == current.user_id)
+    )
+    after = pagination.decode_cursor(cursor, pagination.parse_datetime, int)
+    if after:
+        q = q.filter(pagination.keyset_before(reminder.created_at, reminder.reminder_id, *after))
+    q = q.order_by(desc(reminder.created_at), desc(reminder.reminder_id))
+    rows = pagination.paginate(response, q.limit(limit + 1).all(), limit, lambda r: (r.created_at, r.reminder_id))
+
+    return [
+        {
+            "reminder_id": r.reminder_id,
+            "kind": r.kind.value,
+            "created_at": r.created_at.isoformat() if r.created_at else None,
+            "event_id": r.event_id,
+            "event_name": r.event_name,
+            "start_time": r.start_time.isoformat() if r.start_time else None,
+            "location_text": r.location_text,
+        }
+        for r in rows
+    ]
+
+@router.get("/me/calendar-feed")
+def my_calendar_feed(request: Request, db: Session = Depends(get_db)):
+    """Subscription URL of the current user's events calendar (token in the query string, no cookie needed)"""
+    current = get_current_user_from_cookie(request, db)
+    token = calendar_feed.feed_token(current.user_id)
+    return {"url": f"{request.url_for('user_events_ics', user_id=current.user_id)}?token={token}"}
+
+@router.get("/users/{user_id}/events.ics", name="user_events_ics")
+def user_events_ics(user_id: int, request: Request, token: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    iCalendar feed of the user's GOING / INTERESTED events, streamed.
+    Polls with a matching If-None-Match get 304.
+    """
+    if not calendar_feed.verify_token(user_id, token):
+        raise HTTPException(status_code=403, detail="INVALID_FEED_TOKEN")
+    etag = calendar_feed.etag(db, user_id)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if calendar_feed.etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return StreamingResponse(
+        calendar_feed.stream(user_id),
+        media_type="text/calendar; charset=utf-8",
+        headers={**headers, "Content-Disposition": 'inline; filename="events.ics"'},
+    )
+
 # --- Events ---
 @router.post("/events", status_code=status.HTTP_201_CREATED)
 def create_event(payload: dict, request: Request, db: Session = Depends(get_db)):
@@ -2626,7 +3689,7 @@ def create_event(payload: dict, request: Request, db: Session = Depends(get_db))
         role = db.query(models.PageRole).filter(
             models.PageRole.page_id == host_id,
             models.PageRole.user_id == current.user_id,
-            models.PageRole.role_type.in_([models.PageRoleType.ADMIN, models.PageRoleType.EDITOR])
+            models.PageRole.role.in_([models.PageRoleEnum.ADMIN, models.PageRoleEnum.EDITOR])
         ).first()
         if not role:
             raise HTTPException(status_code=403, detail="Must be admin or editor to create page event")
@@ -2640,13 +3703,13 @@ def create_event(payload: dict, request: Request, db: Session = Depends(get_db))
         start_time=payload["start_time"],
         end_time=payload.get("end_time"),
         location_text=payload.get("location_text"),
-        privacy_setting=payload.get("privacy_setting", models.EventPrivacy.PUBLIC)
+        privacy_setting=payload.get("privacy_setting", models.EventPrivacy.PUBLIC),
+        going_count=1,
     )
     db.add(event)
-    db.commit()
-    db.refresh(event)
+    db.flush()
 
-    # Auto-RSVP creator as GOING
+    # Auto-RSVP creator as GOING (đã tính trong going_count ở trên)
     participant = models.EventParticipant(
         event_id=event.event_id,
         user_id=current.user_id,
@@ -2654,6 +3717,8 @@ def create_event(payload: dict, request: Request, db: Session = Depends(get_db))
     )
     db.add(participant)
     db.commit()
+    db.refresh(event)
+    event_scheduler.schedule(event.event_id, event.start_time)
 
     return event
 
@@ -2671,37 +3736,7 @@ def get_event(event_id: int, request: Request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Event not found")
 
     # Get host info
-    host_info = {}
-    if event.host_type == models.PostAuthorType.USER:
-        host = db.query(models.User).filter(models.User.user_id == event.host_id).first()
-        if host:
-            host_info = {
-                "host_id": host.user_id,
-                "host_type": "USER",
-                "name": f"{host.first_name} {host.last_name}",
-                "avatar": host.avatar_url
-            }
-    elif event.host_type == models.PostAuthorType.PAGE:
-        host = db.query(models.Page).filter(models.Page.page_id == event.host_id).first()
-        if host:
-            host_info = {
-                "host_id": host.page_id,
-                "host_type": "PAGE",
-                "name": host.page_name,
-                "avatar": host.avatar_url,
-                "username": host.page_username
-            }
-
-    # Get participant counts
-    going_count = db.query(models.EventParticipant).filter(
-        models.EventParticipant.event_id == event_id,
-        models.EventParticipant.rsvp_status == models.RSVPStatus.GOING
-    ).count()
-
-    interested_count = db.query(models.EventParticipant).filter(
-        models.EventParticipant.event_id == event_id,
-        models.EventParticipant.rsvp_status == models.RSVPStatus.INTERESTED
-    ).count()
+    host_info = _event_hosts(db, [event]).get((event.host_type, event.host_id), {})
 
     # Get current user's RSVP
     user_rsvp = None
@@ -2724,8 +3759,9 @@ def get_event(event_id: int, request: Request, db: Session = Depends(get_db)):
         "location_text": event.location_text,
         "privacy_setting": event.privacy_setting.value,
         "host": host_info,
-        "going_count": going_count,
-        "interested_count": interested_count,
+        "going_count": event.going_count,
+        "interested_count": event.interested_count,
+        "cant_go_count": event.cant_go_count,
         "user_rsvp": user_rsvp
     }
 
@@ -2746,7 +3782,7 @@ def update_event(event_id: int, payload: dict, request: Request, db: Session = D
         role = db.query(models.PageRole).filter(
             models.PageRole.page_id == event.host_id,
             models.PageRole.user_id == current.user_id,
-            models.PageRole.role_type.in_([models.PageRoleType.ADMIN, models.PageRoleType.EDITOR])
+            models.PageRole.role.in_([models.PageRoleEnum.ADMIN, models.PageRoleEnum.EDITOR])
         ).first()
         can_edit = role is not None
 
@@ -2769,6 +3805,8 @@ def update_event(event_id: int, payload: dict, request: Request, db: Session = D
 
     db.commit()
     db.refresh(event)
+    if "start_time" in payload:
+        event_scheduler.schedule(event.event_id, event.start_time)
     return event
 
 @router.delete("/events/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -2788,135 +3826,224 @@ def delete_event(event_id: int, request: Request, db: Session = Depends(get_db))
         role = db.query(models.PageRole).filter(
             models.PageRole.page_id == event.host_id,
             models.PageRole.user_id == current.user_id,
-            models.PageRole.role_type == models.PageRoleType.ADMIN
+            models.PageRole.role == models.PageRoleEnum.ADMIN
         ).first()
         can_delete = role is not None
 
     if not can_delete:
         raise HTTPException(status_code=403, detail="Only the host can delete this event")
 
-    # Delete participants first
-    db.query(models.EventParticipant).filter(models.EventParticipant.event_id == event_id).delete()
-    # Delete publications
+    # Delete participants first (the RSVP counters go away with the event row)
+    db.query(models.EventParticipant).filter(models.EventParticipant.event_id == event_id).delete(synchronize_session=False)
+    # Delete publications and delivered reminders
     db.query(models.EventPublication).filter(models.EventPublication.event_id == event_id).delete()
+    db.query(models.EventReminder).filter(models.EventReminder.event_id == event_id).delete(synchronize_session=False)
     # Delete event
     db.delete(event)
     db.commit()
+    event_scheduler.cancel(event_id)
     return None
 
+RSVP_COUNT_COLUMNS = {
+    models.RSVPStatus.GOING: models.Event.going_count,
+    models.RSVPStatus.INTERESTED: models.Event.interested_count,
+    models.RSVPStatus.CANT_GO: models.Event.cant_go_count,
+}
+
+
+def _rsvp_changed(db: Session, event_id: int, old_status, new_status):
+    """Keep the events.*_count RSVP counters in step with event_participants; call before commit."""
+    if old_status == new_status:
+        return
+    values = {}
+    if old_status is not None:
+        column = RSVP_COUNT_COLUMNS[models.RSVPStatus(old_status)]
+        values[column] = column - 1
+    if new_status is not None:
+        column = RSVP_COUNT_COLUMNS[models.RSVPStatus(new_status)]
+        values[column] = column + 1
+    # counter không phải là sửa event: giữ updated_at (ETag của calendar feed)
+    values[models.Event.updated_at] = models.Event.updated_at
+    db.query(models.Event).filter(models.Event.event_id == event_id).update(values, synchronize_session=False)
+
+
 @router.post("/events/{event_id}/rsvp")
 def rsvp_event(event_id: int, payload: dict, request: Request, db: Session = Depends(get_db)):
     current = get_current_user_from_cookie(request, db)
-    status_val = payload.get("status")
+    try:
+        status_val = models.RSVPStatus(payload.get("status"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="INVALID_RSVP_STATUS")
 
     # Check if event exists
-    event = db.query(models.Event).filter(models.Event.event_id == event_id).first()
-    if not event:
+    if not db.query(models.Event.event_id).filter(models.Event.event_id == event_id).first():
         raise HTTPException(status_code=404, detail="Event not found")
 
-    rec = models.EventParticipant(event_id=event_id, user_id=current.user_id, rsvp_status=status_val)
-    db.merge(rec)
+    participant = models.EventParticipant
+    key = (participant.event_id == event_id, participant.user_id == current.user_id)
+    # khóa dòng RSVP cũ để hai request song song không cùng trừ một counter
+    old_status = db.query(participant.rsvp_status).filter(*key).with_for_update().scalar()
+    if old_status is None:
+        values = {"event_id": event_id, "user_id": current.user_id, "rsvp_status": status_val}
+        if not _insert_ignore(db, participant.__table__, values):
+            # request khác vừa insert trước: coi như đổi trạng thái
+            old_status = db.query(participant.rsvp_status).filter(*key).with_for_update().scalar()
+    if old_status is not None and old_status != status_val:
+        db.query(participant).filter(*key).update(
+            {participant.rsvp_status: status_val, participant.updated_at: func.now()},
+            synchronize_session=False,
+        )
+    _rsvp_changed(db, event_id, old_status, status_val)
     db.commit()
-    return {"status": status_val}
+    return {"status": status_val.value}
 
 @router.get("/events/{event_id}/participants")
-def event_participants(event_id: int, db: Session = Depends(get_db), status_filter: Optional[models.RSVPStatus] = None):
-    """Get event participants with user details"""
-    q = db.query(models.EventParticipant).filter(models.EventParticipant.event_id == event_id)
-    if status_filter:
-        q = q.filter(models.EventParticipant.rsvp_status == status_filter)
-
-    participants = q.all()
+def event_participants(
+    event_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    status_filter: Optional[models.RSVPStatus] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+):
+    """
+    Event participants with user details, most recent RSVP first.
+    Keyset-paginated on (updated_at, user_id), next page cursor in the X-Next-Cursor header.
+    """
+    limit = pagination.clamp_limit(limit)
+    if not db.query(models.Event.event_id).filter(models.Event.event_id == event_id).first():
+        raise HTTPException(status_code=404, detail="Event not found")
 
-    # Format with user details
-    result = []
-    for p in participants:
-        user = db.query(models.User).filter(models.User.user_id == p.user_id).first()
-        if user:
-            result.append({
-                "user_id": user.user_id,
-                "name": f"{user.first_name} {user.last_name}",
-                "avatar": user.avatar_url,
-                "rsvp_status": p.rsvp_status.value,
-                "updated_at": p.updated_at.isoformat() if p.updated_at else None
-            })
+    participant = models.EventParticipant
+    q = (
+        db.query(
+            participant.user_id,
+            participant.rsvp_status,
+            participant.updated_at,
+            models.Profile.first_name,
+            models.Profile.last_name,
+            models.Profile.profile_picture_url,
+        )
+        .join(models.Profile, models.Profile.user_id == participant.user_id)
+        .filter(participant.event_id == event_id)
+    )
+    if status_filter:
+        q = q.filter(participant.rsvp_status == status_filter)
+    after = pagination.decode_cursor(cursor, pagination.parse_datetime, int)
+    if after:
+        q = q.filter(pagination.keyset_before(participant.updated_at, participant.user_id, *after))
+    q = q.order_by(desc(participant.updated_at), desc(participant.user_id))
+    rows = pagination.paginate(response, q.limit(limit + 1).all(), limit, lambda r: (r.updated_at, r.user_id))
+
+    return [
+        {
+            "user_id": r.user_id,
+            "name": f"{r.first_name} {r.last_name}".strip(),
+            "avatar": r.profile_picture_url,
+            "rsvp_status": r.rsvp_status.value,
+            "updated_at": r.updated_at.isoformat() if r.updated_at else None
+        }
+        for r in rows
+    ]
+
+
+def _event_hosts(db: Session, events) -> dict:
+    """{(host_type, host_id): host info} for a batch of events: one query for user hosts, one for page hosts."""
+    user_ids = {e.host_id for e in events if e.host_type == models.PostAuthorType.USER}
+    page_ids = {e.host_id for e in events if e.host_type == models.PostAuthorType.PAGE}
+    hosts = {}
+    if user_ids:
+        for uid, first_name, last_name, avatar in db.query(
+            models.Profile.user_id, models.Profile.first_name, models.Profile.last_name, models.Profile.profile_picture_url
+        ).filter(models.Profile.user_id.in_(user_ids)):
+            hosts[(models.PostAuthorType.USER, uid)] = {
+                "host_id": uid,
+                "host_type": "USER",
+                "name": f"{first_name} {last_name}".strip(),
+                "avatar": avatar,
+            }
+    if page_ids:
+        for page_id, page_name, username in db.query(
+            models.Page.page_id, models.Page.page_name, models.Page.username
+        ).filter(models.Page.page_id.in_(page_ids)):
+            hosts[(models.PostAuthorType.PAGE, page_id)] = {
+                "host_id": page_id,
+                "host_type": "PAGE",
+                "name": page_name,
+                "avatar": None,
+                "username": username,
+            }
+    return hosts
 
-    return result
 
 @router.get("/events")
-def list_events(request: Request, db: Session = Depends(get_db), type: Optional[str] = None):
-    """List events with host info and participant counts"""
+def list_events(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    type: Optional[str] = None,
+    when: str = "upcoming",
+    limit: int = 20,
+    cursor: Optional[str] = None,
+):
+    """
+    List events with host info, RSVP counters and the viewer's RSVP (one query for the page).
+    type: HOSTING | GOING (needs login), otherwise public events.
+    when: upcoming (default, soonest first) | past (most recent first).
+    Keyset-paginated on (start_time, event_id), next page cursor in the X-Next-Cursor header.
+    """
+    if when not in ("upcoming", "past"):
+        raise HTTPException(status_code=400, detail="INVALID_WHEN")
+    limit = pagination.clamp_limit(limit)
     try:
         current = get_current_user_from_cookie(request, db)
         current_user_id = current.user_id
     except:
         current_user_id = None
 
-    # Filter events based on type
+    Event = models.Event
+    mine = aliased(models.EventParticipant)
+
+    # 1) event_id của trang hiện tại (đi theo index start_time)
+    ids = db.query(Event.event_id)
     if type == "HOSTING" and current_user_id:
-        events = db.query(models.Event).filter(
-            models.Event.host_id == current_user_id,
-            models.Event.host_type == models.PostAuthorType.USER
-        ).all()
+        ids = ids.filter(Event.host_id == current_user_id, Event.host_type == models.PostAuthorType.USER)
     elif type == "GOING" and current_user_id:
-        eps = db.query(models.EventParticipant).filter(
-            models.EventParticipant.user_id == current_user_id,
-            models.EventParticipant.rsvp_status.in_([models.RSVPStatus.GOING, models.RSVPStatus.INTERESTED])
-        ).all()
-        ids = [e.event_id for e in eps]
-        events = db.query(models.Event).filter(models.Event.event_id.in_(ids)).all()
+        ids = ids.join(mine, and_(mine.event_id == Event.event_id, mine.user_id == current_user_id)).filter(
+            mine.rsvp_status.in_([models.RSVPStatus.GOING, models.RSVPStatus.INTERESTED])
+        )
     else:
         # Get all public events
-        events = db.query(models.Event).filter(
-            models.Event.privacy_setting == models.EventPrivacy.PUBLIC
-        ).all()
-
-    # Format events with host info and counts
-    result = []
-    for event in events:
-        # Get host info
-        host_info = {}
-        if event.host_type == models.PostAuthorType.USER:
-            host = db.query(models.User).filter(models.User.user_id == event.host_id).first()
-            if host:
-                host_info = {
-                    "host_id": host.user_id,
-                    "host_type": "USER",
-                    "name": f"{host.first_name} {host.last_name}",
-                    "avatar": host.avatar_url
-                }
-        elif event.host_type == models.PostAuthorType.PAGE:
-            host = db.query(models.Page).filter(models.Page.page_id == event.host_id).first()
-            if host:
-                host_info = {
-                    "host_id": host.page_id,
-                    "host_type": "PAGE",
-                    "name": host.page_name,
-                    "avatar": host.avatar_url,
-                    "username": host.page_username
-                }
+        ids = ids.filter(Event.privacy_setting == models.EventPrivacy.PUBLIC)
+    if when == "upcoming":
+        ids = ids.filter(Event.start_time >= func.now())
+    else:
+        ids = ids.filter(Event.start_time < func.now())
 
-        # Get participant counts
-        going_count = db.query(models.EventParticipant).filter(
-            models.EventParticipant.event_id == event.event_id,
-            models.EventParticipant.rsvp_status == models.RSVPStatus.GOING
-        ).count()
-
-        interested_count = db.query(models.EventParticipant).filter(
-            models.EventParticipant.event_id == event.event_id,
-            models.EventParticipant.rsvp_status == models.RSVPStatus.INTERESTED
-        ).count()
-
-        # Get current user's RSVP
-        user_rsvp = None
-        if current_user_id:
-            participant = db.query(models.EventParticipant).filter(
-                models.EventParticipant.event_id == event.event_id,
-                models.EventParticipant.user_id == current_user_id
-            ).first()
-            if participant:
-                user_rsvp = participant.rsvp_status.value
+    after = pagination.decode_cursor(cursor, pagination.parse_datetime, int)
+    if when == "past":
+        if after:
+            ids = ids.filter(pagination.keyset_before(Event.start_time, Event.event_id, *after))
+        order = (desc(Event.start_time), desc(Event.event_id))
+    else:
+        if after:
+            ids = ids.filter(pagination.keyset_after(Event.start_time, Event.event_id, *after))
+        order = (Event.start_time, Event.event_id)
+    page_ids = ids.order_by(*order).limit(limit + 1).subquery()
+
+    # 2) cả trang cùng RSVP của viewer trong một query (counter nằm sẵn trên events)
+    rows = (
+        db.query(Event, mine.rsvp_status.label("user_rsvp"))
+        .join(page_ids, page_ids.c.event_id == Event.event_id)
+        .outerjoin(mine, and_(mine.event_id == Event.event_id, mine.user_id == current_user_id))
+        .order_by(*order)
+        .all()
+    )
+    rows = pagination.paginate(response, rows, limit, lambda r: (r[0].start_time, r[0].event_id))
+    hosts = _event_hosts(db, [r[0] for r in rows])
 
+    result = []
+    for event, user_rsvp in rows:
         result.append({
             "event_id": event.event_id,
             "host_id": event.host_id,
@@ -2927,10 +4054,11 @@ def list_events(request: Request, db: Session = Depends(get_db), type: Optional[
             "end_time": event.end_time.isoformat() if event.end_time else None,
             "location_text": event.location_text,
             "privacy_setting": event.privacy_setting.value,
-            "host": host_info,
-            "going_count": going_count,
-            "interested_count": interested_count,
-            "user_rsvp": user_rsvp
+            "host": hosts.get((event.host_type, event.host_id), {}),
+            "going_count": event.going_count,
+            "interested_count": event.interested_count,
+            "cant_go_count": event.cant_go_count,
+            "user_rsvp": user_rsvp.value if user_rsvp else None
         })
 
     return result
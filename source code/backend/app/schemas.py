@@ -176,6 +176,7 @@ class FileUpdate(BaseModel):
 
 class File(FileBase):
     file_id: int
+    status: Optional[models.FileStatus] = None
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
@@ -258,6 +259,7 @@ class PageUpdate(BaseModel):
 
 class Page(PageBase):
     page_id: int
+    follower_count: int = 0
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
@@ -310,6 +312,7 @@ class GroupUpdate(BaseModel):
 
 class Group(GroupBase):
     group_id: int
+    member_count: int = 0
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
@@ -426,6 +429,9 @@ class EventUpdate(BaseModel):
 
 class Event(EventBase):
     event_id: int
+    going_count: int = 0
+    interested_count: int = 0
+    cant_go_count: int = 0
 
     model_config = ConfigDict(from_attributes=True)
 
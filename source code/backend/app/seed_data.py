@@ -7,7 +7,7 @@ from typing import Any, Dict
 from sqlalchemy.orm import Session
 
 from .database import SessionLocal, engine
-from . import models
+from . import maintenance, models, post_search, post_sentiment
 
 
 def get_or_create(session: Session, model, match: Dict[str, Any], **extra):
@@ -353,6 +353,13 @@ def seed():
             notes=f"Action {i}",
         )
 
+    # memberships / follows / RSVP / reactions được insert trực tiếp, tính lại counter
+    maintenance.recount_group_members(db)
+    maintenance.recount_page_followers(db)
+    maintenance.recount_event_rsvps(db)
+    post_sentiment.backfill(db)
+    post_search.backfill(db)
+
     db.close()
 
 
@@ -363,6 +370,7 @@ def clear_seed_data():
         models.ReportAction,
         models.Report,
         models.ReportReason,
+        models.EventReminder,
         models.EventParticipant,
         models.EventPublication,
         models.Event,
@@ -379,6 +387,7 @@ def clear_seed_data():
         models.PostFile,
         models.File,
         models.PostLocation,
+        models.PostSearchTerm,
         models.Post,
         models.Friendship,
         models.UserRole,
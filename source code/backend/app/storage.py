@@ -0,0 +1,86 @@
+"""Storage backends for uploaded media.
+
+Cloudinary is the default. STORAGE_BACKEND=local writes files under
+MEDIA_ROOT and serves them from the app at /media; it is opt-in because a
+file only exists on the API host that received it. With the Cloudinary
+backend and no credentials, uploads are refused (503) rather than kept on
+local disk.
+"""
+import os
+import urllib.request
+
+from .cloudinary_utils import CLOUDINARY_ENABLED, delete_from_cloudinary, upload_to_cloudinary
+
+STORAGE_BACKEND = (os.getenv("STORAGE_BACKEND") or "cloudinary").lower()
+MEDIA_ROOT = os.path.abspath(os.getenv("MEDIA_ROOT", "media"))
+MEDIA_URL = os.getenv("MEDIA_URL", "http://localhost:8000/media").rstrip("/")
+
+
+def available() -> bool:
+    """False when the configured backend cannot store anything (Cloudinary without credentials)."""
+    return STORAGE_BACKEND == "local" or CLOUDINARY_ENABLED
+
+
+def resource_type_for(mime_type: str | None) -> str:
+    """Map a MIME type to the Cloudinary-style resource type (image / video / raw)."""
+    mime_type = mime_type or ""
+    if mime_type.startswith("image/"):
+        return "image"
+    if mime_type.startswith("video/"):
+        return "video"
+    return "raw"
+
+
+def _local_path(key: str) -> str:
+    path = os.path.abspath(os.path.join(MEDIA_ROOT, key))
+    # không cho key thoát ra ngoài MEDIA_ROOT
+    if os.path.commonpath([path, MEDIA_ROOT]) != MEDIA_ROOT:
+        raise ValueError(f"Invalid storage key: {key}")
+    return path
+
+
+def put_bytes(data: bytes, key: str, mime_type: str | None = None) -> dict:
+    """
+    Lưu bytes lên backend đang dùng.
+    Trả về dict có: url, key, bytes, resource_type.
+    """
+    if STORAGE_BACKEND == "cloudinary":
+        result = upload_to_cloudinary(data, key)
+        return {
+            "url": result["secure_url"],
+            "key": result.get("public_id", key),
+            "bytes": result.get("bytes", len(data)),
+            "resource_type": result.get("resource_type", resource_type_for(mime_type)),
+        }
+
+    path = _local_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as fh:
+        fh.write(data)
+    return {
+        "url": f"{MEDIA_URL}/{key}",
+        "key": key,
+        "bytes": len(data),
+        "resource_type": resource_type_for(mime_type),
+    }
+
+
+def delete(key: str, resource_type: str = "raw"):
+    """Xoá object khỏi backend. Object không tồn tại thì bỏ qua."""
+    if STORAGE_BACKEND == "cloudinary":
+        delete_from_cloudinary(key, resource_type)
+        return
+
+    try:
+        os.remove(_local_path(key))
+    except FileNotFoundError:
+        pass
+
+
+def get_bytes(url: str) -> bytes:
+    """Đọc lại nội dung một object đã lưu (theo URL trả về từ put_bytes)."""
+    if url.startswith(f"{MEDIA_URL}/"):
+        with open(_local_path(url[len(MEDIA_URL) + 1:]), "rb") as fh:
+            return fh.read()
+    with urllib.request.urlopen(url, timeout=60) as resp:
+        return resp.read()
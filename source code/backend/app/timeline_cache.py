@@ -0,0 +1,104 @@
+"""Hot cache of the newest post cards of each group timeline.
+
+get_group_posts serves the first page of a group from here. Every write that
+changes what a group's cards show (a post added or deleted, files attached
+or detached, a file's status or renditions) bumps groups.timeline_version in
+the same transaction. A cached page keeps the version it was loaded at, and
+get_group_posts reads the current version together with the group's privacy
+(one PK lookup), so a change made through any API worker turns every
+worker's copy into a miss. create_post also pushes the new card into this
+worker's copy, which stays valid when no other change came in between.
+"""
+import os
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .cache import TTLCache
+
+HOT_TIMELINE_SIZE = int(os.getenv("HOT_TIMELINE_SIZE", "50"))
+HOT_TIMELINE_TTL_SECONDS = int(os.getenv("HOT_TIMELINE_TTL_SECONDS", "300"))
+HOT_TIMELINE_GROUPS = int(os.getenv("HOT_TIMELINE_GROUPS", "1000"))
+
+
+@dataclass(frozen=True)
+class HotTimeline:
+    version: int  # groups.timeline_version lúc load
+    cards: tuple  # newest first, at most HOT_TIMELINE_SIZE
+    has_more: bool  # có bài cũ hơn ngoài cache
+
+
+_entries = TTLCache(ttl_seconds=HOT_TIMELINE_TTL_SECONDS, max_entries=HOT_TIMELINE_GROUPS)
+_lock = threading.Lock()
+
+
+def get(group_id: int, version: int) -> Optional[HotTimeline]:
+    """The cached page if it was loaded at the group's current timeline_version."""
+    hot = _entries.get(group_id)
+    return hot if hot is not None and hot.version == version else None
+
+
+def fill(group_id: int, version: int, cards: list, has_more: bool):
+    """Store cards loaded after reading the group's timeline_version (`version`)."""
+    _entries.set(
+        group_id,
+        HotTimeline(version, tuple(cards[:HOT_TIMELINE_SIZE]), has_more or len(cards) > HOT_TIMELINE_SIZE),
+    )
+
+
+def push(group_id: int, version: int, card: dict):
+    """
+    Add a new post card to this worker's cached page. `version` is the group's
+    timeline_version after the post's own bump; a page that missed another change is dropped.
+    """
+    with _lock:
+        hot = _entries.get(group_id)
+        if hot is None:
+            return
+        if hot.version != version - 1:
+            _entries.delete(group_id)
+            return
+        cards = sorted(
+            [card] + [c for c in hot.cards if c["post_id"] != card["post_id"]],
+            key=lambda c: c["post_id"],
+            reverse=True,
+        )
+        _entries.set(
+            group_id,
+            HotTimeline(version, tuple(cards[:HOT_TIMELINE_SIZE]), hot.has_more or len(cards) > HOT_TIMELINE_SIZE),
+        )
+
+
+def invalidate(db: Session, group_ids):
+    """Bump the timeline_version of these groups; call before the change's commit."""
+    group_ids = list(group_ids)
+    if not group_ids:
+        return
+    db.query(models.Group).filter(models.Group.group_id.in_(group_ids)).update(
+        {models.Group.timeline_version: models.Group.timeline_version + 1},
+        synchronize_session=False,
+    )
+
+
+def invalidate_posts(db: Session, post_ids):
+    """Bump the timelines of the groups these posts are in; call before commit."""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+    rows = db.query(models.PostLocation.location_id).filter(
+        models.PostLocation.post_id.in_(post_ids),
+        models.PostLocation.location_type == models.LocationType.GROUP,
+    ).distinct()
+    invalidate(db, [group_id for (group_id,) in rows])
+
+
+def invalidate_files(db: Session, file_ids):
+    """Bump the timelines showing any of these files (status / renditions changed); call before commit."""
+    file_ids = list(file_ids)
+    if not file_ids:
+        return
+    rows = db.query(models.PostFile.post_id).filter(models.PostFile.file_id.in_(file_ids)).distinct()
+    invalidate_posts(db, [post_id for (post_id,) in rows])
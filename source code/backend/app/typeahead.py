@@ -0,0 +1,361 @@
+"""Typeahead over people, pages and groups (GET /search/typeahead).
+
+Each API worker keeps a sorted array of (key, type, id) in memory. Names are
+diacritic-folded (post_search.fold) and indexed from every word on, so
+"nguy" finds "An Nguyễn"; profiles are also indexed last name first, pages
+by username too. A prefix query is a bisect plus a scan of the adjacent
+keys (at most TYPEAHEAD_SCAN_LIMIT), with no database work.
+
+Ranking puts the viewer's friends, joined groups and followed pages first,
+then exact and start-of-name matches, then bigger pages / groups. The
+viewer's relations are matched against their own keys as well, so a friend
+is found even when a short prefix matches more than the scan limit. They
+are read with three indexed queries and cached for
+TYPEAHEAD_RELATIONS_TTL_SECONDS.
+
+A background thread builds the array at startup and rebuilds it every
+TYPEAHEAD_RELOAD_SECONDS. In between, profile / page / group writes update it
+in place (insort / delete on the array) and append a typeahead_changes row;
+every worker polls that table every TYPEAHEAD_POLL_SECONDS and re-reads the
+changed entities, so a write on one worker reaches the others within a poll.
+Writes that land while a rebuild is reading the database are recorded and
+replayed once the new array is swapped in. The full rebuild also catches a
+change row committed out of change_id order, which a poll can step over.
+"""
+import bisect
+import heapq
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from sqlalchemy import func, inspect, or_
+from sqlalchemy.orm import Session
+
+from . import models
+from .cache import TTLCache
+from .database import SessionLocal
+from .post_search import fold
+
+TYPEAHEAD_ENABLED = os.getenv("TYPEAHEAD_ENABLED", "1") == "1"
+TYPEAHEAD_RELOAD_SECONDS = int(os.getenv("TYPEAHEAD_RELOAD_SECONDS", "3600"))
+TYPEAHEAD_POLL_SECONDS = int(os.getenv("TYPEAHEAD_POLL_SECONDS", "5"))
+TYPEAHEAD_RELATIONS_TTL_SECONDS = int(os.getenv("TYPEAHEAD_RELATIONS_TTL_SECONDS", "60"))
+TYPEAHEAD_SCAN_LIMIT = int(os.getenv("TYPEAHEAD_SCAN_LIMIT", "1000"))
+MAX_NAME_WORDS = 8
+
+USER, PAGE, GROUP = "USER", "PAGE", "GROUP"
+TYPES = (USER, PAGE, GROUP)
+
+_WORD = re.compile(r"\w+")
+
+
+class Entry(NamedTuple):
+    entity_type: str
+    entity_id: int
+    name: str
+    username: Optional[str]
+    avatar_url: Optional[str]
+    popularity: int  # follower_count / member_count lúc nạp
+    folded_name: str
+    keys: tuple
+
+
+# (key, entity_type, entity_id), sorted
+_keys: list = []
+# (entity_type, entity_id) -> Entry
+_entries: dict = {}
+_lock = threading.Lock()
+# (entity_type, entity_id) -> Entry or None, ghi lại khi build() đang chạy
+_pending: Optional[dict] = None
+# typeahead_changes đã áp dụng tới change_id này
+_last_change_id = 0
+_relations = TTLCache(ttl_seconds=TYPEAHEAD_RELATIONS_TTL_SECONDS, max_entries=10000)
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def normalize(text: Optional[str]) -> str:
+    """Folded words joined by single spaces: "  Phở  Bò!" -> "pho bo"."""
+    return " ".join(fold(word) for word in _WORD.findall((text or "").lower())[:MAX_NAME_WORDS])
+
+
+def _word_keys(text: Optional[str]) -> list[str]:
+    words = normalize(text).split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+def _user_entry(user_id: int, first_name, last_name, avatar_url) -> Optional[Entry]:
+    name = f"{first_name or ''} {last_name or ''}".strip()
+    if not name:
+        return None
+    keys = set(_word_keys(name))
+    # tên Việt hay gõ họ trước: "nguyen an"
+    keys.add(normalize(f"{last_name or ''} {first_name or ''}"))
+    return Entry(USER, user_id, name, None, avatar_url, 0, normalize(name), tuple(sorted(keys)))
+
+
+def _page_entry(page_id: int, page_name, username, follower_count) -> Entry:
+    keys = set(_word_keys(page_name))
+    if username:
+        keys.add(normalize(username))
+    keys.discard("")
+    return Entry(PAGE, page_id, page_name, username, None, follower_count or 0, normalize(page_name), tuple(sorted(keys)))
+
+
+def _group_entry(group_id: int, group_name, cover_photo_url, member_count) -> Entry:
+    return Entry(
+        GROUP, group_id, group_name, None, cover_photo_url, member_count or 0,
+        normalize(group_name), tuple(_word_keys(group_name)),
+    )
+
+
+def _user_rows(db: Session):
+    return db.query(
+        models.Profile.user_id, models.Profile.first_name, models.Profile.last_name, models.Profile.profile_picture_url
+    ).join(models.User, models.User.user_id == models.Profile.user_id).filter(models.User.is_active == True)
+
+
+def _page_rows(db: Session):
+    return db.query(models.Page.page_id, models.Page.page_name, models.Page.username, models.Page.follower_count)
+
+
+def _group_rows(db: Session):
+    return db.query(
+        models.Group.group_id, models.Group.group_name, models.Group.cover_photo_url, models.Group.member_count
+    ).filter(models.Group.is_visible == True)
+
+
+def _remove(entity_type: str, entity_id: int):
+    """Drop an entity's keys (caller holds _lock)."""
+    old = _entries.pop((entity_type, entity_id), None)
+    if old is None:
+        return
+    for key in old.keys:
+        item = (key, entity_type, entity_id)
+        i = bisect.bisect_left(_keys, item)
+        if i < len(_keys) and _keys[i] == item:
+            del _keys[i]
+
+
+def _replace(entity_type: str, entity_id: int, entry: Optional[Entry]):
+    with _lock:
+        if _pending is not None:
+            _pending[(entity_type, entity_id)] = entry
+        _remove(entity_type, entity_id)
+        if entry is None:
+            return
+        _entries[(entity_type, entity_id)] = entry
+        for key in entry.keys:
+            bisect.insort(_keys, (key, entity_type, entity_id))
+
+
+def _load_entry(db: Session, entity_type: str, entity_id: int) -> Optional[Entry]:
+    """Current entry of one entity, or None when it should not be in the index."""
+    if entity_type == USER:
+        row = _user_rows(db).filter(models.Profile.user_id == entity_id).first()
+        return _user_entry(*row) if row else None
+    if entity_type == PAGE:
+        row = _page_rows(db).filter(models.Page.page_id == entity_id).first()
+        return _page_entry(*row) if row else None
+    row = _group_rows(db).filter(models.Group.group_id == entity_id).first()
+    return _group_entry(*row) if row else None
+
+
+def _publish(entity_type: str, entity_id: int):
+    """Log a change for the other API workers (own short transaction, after the caller's commit)."""
+    if not TYPEAHEAD_ENABLED:
+        return
+    db = SessionLocal()
+    try:
+        db.add(models.TypeaheadChange(entity_type=entity_type, entity_id=entity_id))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"WARNING: could not log typeahead change {entity_type} {entity_id}: {e}")
+    finally:
+        db.close()
+
+
+def user_changed(db: Session, user_id: int):
+    """Re-read one user's profile (after a commit); inactive or deleted users leave the index."""
+    _replace(USER, user_id, _load_entry(db, USER, user_id))
+    _publish(USER, user_id)
+
+
+def profile_changed(profile: models.Profile):
+    """register_simple_crud on_change hook for profiles."""
+    if inspect(profile).was_deleted:
+        _replace(USER, profile.user_id, None)
+    else:
+        _replace(USER, profile.user_id, _user_entry(
+            profile.user_id, profile.first_name, profile.last_name, profile.profile_picture_url
+        ))
+    _publish(USER, profile.user_id)
+
+
+def page_changed(db: Session, page_id: int):
+    _replace(PAGE, page_id, _load_entry(db, PAGE, page_id))
+    _publish(PAGE, page_id)
+
+
+def group_changed(db: Session, group_id: int):
+    """Re-read one group; hidden or deleted groups leave the index."""
+    _replace(GROUP, group_id, _load_entry(db, GROUP, group_id))
+    _publish(GROUP, group_id)
+
+
+def poll(db: Session) -> int:
+    """Re-read the entities logged in typeahead_changes since the last poll. Returns rows applied."""
+    global _last_change_id
+    change = models.TypeaheadChange
+    rows = (
+        db.query(change.change_id, change.entity_type, change.entity_id)
+        .filter(change.change_id > _last_change_id)
+        .order_by(change.change_id)
+        .all()
+    )
+    for ref in dict.fromkeys((t, i) for _, t, i in rows):
+        _replace(*ref, _load_entry(db, *ref))
+    if rows:
+        _last_change_id = rows[-1].change_id
+    return len(rows)
+
+
+def build(db: Session) -> int:
+    """Rebuild the whole index from the database. Returns the number of entities."""
+    global _keys, _entries, _pending, _last_change_id
+    # mọi change tới đây đã nằm trong dữ liệu đọc bên dưới; poll() đi tiếp từ đó
+    start_id = db.query(func.max(models.TypeaheadChange.change_id)).scalar() or 0
+    with _lock:
+        _pending = {}
+    try:
+        entries = {}
+        for row in _user_rows(db).yield_per(1000):
+            entry = _user_entry(*row)
+            if entry:
+                entries[(USER, entry.entity_id)] = entry
+        for row in _page_rows(db).yield_per(1000):
+            entries[(PAGE, row.page_id)] = _page_entry(*row)
+        for row in _group_rows(db).yield_per(1000):
+            entries[(GROUP, row.group_id)] = _group_entry(*row)
+        keys = sorted((key, t, i) for (t, i), entry in entries.items() for key in entry.keys)
+    except Exception:
+        with _lock:
+            _pending = None
+        raise
+    with _lock:
+        _keys, _entries = keys, entries
+        # ghi trong lúc đọc DB mới hơn dữ liệu vừa build
+        changed, _pending = _pending, None
+    for ref, entry in changed.items():
+        _replace(*ref, entry)
+    _last_change_id = max(_last_change_id, start_id)
+    return len(entries)
+
+
+def prune(db: Session) -> int:
+    """Drop typeahead_changes rows older than two rebuild periods (every worker has rebuilt since)."""
+    cutoff = datetime.now() - timedelta(seconds=2 * TYPEAHEAD_RELOAD_SECONDS)
+    deleted = db.query(models.TypeaheadChange).filter(models.TypeaheadChange.changed_at < cutoff).delete(
+        synchronize_session=False
+    )
+    db.commit()
+    return deleted
+
+
+def _load_relations(db: Session, user_id: int) -> frozenset:
+    friendship = models.Friendship
+    related = set()
+    for one, two in db.query(friendship.user_one_id, friendship.user_two_id).filter(
+        or_(friendship.user_one_id == user_id, friendship.user_two_id == user_id),
+        friendship.status == models.FriendshipStatus.ACCEPTED,
+    ):
+        related.add((USER, two if one == user_id else one))
+    for (group_id,) in db.query(models.GroupMembership.group_id).filter(
+        models.GroupMembership.user_id == user_id,
+        models.GroupMembership.status == models.GroupMemberStatus.JOINED,
+    ):
+        related.add((GROUP, group_id))
+    for (page_id,) in db.query(models.PageFollow.page_id).filter(models.PageFollow.user_id == user_id):
+        related.add((PAGE, page_id))
+    return frozenset(related)
+
+
+def relations(db: Session, user_id: Optional[int]) -> frozenset:
+    """(type, id) of the viewer's friends, joined groups and followed pages."""
+    if not user_id:
+        return frozenset()
+    return _relations.get_or_load(user_id, lambda: _load_relations(db, user_id))
+
+
+def search(q: str, limit: int = 10, types=TYPES, related: frozenset = frozenset(), exclude=None) -> list[tuple[Entry, bool]]:
+    """Top `limit` (entry, is_related) whose name has a word starting with q."""
+    prefix = normalize(q)
+    if not prefix:
+        return []
+    with _lock:
+        found = set()
+        i = bisect.bisect_left(_keys, (prefix,))
+        end = min(len(_keys), i + TYPEAHEAD_SCAN_LIMIT)
+        while i < end and _keys[i][0].startswith(prefix):
+            found.add(_keys[i][1:])
+            i += 1
+        for ref in related:
+            entry = _entries.get(ref)
+            if entry and any(key.startswith(prefix) for key in entry.keys):
+                found.add(ref)
+        candidates = [_entries[ref] for ref in found if ref[0] in types and ref != exclude and ref in _entries]
+
+    def rank(entry: Entry):
+        return (
+            (entry.entity_type, entry.entity_id) in related,
+            entry.folded_name == prefix,
+            entry.folded_name.startswith(prefix),
+            entry.popularity,
+            -len(entry.name),
+        )
+
+    return [
+        (entry, (entry.entity_type, entry.entity_id) in related)
+        for entry in heapq.nlargest(limit, candidates, key=rank)
+    ]
+
+
+def _loop():
+    next_build = 0.0
+    while not _stop.is_set():
+        db = SessionLocal()
+        try:
+            if time.monotonic() >= next_build:
+                build(db)
+                next_build = time.monotonic() + TYPEAHEAD_RELOAD_SECONDS
+                prune(db)
+            else:
+                poll(db)
+        except Exception as e:
+            db.rollback()
+            print(f"WARNING: typeahead index refresh failed: {e}")
+        finally:
+            db.close()
+        _stop.wait(TYPEAHEAD_POLL_SECONDS)
+
+
+def start():
+    global _thread
+    if _thread is not None or not TYPEAHEAD_ENABLED:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name="typeahead", daemon=True)
+    _thread.start()
+
+
+def stop():
+    global _thread
+    if _thread is None:
+        return
+    _stop.set()
+    _thread.join(timeout=5)
+    _thread = None
@@ -0,0 +1,74 @@
+"""Local stand-in for signed direct-to-storage uploads.
+
+Plays the role Cloudinary plays in production for the "local" storage
+backend: it accepts the signed PUT URLs issued by POST /media/upload-tickets,
+writes the bytes under MEDIA_ROOT and answers with a signed receipt that the
+client passes to /media/upload-tickets/confirm. Run it as its own process so
+upload bytes stay off the API workers:
+
+    uvicorn app.upload_server:app --port 8001
+"""
+import hashlib
+import os
+import time
+from uuid import uuid4
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+
+from . import storage, upload_tickets
+
+app = FastAPI(title="PHO-BO local upload server")
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:5173"],
+    allow_methods=["PUT"],
+    allow_headers=["*"],
+)
+
+
+@app.put("/uploads/{key:path}")
+async def put_object(key: str, request: Request, expires: int, max_bytes: int, content_type: str, signature: str):
+    if not upload_tickets.verify(signature, "PUT", key, expires, max_bytes, content_type):
+        raise HTTPException(status_code=403, detail="INVALID_SIGNATURE")
+    if expires < time.time():
+        raise HTTPException(status_code=403, detail="URL_EXPIRED")
+    try:
+        path = storage._local_path(key)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="INVALID_KEY")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail="FILE_TOO_LARGE")
+                digest.update(chunk)
+                out.write(chunk)
+        if not size:
+            raise HTTPException(status_code=400, detail="INVALID_FILE")
+        # key chỉ ghi được một lần
+        if os.path.exists(path):
+            raise HTTPException(status_code=409, detail="OBJECT_EXISTS")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    sha256 = digest.hexdigest()
+    return {
+        "key": key,
+        "bytes": size,
+        "sha256": sha256,
+        "signature": upload_tickets.sign_receipt(key, size, sha256),
+    }
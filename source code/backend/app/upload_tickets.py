@@ -0,0 +1,173 @@
+"""Signed upload tickets for direct-to-storage uploads.
+
+POST /media/upload-tickets hands the client a short-lived ticket plus the
+instructions to send its bytes straight to storage: a signed Cloudinary
+upload, or a signed PUT to the local stand-in server (app/upload_server.py).
+POST /media/upload-tickets/confirm then checks the stored object and creates
+the File row, so media bytes never pass through the API workers.
+"""
+import hashlib
+import hmac
+import os
+import time
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from fastapi import HTTPException
+from jose import ExpiredSignatureError, JWTError, jwt
+
+from . import storage
+from .cloudinary_utils import CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET, CLOUDINARY_CLOUD_NAME
+
+UPLOAD_SIGNING_SECRET = os.getenv("UPLOAD_SIGNING_SECRET") or os.getenv("SECRET_KEY", "dev-secret-change-me")
+UPLOAD_TICKET_TTL_SECONDS = int(os.getenv("UPLOAD_TICKET_TTL_SECONDS", "900"))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+LOCAL_UPLOAD_URL = os.getenv("LOCAL_UPLOAD_URL", "http://localhost:8001").rstrip("/")
+
+ALGORITHM = "HS256"
+TICKET_TYPE = "upload"
+
+
+def sign(*parts) -> str:
+    """HMAC-SHA256 over the parts joined with newlines (shared with the stand-in server)."""
+    msg = "\n".join(str(p) for p in parts).encode()
+    return hmac.new(UPLOAD_SIGNING_SECRET.encode(), msg, hashlib.sha256).hexdigest()
+
+
+def verify(signature: str | None, *parts) -> bool:
+    return bool(signature) and hmac.compare_digest(signature, sign(*parts))
+
+
+def _public_id(key: str) -> str:
+    # giống upload_to_cloudinary: public_id = tên file bỏ đuôi
+    return key.rsplit(".", 1)[0]
+
+
+def _cloudinary_instructions(key: str, resource_type: str) -> dict:
+    import cloudinary.utils
+
+    # overwrite=false: ticket đã confirm không dùng lại để ghi đè object được
+    params = {"public_id": _public_id(key), "timestamp": int(time.time()), "overwrite": "false"}
+    signature = cloudinary.utils.api_sign_request(params, CLOUDINARY_API_SECRET)
+    return {
+        "method": "POST",
+        "url": f"https://api.cloudinary.com/v1_1/{CLOUDINARY_CLOUD_NAME}/{resource_type}/upload",
+        "fields": {**params, "api_key": CLOUDINARY_API_KEY, "signature": signature},
+        "file_field": "file",
+    }
+
+
+def _local_instructions(key: str, mime_type: str, max_bytes: int, expires: int) -> dict:
+    query = {
+        "expires": expires,
+        "max_bytes": max_bytes,
+        "content_type": mime_type,
+        "signature": sign("PUT", key, expires, max_bytes, mime_type),
+    }
+    return {
+        "method": "PUT",
+        "url": f"{LOCAL_UPLOAD_URL}/uploads/{key}?{urlencode(query)}",
+        "headers": {"Content-Type": mime_type},
+    }
+
+
+def issue(user_id: int, file_name: str, mime_type: str, file_size: int) -> dict:
+    """Create a ticket for one upload; 413 FILE_TOO_LARGE if the declared size is over the limit."""
+    if file_size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="FILE_TOO_LARGE")
+    ext = os.path.splitext(file_name or "")[1].lower()
+    key = f"user_{user_id}_{uuid4().hex}{ext}"
+    resource_type = storage.resource_type_for(mime_type)
+    expires = int(time.time()) + UPLOAD_TICKET_TTL_SECONDS
+    # cho lệch nhẹ so với size khai báo, nhưng không vượt giới hạn chung
+    max_bytes = min(MAX_UPLOAD_BYTES, file_size + 1024) if file_size else MAX_UPLOAD_BYTES
+
+    claims = {
+        "typ": TICKET_TYPE,
+        "sub": str(user_id),
+        "key": key,
+        "name": file_name,
+        "mime": mime_type,
+        "rt": resource_type,
+        "max": max_bytes,
+        "backend": storage.STORAGE_BACKEND,
+        "exp": expires,
+    }
+    if storage.STORAGE_BACKEND == "cloudinary":
+        upload = _cloudinary_instructions(key, resource_type)
+    else:
+        upload = _local_instructions(key, mime_type, max_bytes, expires)
+    return {
+        "ticket": jwt.encode(claims, UPLOAD_SIGNING_SECRET, algorithm=ALGORITHM),
+        "expires_at": expires,
+        "max_bytes": max_bytes,
+        "upload": upload,
+    }
+
+
+def read_ticket(token: str | None) -> dict:
+    if not token:
+        raise HTTPException(status_code=400, detail="INVALID_TICKET")
+    try:
+        claims = jwt.decode(token, UPLOAD_SIGNING_SECRET, algorithms=[ALGORITHM])
+    except ExpiredSignatureError:
+        raise HTTPException(status_code=410, detail="TICKET_EXPIRED")
+    except JWTError:
+        raise HTTPException(status_code=400, detail="INVALID_TICKET")
+    if claims.get("typ") != TICKET_TYPE:
+        raise HTTPException(status_code=400, detail="INVALID_TICKET")
+    return claims
+
+
+def sign_receipt(key: str, size: int, content_hash: str) -> str:
+    return sign("RECEIPT", key, size, content_hash)
+
+
+def _locate_local(claims: dict, receipt: dict | None) -> dict:
+    receipt = receipt or {}
+    key = claims["key"]
+    if receipt.get("key") != key or not verify(
+        receipt.get("signature"), "RECEIPT", key, receipt.get("bytes"), receipt.get("sha256")
+    ):
+        raise HTTPException(status_code=400, detail="INVALID_RECEIPT")
+    try:
+        size = os.path.getsize(storage._local_path(key))
+    except (OSError, ValueError):
+        raise HTTPException(status_code=404, detail="UPLOAD_NOT_FOUND")
+    if size != receipt["bytes"]:
+        raise HTTPException(status_code=400, detail="INVALID_RECEIPT")
+    return {
+        "url": f"{storage.MEDIA_URL}/{key}",
+        "key": key,
+        "bytes": size,
+        "resource_type": claims["rt"],
+        "content_hash": receipt["sha256"],
+    }
+
+
+def _locate_cloudinary(claims: dict) -> dict:
+    import cloudinary.api
+    from cloudinary.exceptions import NotFound
+
+    try:
+        res = cloudinary.api.resource(_public_id(claims["key"]), resource_type=claims["rt"])
+    except NotFound:
+        raise HTTPException(status_code=404, detail="UPLOAD_NOT_FOUND")
+    return {
+        "url": res["secure_url"],
+        "key": res["public_id"],
+        "bytes": res["bytes"],
+        "resource_type": res.get("resource_type", claims["rt"]),
+        # Cloudinary chỉ trả md5 (etag); đánh dấu tiền tố để không lẫn với sha256
+        "content_hash": f"md5:{res['etag']}",
+    }
+
+
+def locate(claims: dict, receipt: dict | None = None) -> dict:
+    """
+    Look up the object a ticket was used for. Returns the put_bytes-style dict
+    (url, key, bytes, resource_type) plus content_hash.
+    """
+    if claims.get("backend") == "cloudinary":
+        return _locate_cloudinary(claims)
+    return _locate_local(claims, receipt)
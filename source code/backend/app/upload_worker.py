@@ -0,0 +1,195 @@
+"""Background uploader for async (202) media uploads.
+
+upload_media(async_upload=true) spools the request body to UPLOAD_SPOOL_DIR,
+inserts a PENDING File and hands its id to this bounded thread pool. Each
+worker pushes the spooled bytes to the storage backend (through the
+content-hash index), retrying with exponential backoff, then marks the File
+READY or FAILED and removes the spool file.
+
+Several API processes can run uploaders. A worker claims a PENDING file by
+setting upload_claimed_at in a conditional UPDATE and only proceeds when it
+changed the row; the claim is a lease of UPLOAD_LEASE_SECONDS. At startup,
+only PENDING files whose lease has expired (or that were never claimed and
+are older than the lease) are requeued or failed, so a starting process
+does not touch uploads another live process is still working on.
+"""
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from . import media_blobs, media_processing, models, timeline_cache
+from .database import SessionLocal
+
+UPLOAD_SPOOL_DIR = os.path.abspath(os.getenv("UPLOAD_SPOOL_DIR", "upload_spool"))
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+UPLOAD_QUEUE_SIZE = int(os.getenv("UPLOAD_QUEUE_SIZE", "512"))
+UPLOAD_MAX_ATTEMPTS = int(os.getenv("UPLOAD_MAX_ATTEMPTS", "5"))
+UPLOAD_BACKOFF_SECONDS = float(os.getenv("UPLOAD_BACKOFF_SECONDS", "1"))
+# lâu hơn một lượt upload kể cả retry/backoff
+UPLOAD_LEASE_SECONDS = int(os.getenv("UPLOAD_LEASE_SECONDS", "600"))
+
+_jobs: "queue.Queue[Optional[int]]" = queue.Queue(maxsize=UPLOAD_QUEUE_SIZE)
+_threads: list[threading.Thread] = []
+
+
+def spool_path(file_id: int) -> str:
+    return os.path.join(UPLOAD_SPOOL_DIR, str(file_id))
+
+
+def new_spool_path() -> str:
+    """Temporary spool location used before the File row (and its id) exists."""
+    os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+    return os.path.join(UPLOAD_SPOOL_DIR, f"{uuid4().hex}.part")
+
+
+def submit(file_id: int) -> bool:
+    """Queue a PENDING file for upload. Returns False if the uploader is off or saturated."""
+    if not _threads:
+        return False
+    try:
+        _jobs.put_nowait(file_id)
+        return True
+    except queue.Full:
+        return False
+
+
+def _remove_spool(file_id: int):
+    try:
+        os.remove(spool_path(file_id))
+    except FileNotFoundError:
+        pass
+
+
+def _read_spool(file_id: int) -> bytes:
+    with open(spool_path(file_id), "rb") as fh:
+        return fh.read()
+
+
+def _lease_expired(now: datetime):
+    """PENDING files nobody holds: never claimed and older than the lease, or with an expired claim."""
+    cutoff = now - timedelta(seconds=UPLOAD_LEASE_SECONDS)
+    return and_(
+        models.File.status == models.FileStatus.PENDING,
+        or_(
+            and_(models.File.upload_claimed_at.is_(None), models.File.created_at < cutoff),
+            models.File.upload_claimed_at < cutoff,
+        ),
+    )
+
+
+def _claim(db: Session, file_id: int) -> bool:
+    """Take the lease on a PENDING file; False when another uploader holds it or it is done."""
+    now = datetime.now()
+    cutoff = now - timedelta(seconds=UPLOAD_LEASE_SECONDS)
+    claimed = db.query(models.File).filter(
+        models.File.file_id == file_id,
+        models.File.status == models.FileStatus.PENDING,
+        or_(models.File.upload_claimed_at.is_(None), models.File.upload_claimed_at < cutoff),
+    ).update({models.File.upload_claimed_at: now}, synchronize_session=False)
+    db.commit()
+    return claimed == 1
+
+
+def _process(file_id: int):
+    db = SessionLocal()
+    try:
+        if not _claim(db, file_id):
+            status = db.query(models.File.status).filter(models.File.file_id == file_id).scalar()
+            if status != models.FileStatus.PENDING:
+                _remove_spool(file_id)
+            return
+        rec = db.query(models.File).filter(models.File.file_id == file_id).first()
+
+        ext = os.path.splitext(rec.file_name or "")[1].lower()
+        key = f"user_{rec.uploader_user_id}_{uuid4().hex}{ext}"
+        for attempt in range(1, UPLOAD_MAX_ATTEMPTS + 1):
+            try:
+                blob, data = media_blobs.store(db, rec.content_hash, lambda: _read_spool(file_id), key, rec.file_type)
+                break
+            except Exception as e:
+                db.rollback()
+                if attempt == UPLOAD_MAX_ATTEMPTS:
+                    print(f"WARNING: upload of file {file_id} failed after {attempt} attempts: {e}")
+                    rec.status = models.FileStatus.FAILED
+                    db.commit()
+                    _remove_spool(file_id)
+                    return
+                time.sleep(UPLOAD_BACKOFF_SECONDS * 2 ** (attempt - 1))
+
+        rec.file_url = blob.file_url
+        rec.file_size = blob.file_size
+        rec.status = models.FileStatus.READY
+        rec.renditions_pending = data is not None and media_processing.applies(rec.file_type)
+        if data is None:
+            existing = media_blobs.existing_renditions(db, rec.content_hash)
+            if existing:
+                rec.thumbnail_url, rec.renditions = existing
+        # bài đã gắn file này lúc PENDING giờ hiện được file
+        timeline_cache.invalidate_files(db, [file_id])
+        db.commit()
+        _remove_spool(file_id)
+
+        if data is not None:
+            media_processing.enqueue(file_id, data, rec.file_type, rec.content_hash)
+    finally:
+        db.close()
+
+
+def _worker_loop():
+    while True:
+        file_id = _jobs.get()
+        if file_id is None:
+            break
+        try:
+            _process(file_id)
+        except Exception as e:
+            print(f"WARNING: upload worker error for file {file_id}: {e}")
+
+
+def _requeue_pending():
+    """After a restart, pick up abandoned PENDING files whose spool survived; fail the rest."""
+    db = SessionLocal()
+    try:
+        now = datetime.now()
+        pending = db.query(models.File.file_id).filter(_lease_expired(now)).all()
+        for (file_id,) in pending:
+            if not (os.path.exists(spool_path(file_id)) and submit(file_id)):
+                # cùng điều kiện lease: không đánh FAILED file vừa được uploader khác nhận
+                db.query(models.File).filter(models.File.file_id == file_id, _lease_expired(now)).update(
+                    {"status": models.FileStatus.FAILED}, synchronize_session=False
+                )
+        db.commit()
+    finally:
+        db.close()
+
+
+def start():
+    if _threads:
+        return
+    os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+    for i in range(UPLOAD_WORKERS):
+        t = threading.Thread(target=_worker_loop, name=f"uploader-{i}", daemon=True)
+        t.start()
+        _threads.append(t)
+    try:
+        _requeue_pending()
+    except Exception as e:
+        print(f"WARNING: could not requeue pending uploads: {e}")
+
+
+def stop():
+    for _ in _threads:
+        try:
+            _jobs.put(None, timeout=5)
+        except queue.Full:
+            break
+    for t in _threads:
+        t.join(timeout=5)
+    _threads.clear()
@@ -0,0 +1,190 @@
+"""Per-user monthly activity rollups (user_monthly_activity) for /admin/stats.
+
+A background thread adds every finished day after the job's
+rollup_watermarks entry into the month's row of each active user: original
+posts, shares, comments and reactions given. A day costs one GROUP BY per
+metric over that day's rows (created_at range scans), and is added in the
+same transaction that advances the watermark, so no day is counted twice.
+GET /admin/stats sums the months of the requested range and reads nothing
+else.
+
+    python -m app.maintenance rollup-user-activity
+"""
+import os
+import threading
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+
+JOB_NAME = "user_monthly_activity"
+USER_ACTIVITY_ENABLED = os.getenv("USER_ACTIVITY_ENABLED", "1") == "1"
+USER_ACTIVITY_INTERVAL_SECONDS = int(os.getenv("USER_ACTIVITY_INTERVAL_SECONDS", "3600"))
+
+METRICS = ("original_posts", "shares", "comments", "reactions_given")
+
+# func_calculate_user_activity_score: ORIGINAL +10, SHARE +5
+ORIGINAL_POST_POINTS = 10
+SHARE_POINTS = 5
+
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+
+def month_of(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _day_counts(db: Session, day: date) -> dict:
+    """{user_id: {metric: count}} for one day."""
+    start = datetime.combine(day, time.min)
+    end = start + timedelta(days=1)
+    counts = defaultdict(dict)
+
+    posts = db.query(models.Post.author_id, models.Post.post_type, func.count()).filter(
+        models.Post.created_at >= start,
+        models.Post.created_at < end,
+        models.Post.author_type == models.PostAuthorType.USER,
+    ).group_by(models.Post.author_id, models.Post.post_type)
+    for user_id, post_type, n in posts:
+        metric = "shares" if post_type == models.PostType.SHARE else "original_posts"
+        counts[user_id][metric] = counts[user_id].get(metric, 0) + n
+
+    comments = db.query(models.Comment.commenter_user_id, func.count()).filter(
+        models.Comment.created_at >= start, models.Comment.created_at < end
+    ).group_by(models.Comment.commenter_user_id)
+    for user_id, n in comments:
+        counts[user_id]["comments"] = n
+
+    reactions = db.query(models.Reaction.reactor_user_id, func.count()).filter(
+        models.Reaction.created_at >= start, models.Reaction.created_at < end
+    ).group_by(models.Reaction.reactor_user_id)
+    for user_id, n in reactions:
+        counts[user_id]["reactions_given"] = n
+
+    return counts
+
+
+def _add_to_month(db: Session, month: date, counts: dict):
+    """Add one day's counts to the month rows (does not commit)."""
+    if not counts:
+        return
+    table = models.UserMonthlyActivity.__table__
+    rows = [
+        {"user_id": user_id, "month": month, **{m: c.get(m, 0) for m in METRICS}}
+        for user_id, c in counts.items()
+    ]
+    if db.get_bind().dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+        stmt = mysql_insert(table).values(rows)
+        db.execute(stmt.on_duplicate_key_update({m: table.c[m] + stmt.inserted[m] for m in METRICS}))
+        return
+    # DB khác: cộng vào các dòng đã có, insert phần còn lại
+    existing = {
+        user_id
+        for (user_id,) in db.query(models.UserMonthlyActivity.user_id).filter(
+            models.UserMonthlyActivity.month == month,
+            models.UserMonthlyActivity.user_id.in_(list(counts)),
+        )
+    }
+    for row in rows:
+        if row["user_id"] in existing:
+            db.execute(
+                table.update()
+                .where(table.c.user_id == row["user_id"], table.c.month == month)
+                .values({m: table.c[m] + row[m] for m in METRICS})
+            )
+    new_rows = [row for row in rows if row["user_id"] not in existing]
+    if new_rows:
+        db.execute(table.insert(), new_rows)
+
+
+def _first_day(db: Session) -> Optional[date]:
+    """Day of the oldest post / comment / reaction (index-only MINs)."""
+    firsts = [
+        db.query(func.min(models.Post.created_at)).scalar(),
+        db.query(func.min(models.Comment.created_at)).scalar(),
+        db.query(func.min(models.Reaction.created_at)).scalar(),
+    ]
+    firsts = [f for f in firsts if f is not None]
+    return min(firsts).date() if firsts else None
+
+
+def run(db: Session, through: Optional[date] = None) -> int:
+    """
+    Roll up every finished day after the watermark, one transaction per day.
+    The first run starts from the oldest activity. Returns the number of days rolled up.
+    """
+    through = through or date.today() - timedelta(days=1)
+    done = 0
+    while True:
+        # khóa dòng watermark: worker khác chờ tới khi ngày này xong
+        wm = db.query(models.RollupWatermark).filter(
+            models.RollupWatermark.job_name == JOB_NAME
+        ).with_for_update().first()
+        if wm is None:
+            first = _first_day(db) or through
+            wm = models.RollupWatermark(job_name=JOB_NAME, through_day=min(first, through) - timedelta(days=1))
+            db.add(wm)
+            try:
+                db.flush()
+            except IntegrityError:
+                db.rollback()
+                continue
+        day = wm.through_day + timedelta(days=1)
+        if day > through:
+            db.commit()
+            return done
+        _add_to_month(db, month_of(day), _day_counts(db, day))
+        wm.through_day = day
+        db.commit()
+        done += 1
+
+
+def through_day(db: Session) -> Optional[date]:
+    """Last rolled-up day (None before the first run)."""
+    return db.query(models.RollupWatermark.through_day).filter(
+        models.RollupWatermark.job_name == JOB_NAME
+    ).scalar()
+
+
+def activity_score(original_posts: int, shares: int) -> int:
+    return original_posts * ORIGINAL_POST_POINTS + shares * SHARE_POINTS
+
+
+def _loop():
+    while not _stop.is_set():
+        db = SessionLocal()
+        try:
+            run(db)
+        except Exception as e:
+            db.rollback()
+            print(f"WARNING: user activity rollup failed: {e}")
+        finally:
+            db.close()
+        _stop.wait(USER_ACTIVITY_INTERVAL_SECONDS)
+
+
+def start():
+    global _thread
+    if _thread is not None or not USER_ACTIVITY_ENABLED:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name="user-activity", daemon=True)
+    _thread.start()
+
+
+def stop():
+    global _thread
+    if _thread is None:
+        return
+    _stop.set()
+    _thread.join(timeout=5)
+    _thread = None
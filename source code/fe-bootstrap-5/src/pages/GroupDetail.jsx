@@ -13,10 +13,14 @@ export default function GroupDetail() {
   const { groupId } = useParams()
   const [group, setGroup] = useState(null)
   const [posts, setPosts] = useState([])
+  const [postsCursor, setPostsCursor] = useState(null)
+  const [loadingOlder, setLoadingOlder] = useState(false)
   const [members, setMembers] = useState([])
   const [rules, setRules] = useState([])
   const [questions, setQuestions] = useState([])
   const [pendingRequests, setPendingRequests] = useState([])
+  const [pendingCursor, setPendingCursor] = useState(null)
+  const [loadingPending, setLoadingPending] = useState(false)
   const [activeTab, setActiveTab] = useState('discussion') // discussion, members, about
   const [loading, setLoading] = useState(true)
   const [zoomedMedia, setZoomedMedia] = useState(null)
@@ -37,6 +41,7 @@ export default function GroupDetail() {
       if (groupRes.data.my_status === 'JOINED') {
         const postsRes = await groupService.getGroupPosts(groupId)
         setPosts(postsRes.data || [])
+        setPostsCursor(postsRes.headers['x-next-cursor'] || null)
         
         const membersRes = await groupService.getGroupMembers(groupId)
         setMembers(membersRes.data || [])
@@ -54,6 +59,7 @@ export default function GroupDetail() {
       if (groupRes.data.my_role === 'ADMIN' || groupRes.data.my_role === 'MODERATOR') {
         const pendingRes = await groupService.getPendingRequests(groupId)
         setPendingRequests(pendingRes.data || [])
+        setPendingCursor(pendingRes.headers['x-next-cursor'] || null)
       }
     } catch (error) {
       console.error('Load group error:', error)
@@ -70,6 +76,34 @@ export default function GroupDetail() {
     }
   }
 
+  const loadOlderPosts = async () => {
+    if (!postsCursor) return
+    setLoadingOlder(true)
+    try {
+      const postsRes = await groupService.getGroupPosts(groupId, postsCursor)
+      setPosts(prev => [...prev, ...(postsRes.data || [])])
+      setPostsCursor(postsRes.headers['x-next-cursor'] || null)
+    } catch (error) {
+      console.error('Load posts error:', error)
+    } finally {
+      setLoadingOlder(false)
+    }
+  }
+
+  const loadMorePending = async () => {
+    if (!pendingCursor) return
+    setLoadingPending(true)
+    try {
+      const pendingRes = await groupService.getPendingRequests(groupId, pendingCursor)
+      setPendingRequests(prev => [...prev, ...(pendingRes.data || [])])
+      setPendingCursor(pendingRes.headers['x-next-cursor'] || null)
+    } catch (error) {
+      console.error('Load pending requests error:', error)
+    } finally {
+      setLoadingPending(false)
+    }
+  }
+
   const handleJoin = async () => {
     // Show questions dialog
     const hasRequired = questions.some(q => q.is_required)
@@ -418,7 +452,7 @@ export default function GroupDetail() {
               className={`nav-link ${activeTab === 'pending' ? 'active' : ''}`}
               onClick={() => setActiveTab('pending')}
             >
-              Pending ({pendingRequests.length})
+              Pending ({pendingRequests.length}{pendingCursor ? '+' : ''})
             </button>
           </li>
         )}
@@ -499,6 +533,21 @@ export default function GroupDetail() {
               </div>
             ))
           )}
+          {postsCursor && (
+            <div className="text-center mb-3">
+              <button
+                className="btn btn-outline-primary"
+                onClick={loadOlderPosts}
+                disabled={loadingOlder}
+              >
+                {loadingOlder ? (
+                  <span className="spinner-border spinner-border-sm"></span>
+                ) : (
+                  'Load older posts'
+                )}
+              </button>
+            </div>
+          )}
         </div>
       )}
 
@@ -600,6 +649,21 @@ export default function GroupDetail() {
               </div>
             </div>
           ))}
+          {pendingCursor && (
+            <div className="text-center mb-3">
+              <button
+                className="btn btn-outline-primary"
+                onClick={loadMorePending}
+                disabled={loadingPending}
+              >
+                {loadingPending ? (
+                  <span className="spinner-border spinner-border-sm"></span>
+                ) : (
+                  'Load more requests'
+                )}
+              </button>
+            </div>
+          )}
         </div>
       )}
 
@@ -8,21 +8,28 @@ export default function GroupList() {
   const [allGroups, setAllGroups] = useState([])
   const [loading, setLoading] = useState(true)
   const [activeTab, setActiveTab] = useState('my-groups') // 'my-groups' or 'discover'
+  // Discover: search / sort are applied by the server, one page at a time
+  const [discoverQuery, setDiscoverQuery] = useState('')
+  const [discoverSort, setDiscoverSort] = useState('popular')
+  const [discoverCursor, setDiscoverCursor] = useState(null)
+  const [discoverLoading, setDiscoverLoading] = useState(false)
   const navigate = useNavigate()
 
   useEffect(() => {
     loadData()
   }, [])
 
+  // (Re)load the first Discover page when search / sort change (debounced while typing)
+  useEffect(() => {
+    const timer = setTimeout(() => loadDiscover(), discoverQuery ? 300 : 0)
+    return () => clearTimeout(timer)
+  }, [discoverQuery, discoverSort])
+
   const loadData = async () => {
     setLoading(true)
     try {
-      const [myRes, allRes] = await Promise.all([
-        groupService.getMyGroups(),
-        groupService.getGroups()
-      ])
+      const myRes = await groupService.getMyGroups()
       setMyGroups(myRes.data || [])
-      setAllGroups(allRes.data || [])
     } catch (error) {
       console.error('Error loading groups:', error)
     } finally {
@@ -30,6 +37,20 @@ export default function GroupList() {
     }
   }
 
+  // First page when cursor is null, otherwise the next page appended
+  const loadDiscover = async (cursor = null) => {
+    setDiscoverLoading(true)
+    try {
+      const res = await groupService.getGroups({ q: discoverQuery.trim(), sort: discoverSort, cursor })
+      setAllGroups(prev => (cursor ? [...prev, ...(res.data || [])] : res.data || []))
+      setDiscoverCursor(res.headers['x-next-cursor'] || null)
+    } catch (error) {
+      console.error('Error loading groups:', error)
+    } finally {
+      setDiscoverLoading(false)
+    }
+  }
+
   const handleCreateGroup = async () => {
     const { value: formValues } = await Swal.fire({
       title: 'Create New Group',
@@ -120,6 +141,7 @@ export default function GroupList() {
         })
         
         loadData()
+        loadDiscover()
       } catch (error) {
         console.error('Create group error:', error)
         Swal.fire({
@@ -234,9 +256,32 @@ export default function GroupList() {
       {/* Discover Tab */}
       {activeTab === 'discover' && (
         <div>
+          <div className="row g-2 mb-3">
+            <div className="col-md-8">
+              <input
+                type="text"
+                className="form-control"
+                placeholder="Search groups by name..."
+                value={discoverQuery}
+                onChange={(e) => setDiscoverQuery(e.target.value)}
+              />
+            </div>
+            <div className="col-md-4">
+              <select
+                className="form-select"
+                value={discoverSort}
+                onChange={(e) => setDiscoverSort(e.target.value)}
+              >
+                <option value="popular">Most members</option>
+                <option value="newest">Newest</option>
+              </select>
+            </div>
+          </div>
           {allGroups.length === 0 ? (
-            <div className="alert alert-info">
-              No public groups available yet. Be the first to create one!
+            !discoverLoading && <div className="alert alert-info">
+              {discoverQuery.trim()
+                ? 'No groups match your search.'
+                : 'No public groups available yet. Be the first to create one!'}
             </div>
           ) : (
             <div className="row row-cols-1 row-cols-md-2 row-cols-lg-3 g-4">
@@ -281,6 +326,21 @@ export default function GroupList() {
               ))}
             </div>
           )}
+          {discoverCursor && (
+            <div className="text-center mt-4">
+              <button
+                className="btn btn-outline-primary"
+                onClick={() => loadDiscover(discoverCursor)}
+                disabled={discoverLoading}
+              >
+                {discoverLoading ? (
+                  <span className="spinner-border spinner-border-sm"></span>
+                ) : (
+                  'Load more groups'
+                )}
+              </button>
+            </div>
+          )}
         </div>
       )}
       
@@ -5,7 +5,10 @@ export default function UserManagement() {
   const [users, setUsers] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
-  const [searchTerm, setSearchTerm] = useState('');
+  // Filters are applied by the server (email prefix, role, active flag)
+  const [filters, setFilters] = useState({ email: '', roleId: '', isActive: '' });
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // Add user modal state
   const [showAddModal, setShowAddModal] = useState(false);
@@ -29,15 +32,22 @@ export default function UserManagement() {
   const [rolesError, setRolesError] = useState(null);
 
   useEffect(() => {
-    loadUsers();
+    ensureRolesLoaded();
   }, []);
 
+  // Reload the first page when the filters change (debounced while typing)
+  useEffect(() => {
+    const timer = setTimeout(() => loadUsers(), 300);
+    return () => clearTimeout(timer);
+  }, [filters]);
+
   const loadUsers = async () => {
     try {
       setLoading(true);
       setError(null);
-      const data = await getUsers();
-      setUsers(data);
+      const page = await getUsers({ ...filters, email: filters.email.trim() });
+      setUsers(page.items);
+      setNextCursor(page.nextCursor);
     } catch (err) {
       setError(err.response?.data?.detail || 'Failed to load users');
     } finally {
@@ -45,6 +55,21 @@ export default function UserManagement() {
     }
   };
 
+  const loadMoreUsers = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      setError(null);
+      const page = await getUsers({ ...filters, email: filters.email.trim(), cursor: nextCursor });
+      setUsers(prev => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      setError(err.response?.data?.detail || 'Failed to load users');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const ensureRolesLoaded = async () => {
     if (roles.length > 0) return;
     try {
@@ -127,21 +152,6 @@ export default function UserManagement() {
     }
   };
 
-  const filteredUsers = users.filter(user =>
-    user.email?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    (user.phone ? String(user.phone).toLowerCase().includes(searchTerm.toLowerCase()) : false)
-  );
-
-  if (loading) {
-    return (
-      <div className="text-center py-5">
-        <div className="spinner-border" role="status">
-          <span className="visually-hidden">Loading...</span>
-        </div>
-      </div>
-    );
-  }
-
   return (
     <div>
       <div className="d-flex justify-content-between align-items-center mb-4">
@@ -169,14 +179,42 @@ export default function UserManagement() {
         </div>
       )}
 
-      <div className="mb-3">
-        <input
-          type="text"
-          className="form-control"
-          placeholder="Search by email or phone..."
-          value={searchTerm}
-          onChange={(e) => setSearchTerm(e.target.value)}
-        />
+      <div className="row g-2 mb-3">
+        <div className="col-md-6">
+          <input
+            type="text"
+            className="form-control"
+            placeholder="Filter by email (starts with)..."
+            value={filters.email}
+            onChange={(e) => setFilters({ ...filters, email: e.target.value })}
+          />
+        </div>
+        <div className="col-md-3">
+          <select
+            className="form-select"
+            value={filters.roleId}
+            onChange={(e) => setFilters({ ...filters, roleId: e.target.value })}
+            disabled={rolesLoading}
+          >
+            <option value="">All roles</option>
+            {roles.map(r => (
+              <option key={r.role_id} value={r.role_id}>
+                {r.role_name}
+              </option>
+            ))}
+          </select>
+        </div>
+        <div className="col-md-3">
+          <select
+            className="form-select"
+            value={filters.isActive}
+            onChange={(e) => setFilters({ ...filters, isActive: e.target.value })}
+          >
+            <option value="">Active and inactive</option>
+            <option value="true">Active only</option>
+            <option value="false">Inactive only</option>
+          </select>
+        </div>
       </div>
 
       <div className="table-responsive">
@@ -193,7 +231,7 @@ export default function UserManagement() {
             </tr>
           </thead>
           <tbody>
-            {filteredUsers.map(user => (
+            {users.map(user => (
               <tr key={user.id}>
                 <td>{user.id}</td>
                 <td>{user.email}</td>
@@ -225,7 +263,16 @@ export default function UserManagement() {
                 </td>
               </tr>
             ))}
-            {filteredUsers.length === 0 && (
+            {loading && users.length === 0 && (
+              <tr>
+                <td colSpan="7" className="text-center py-4">
+                  <div className="spinner-border" role="status">
+                    <span className="visually-hidden">Loading...</span>
+                  </div>
+                </td>
+              </tr>
+            )}
+            {!loading && users.length === 0 && (
               <tr>
                 <td colSpan="7" className="text-center text-muted">
                   No users found
@@ -236,6 +283,25 @@ export default function UserManagement() {
         </table>
       </div>
 
+      {nextCursor && (
+        <div className="text-center mb-3">
+          <button
+            className="btn btn-outline-secondary"
+            onClick={loadMoreUsers}
+            disabled={loadingMore || loading}
+          >
+            {loadingMore ? (
+              <>
+                <span className="spinner-border spinner-border-sm me-2"></span>
+                Loading...
+              </>
+            ) : (
+              'Load more'
+            )}
+          </button>
+        </div>
+      )}
+
       {/* Add User Modal */}
       {showAddModal && (
         <>
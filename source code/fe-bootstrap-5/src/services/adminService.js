@@ -1,8 +1,14 @@
 import api from './api';
 
-export const getUsers = async () => {
-  const response = await api.get('/admin/users');
-  return response.data;
+// Một trang /admin/users; lọc ở server, trang sau lấy bằng nextCursor (header X-Next-Cursor)
+export const getUsers = async ({ email, roleId, isActive, cursor, limit = 50 } = {}) => {
+  const params = { limit };
+  if (email) params.email = email;
+  if (roleId !== undefined && roleId !== null && roleId !== '') params.role_id = roleId;
+  if (isActive !== undefined && isActive !== null && isActive !== '') params.is_active = isActive;
+  if (cursor) params.cursor = cursor;
+  const response = await api.get('/admin/users', { params });
+  return { items: response.data, nextCursor: response.headers['x-next-cursor'] || null };
 };
 
 export const createUser = async (userData) => {
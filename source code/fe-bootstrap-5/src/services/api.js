@@ -23,4 +23,16 @@ api.interceptors.response.use(
     }
 );
 
+// Keyset-paginated list endpoints: gộp mọi trang bằng cách theo header X-Next-Cursor
+export const getAllPages = async (url, params = {}) => {
+    const items = [];
+    let cursor = null;
+    do {
+        const response = await api.get(url, { params: cursor ? { ...params, cursor } : params });
+        items.push(...response.data);
+        cursor = response.headers['x-next-cursor'];
+    } while (cursor);
+    return items;
+};
+
 export default api;
\ No newline at end of file
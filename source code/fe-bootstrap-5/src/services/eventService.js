@@ -1,23 +1,20 @@
-import api from './api';
+import api, { getAllPages } from './api';
 
 const eventService = {
-  // Get all events or filtered by type
+  // Get all upcoming events or filtered by type (every page)
   getAllEvents: async (type = null) => {
-    const params = type ? { type } : {};
-    const response = await api.get('/events', { params });
-    return response.data;
+    const params = type ? { type, when: 'upcoming' } : { when: 'upcoming' };
+    return getAllPages('/events', params);
   },
 
-  // Get my hosting events
+  // Get my upcoming hosting events
   getHostingEvents: async () => {
-    const response = await api.get('/events', { params: { type: 'HOSTING' } });
-    return response.data;
+    return getAllPages('/events', { type: 'HOSTING', when: 'upcoming' });
   },
 
-  // Get events I'm going to or interested in
+  // Get upcoming events I'm going to or interested in
   getGoingEvents: async () => {
-    const response = await api.get('/events', { params: { type: 'GOING' } });
-    return response.data;
+    return getAllPages('/events', { type: 'GOING', when: 'upcoming' });
   },
 
   // Get single event details
@@ -1,8 +1,13 @@
 import api from './api'
 
 // Group CRUD
-export async function getGroups() {
-  return api.get('/groups')
+// Một trang directory; q / sort ('popular' | 'newest') lọc ở server, trang sau theo header X-Next-Cursor
+export async function getGroups({ q, sort, cursor } = {}) {
+  const params = {}
+  if (q) params.q = q
+  if (sort) params.sort = sort
+  if (cursor) params.cursor = cursor
+  return api.get('/groups', { params })
 }
 
 export async function getGroup(groupId) {
@@ -68,8 +73,9 @@ export async function leaveGroup(groupId) {
   return api.post(`/groups/${groupId}/leave`)
 }
 
-export async function getPendingRequests(groupId) {
-  return api.get(`/groups/${groupId}/pending-requests`)
+// Oldest first, theo trang; trang sau lấy bằng cursor từ header X-Next-Cursor
+export async function getPendingRequests(groupId, cursor) {
+  return api.get(`/groups/${groupId}/pending-requests`, { params: cursor ? { cursor } : {} })
 }
 
 export async function approveMember(groupId, userId) {
@@ -97,8 +103,9 @@ export async function inviteFriend(groupId, userId) {
 }
 
 // Group Posts
-export async function getGroupPosts(groupId) {
-  return api.get(`/groups/${groupId}/posts`)
+// Newest first; trang cũ hơn lấy bằng cursor từ header X-Next-Cursor
+export async function getGroupPosts(groupId, cursor) {
+  return api.get(`/groups/${groupId}/posts`, { params: cursor ? { cursor } : {} })
 }
 
 export default {